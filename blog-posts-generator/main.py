@@ -6,56 +6,62 @@ Generate daily MDX blog posts for Finnish language learners using Gemini AI.
 """
 
 import click
+import time
 from datetime import datetime, timedelta
 from pathlib import Path
-from typing import Optional
-import time
+from typing import Optional, Tuple
 
-import re
-
-from src.config import OUTPUT_DIR, IMAGES_DIR
+from src.config import OUTPUT_DIR, IMAGES_DIR, MANIFEST_FILE, IMAGE_DUPLICATE_DISTANCE
 
 from src.topic_manager import TopicManager
-from src.blog_generator import generate_topic_suggestion, generate_blog_post
-from src.image_generator import generate_blog_header_image, parse_image_markers, generate_blog_images, generate_image
-from src.mdx_formatter import create_mdx_file, preview_post
+from src.blog_generator import generate_topic_suggestion
+from src.image_generator import generate_image
+from src.image_encoder import is_image_variant
+from src.image_index import ImageIndex, load_image_index
+from src.post_manifest import rebuild_manifest
+from src.rerender import rerender_posts
+from src.corpus_stats import load_corpus_stats
+from src.date_calendar import DateCalendar
+from src.topic_store import open_topic_store
+from src.pipeline import run_serial, run_pipelined
+from src.rate_limiter import get_rate_limiter
+from src.client_registry import get_client_stats
+from src.response_cache import configure_response_cache, get_response_cache
+from src.image_store import ImageStore, configure_image_reuse, get_image_store
+from src.metrics import get_metrics
+from src.benchmarks import run_pipeline_benchmark, run_parser_benchmark, run_mdx_benchmark
+from src.journal import incomplete_dates, load_run_plan, save_run_plan, clear_run_plan
 
 
-def find_image_prompt_in_mdx(image_filename: str) -> Optional[str]:
+def find_image_prompt_in_mdx(image_filename: str, index: Optional[ImageIndex] = None) -> Optional[str]:
     """
-    Search all MDX files to find the alt text (prompt) for a given image filename.
+    Find the alt text (prompt) for a given image filename in the MDX files.
     
     Args:
         image_filename: The image filename (e.g., '2026-01-26-linnanmaki-img1.webp')
+        index: Already loaded image index (loaded and refreshed if not given)
     
     Returns:
         The alt text/prompt if found, None otherwise
     """
-    # Search all MDX files in OUTPUT_DIR
-    for mdx_file in OUTPUT_DIR.glob("*.mdx"):
-        content = mdx_file.read_text(encoding='utf-8')
-        
-        # Pattern to match: ![alt text](/blogs/images/filename)
-        # We need to escape special characters in filename for regex
-        escaped_filename = re.escape(image_filename)
-        pattern = rf'!\[([^\]]+)\]\([^)]*{escaped_filename}\)'
-        
-        match = re.search(pattern, content)
-        if match:
-            return match.group(1)
-    
-    return None
+    ref = (index or load_image_index()).lookup(image_filename)
+    return ref['alt'] if ref else None
 
 
 def list_all_images() -> list:
     """List all images in the images directory with their prompts."""
+    index = load_image_index()
     images = []
     for image_path in sorted(IMAGES_DIR.glob("*.webp")):
-        prompt = find_image_prompt_in_mdx(image_path.name)
+        if is_image_variant(image_path.name):
+            continue
+        ref = index.lookup(image_path.name)
         images.append({
             'filename': image_path.name,
             'path': image_path,
-            'prompt': prompt
+            'prompt': ref['alt'] if ref else None,
+            'post': ref['post'] if ref else None,
+            'line': ref['line'] if ref else None
         })
     return images
 
@@ -72,150 +78,149 @@ def cli():
 @cli.command()
 @click.option('--date', '-d', type=str, help='Target date (YYYY-MM-DD). Defaults to next available date.')
 @click.option('--topic', '-t', type=str, help='Force a specific topic instead of AI selection.')
-@click.option('--days', '-n', type=int, default=1, help='Number of posts to generate (consecutive days).')
+@click.option('--days', '-n', type=int, default=1, help='Number of posts to generate (on the next free dates).')
+@click.option('--weekdays', is_flag=True, help='Only schedule posts on Monday to Friday.')
 @click.option('--level', '-l', type=str, default='A1-A2', help='Finnish level (A1, A2, or A1-A2).')
 @click.option('--no-image', is_flag=True, help='Skip image generation.')
 @click.option('--dry-run', is_flag=True, help='Preview without saving files.')
+@click.option('--pipeline', is_flag=True, help='Overlap the next day\'s text generation with the current day\'s images.')
+@click.option('--image-workers', type=int, default=2, help='Posts whose images are generated concurrently in --pipeline mode.')
+@click.option('--stream', is_flag=True, help='Stream the post text and start each image as soon as its prompt arrives.')
+@click.option('--no-cache', is_flag=True, help='Do not read or write the model response cache.')
+@click.option('--refresh', is_flag=True, help='Ignore cached responses but store the new ones.')
+@click.option('--reuse-images', is_flag=True, help='Use an existing image instead of generating one when its prompt is near-identical.')
+@click.option('--metrics-file', type=click.Path(), hidden=True, help='Write per-stage latency samples to this JSON file.')
+@click.option('--resume', is_flag=True, help='Resume the last interrupted run, reusing already generated text and images.')
 def generate(
     date: Optional[str],
     topic: Optional[str],
     days: int,
+    weekdays: bool,
     level: str,
     no_image: bool,
-    dry_run: bool
+    dry_run: bool,
+    pipeline: bool,
+    image_workers: int,
+    stream: bool,
+    no_cache: bool,
+    refresh: bool,
+    reuse_images: bool,
+    metrics_file: Optional[str],
+    resume: bool
 ):
     """Generate one or more blog posts."""
+    configure_response_cache(enabled=not no_cache, refresh=refresh)
+    configure_image_reuse(enabled=reuse_images)
     topic_manager = TopicManager()
     
-    # Determine starting date
-    if date:
-        try:
-            start_date = datetime.strptime(date, '%Y-%m-%d')
-        except ValueError:
-            click.echo(f"❌ Invalid date format: {date}. Use YYYY-MM-DD.")
+    # Finish concept extractions left over from earlier runs in the background
+    pending_concepts = topic_manager.get_pending_concepts()
+    if pending_concepts:
+        click.echo(f"🧠 Extracting concepts for {len(pending_concepts)} pending topic(s) in the background")
+        topic_manager.schedule_concept_extraction()
+    
+    # Posts that were started but not finished; their journals are reused
+    resumable = set(incomplete_dates())
+    
+    planned = None
+    if resume:
+        plan = load_run_plan()
+        if plan:
+            date, days, level, no_image, topic = (
+                plan['date'], plan['days'], plan['level'], plan['no_image'], plan['topic']
+            )
+            planned = plan.get('schedule') or [
+                (datetime.strptime(date, '%Y-%m-%d') + timedelta(days=i)).strftime('%Y-%m-%d')
+                for i in range(days)
+            ]
+        elif resumable:
+            planned = sorted(resumable)
+        else:
+            click.echo("✅ Nothing to resume.")
             return
+        click.echo(f"♻️  Resuming interrupted run ({len(resumable)} unfinished post(s))")
+    
+    # Plan the whole schedule up front: the next free dates from the start date
+    if planned is not None:
+        # Only the planned posts that haven't been finished yet
+        dates = [d for d in planned if not topic_manager.is_date_used(d) or d in resumable]
     else:
-        # Get next available date
-        next_date_str = topic_manager.get_next_available_date()
-        start_date = datetime.strptime(next_date_str, '%Y-%m-%d')
+        start_date = None
+        if date:
+            try:
+                start_date = datetime.strptime(date, '%Y-%m-%d')
+            except ValueError:
+                click.echo(f"❌ Invalid date format: {date}. Use YYYY-MM-DD.")
+                return
+        dates = topic_manager.get_available_dates(
+            days, start_date, weekdays_only=weekdays, include=resumable
+        )
+    
+    if not dates:
+        click.echo("✅ Nothing to generate.")
+        if resume:
+            clear_run_plan()
+        topic_manager.wait_for_concepts()
+        return
     
-    click.echo(f"🚀 Generating {days} blog post(s) starting from {start_date.strftime('%Y-%m-%d')}")
+    click.echo(f"🚀 Generating {len(dates)} blog post(s): {dates[0]} → {dates[-1]}")
     click.echo(f"   Level: {level}")
     click.echo(f"   Image generation: {'❌ Disabled' if no_image else '✅ Enabled'}")
     click.echo(f"   Mode: {'🔍 DRY RUN' if dry_run else '💾 SAVE'}")
+    if weekdays:
+        click.echo("   Schedule: Monday to Friday only")
+    if pipeline:
+        click.echo(f"   Pipeline: ✅ Enabled ({image_workers} image worker(s))")
+    if stream:
+        click.echo("   Streaming: ✅ Images start while the text is generated")
+    click.echo(f"   Response cache: {'❌ Disabled' if no_cache else ('🔄 Refresh' if refresh else '✅ Enabled')}")
+    if reuse_images:
+        click.echo("   Image reuse: ✅ Near-identical prompts use an existing image")
     click.echo("")
     
-    generated_posts = []
+    schedule = list(enumerate(dates))
+    days = len(dates)
     
-    for i in range(days):
-        current_date = start_date + timedelta(days=i)
-        date_str = current_date.strftime('%Y-%m-%d')
-        
-        # Check if date is already used
-        if topic_manager.is_date_used(date_str):
-            click.echo(f"⚠️  Skipping {date_str} - already has a post")
-            continue
-        
-        click.echo(f"\n{'='*50}")
-        click.echo(f"📅 Generating post for {date_str} ({i+1}/{days})")
-        click.echo(f"{'='*50}")
-        
-        # Get topic
-        current_content_type = 'learning'  # default when topic is manually specified
-        if topic and i == 0:
-            # Use provided topic for first post only
-            current_topic = topic
-            current_category = None
-            click.echo(f"📝 Using specified topic: {current_topic}")
-        else:
-            click.echo("🤖 AI selecting topic...")
-            suggestion = generate_topic_suggestion(topic_manager)
-            current_topic = suggestion['topic']
-            current_category = suggestion.get('category')
-            current_content_type = suggestion.get('content_type', 'learning')
-            click.echo(f"   Topic: {current_topic}")
-            click.echo(f"   Category: {current_category}")
-            click.echo(f"   Content Type: {'📚 Learning' if current_content_type == 'learning' else '🏛️ Culture'}")
-            click.echo(f"   Brief: {suggestion.get('brief', '')[:100]}...")
-        
-        # Generate blog post
-        click.echo("\n✍️  Generating blog content...")
-        post_data = generate_blog_post(
-            topic=current_topic,
-            date=date_str,
-            category=current_category,
-            level=level,
-            content_type=current_content_type if not topic else 'learning'
-        )
-        
-        click.echo(f"   Title: {post_data['title']}")
-        click.echo(f"   Description: {post_data['description'][:80]}...")
-        click.echo(f"   Tags: {', '.join(post_data['tags'][:5])}")
-        
-        # Generate images
-        image_path = None
-        inline_images = {}
-        
-        if not no_image:
-            click.echo("\n🎨 Generating header image...")
-            image_prompt = post_data.get('image_prompt', '')
-            if image_prompt:
-                click.echo(f"   Prompt: {image_prompt[:80]}...")
-            
-            if not dry_run:
-                image_path = generate_blog_header_image(
-                    topic=current_topic,
-                    date=date_str,
-                    custom_prompt=image_prompt
-                )
-                if image_path:
-                    click.echo(f"   ✅ Header image saved: {image_path.name}")
-                else:
-                    click.echo("   ⚠️  Header image failed, continuing without it")
-                
-                # Parse and generate inline images
-                content = post_data.get('content', '')
-                markers = parse_image_markers(content)
-                
-                if markers:
-                    click.echo(f"\n🖼️  Generating {len(markers)} inline images...")
-                    slug = post_data.get('slug', 'post')
-                    inline_images = generate_blog_images(markers, date_str, slug)
-                    click.echo(f"   ✅ Generated {len(inline_images)} inline images")
-            else:
-                click.echo("   (Skipped in dry run mode)")
-        
-        # Save or preview
-        if dry_run:
-            click.echo("\n" + preview_post(post_data))
-        else:
-            # Create MDX file
-            click.echo("\n💾 Saving MDX file...")
-            output_path = create_mdx_file(post_data, image_path, inline_images)
-            click.echo(f"   ✅ Saved: {output_path.name}")
-            
-            # Record topic and date
-            topic_manager.record_topic(
-                topic=current_topic,
-                date=date_str,
-                category=current_category,
-                metadata={
-                    "title": post_data['title'],
-                    "level": level,
-                    "tags": post_data['tags']
-                }
-            )
-            
-            generated_posts.append({
-                "date": date_str,
-                "title": post_data['title'],
-                "file": output_path.name
-            })
-            
-        # Add delay to avoid rate limits
-        if i < days - 1:
-            click.echo("\n⏳ Waiting 15 seconds to avoid API rate limits...")
-            time.sleep(15)
+    if not dry_run:
+        save_run_plan({
+            "date": dates[0],
+            "days": days,
+            "level": level,
+            "no_image": no_image,
+            "topic": topic,
+            "schedule": dates
+        })
+    
+    run_options = dict(
+        schedule=schedule,
+        topic_manager=topic_manager,
+        level=level,
+        days=days,
+        topic=topic,
+        no_image=no_image,
+        dry_run=dry_run,
+        stream=stream,
+        echo=click.echo
+    )
+    if pipeline:
+        jobs = run_pipelined(image_workers=image_workers, **run_options)
+    else:
+        jobs = run_serial(**run_options)
+    
+    if not dry_run:
+        clear_run_plan()
+    
+    # Let queued concept extractions finish before exiting
+    topic_manager.wait_for_concepts()
+    
+    generated_posts = [
+        {
+            "date": job['date'],
+            "title": job['post_data']['title'],
+            "file": job['output_path'].name
+        }
+        for job in jobs if job['output_path']
+    ]
     
     # Summary
     click.echo(f"\n{'='*50}")
@@ -231,6 +236,44 @@ def generate(
         click.echo(f"\n📁 Output directory: {OUTPUT_DIR}")
     else:
         click.echo("\n(No posts generated in dry run mode)")
+    
+    # API usage
+    limiter_stats = get_rate_limiter().get_stats()
+    if limiter_stats:
+        click.echo("\n⏱️  API usage:")
+        for model, stats in limiter_stats.items():
+            click.echo(
+                f"   • {model}: {stats['requests']} requests, {stats['throttled']} throttled, "
+                f"{stats['waited_seconds']:.1f}s waiting"
+            )
+    
+    client_stats = get_client_stats()
+    if client_stats['clients_created']:
+        click.echo(
+            f"   • Client: {client_stats['clients_created']} created "
+            f"({client_stats['setup_seconds']:.2f}s setup), {client_stats['client_reuses']} reuses"
+        )
+        click.echo(
+            f"   • HTTP: {client_stats['http_requests']} requests over "
+            f"{client_stats['connections_opened']} connection(s), {client_stats['connections_reused']} reused"
+        )
+    
+    # Response cache
+    if not no_cache:
+        cache = get_response_cache()
+        cache.evict()
+        cache_stats = cache.get_stats()
+        click.echo(
+            f"\n🗄️  Response cache: {cache_stats['hits']} hits, {cache_stats['misses']} misses, "
+            f"{cache_stats['writes']} stored, {cache_stats['evicted']} evicted"
+        )
+    
+    if reuse_images:
+        store_stats = get_image_store().stats
+        click.echo(f"🖼️  Image store: {store_stats['reused']} reused, {store_stats['recorded']} generated")
+    
+    if metrics_file:
+        get_metrics().dump(Path(metrics_file))
 
 
 @cli.command()
@@ -238,7 +281,18 @@ def generate(
 @click.option('--clear', is_flag=True, help='Clear all topic history (use with caution!).')
 @click.option('--suggest', '-s', is_flag=True, help='Get an AI topic suggestion.')
 @click.option('--backfill-concepts', is_flag=True, help='Extract concepts for existing topics that don\'t have them.')
-def topics(list_topics: bool, clear: bool, suggest: bool, backfill_concepts: bool):
+@click.option('--batch-size', type=int, default=25, help='Topics per AI call when backfilling concepts.')
+@click.option('--workers', type=int, default=3, help='Concurrent AI calls when backfilling concepts.')
+@click.option('--drain', is_flag=True, help='Complete concept extractions still pending from earlier runs.')
+def topics(
+    list_topics: bool,
+    clear: bool,
+    suggest: bool,
+    backfill_concepts: bool,
+    batch_size: int,
+    workers: int,
+    drain: bool
+):
     """Manage topic history."""
     topic_manager = TopicManager()
     
@@ -248,21 +302,32 @@ def topics(list_topics: bool, clear: bool, suggest: bool, backfill_concepts: boo
             click.echo("✅ Topic history cleared.")
         return
     
+    if drain:
+        pending = topic_manager.get_pending_concepts()
+        if not pending:
+            click.echo("✅ No pending concept extractions.")
+            return
+        
+        click.echo(f"🧠 Extracting concepts for {len(pending)} pending topic(s)...")
+        updated = topic_manager.drain_pending_concepts(batch_size=batch_size)
+        left = len(topic_manager.get_pending_concepts())
+        click.echo(f"✅ Extracted concepts for {updated} topic(s).")
+        if left:
+            click.echo(f"⚠️  {left} topic(s) still pending, run --drain again later.")
+        return
+    
     if backfill_concepts:
         click.echo("🔄 Backfilling concepts for existing topics...")
-        details = topic_manager.topics_history.get("topic_details", {})
-        updated = 0
         
-        for topic, info in details.items():
-            if not info.get("concepts"):
-                click.echo(f"   📝 Extracting concepts for: {topic[:50]}...")
-                concepts = topic_manager.extract_concepts(topic, info.get("category"))
-                info["concepts"] = concepts
+        def report(results, remaining):
+            for topic, concepts in results.items():
+                click.echo(f"   📝 {topic[:50]}")
                 click.echo(f"      → {', '.join(concepts)}")
-                updated += 1
+            click.echo(f"   💾 Saved batch ({remaining} topic(s) left)")
+        
+        updated = topic_manager.backfill_concepts(batch_size=batch_size, workers=workers, on_batch=report)
         
         if updated > 0:
-            topic_manager._save_data()
             click.echo(f"\n✅ Updated {updated} topics with concepts.")
         else:
             click.echo("\n✅ All topics already have concepts.")
@@ -280,6 +345,8 @@ def topics(list_topics: bool, clear: bool, suggest: bool, backfill_concepts: boo
         click.echo(f"\n📝 Suggested Topic: {suggestion['topic']}")
         click.echo(f"   Category: {suggestion.get('category', 'N/A')}")
         click.echo(f"   Brief: {suggestion.get('brief', 'N/A')}")
+        if suggestion.get('rejected'):
+            click.echo(f"   ⚠️  Every suggestion was rejected, this one is the least overlapping: {suggestion['rejected']}")
         return
     
     if list_topics:
@@ -298,13 +365,14 @@ def topics(list_topics: bool, clear: bool, suggest: bool, backfill_concepts: boo
         else:
             click.echo("\n📭 No topics recorded yet.")
         
-        # Show available categories
-        available = topic_manager.get_available_categories()
-        click.echo(f"\n🎯 Unexplored categories ({len(available)}):")
-        for cat in available[:10]:
-            click.echo(f"   • {cat}")
-        if len(available) > 10:
-            click.echo(f"   ... and {len(available) - 10} more")
+        # Show category coverage, least covered first
+        coverage = topic_manager.get_category_coverage()
+        least_covered = topic_manager.get_least_covered_categories()
+        click.echo("\n🎯 Least covered categories:")
+        for cat in least_covered[:10]:
+            click.echo(f"   • {cat} ({coverage[cat]} posts)")
+        if len(least_covered) > 10:
+            click.echo(f"   ... and {len(least_covered) - 10} more")
         
         return
     
@@ -316,43 +384,265 @@ def topics(list_topics: bool, clear: bool, suggest: bool, backfill_concepts: boo
     click.echo(f"\n📊 Topic Summary:")
     click.echo(f"   Used topics: {len(used)}")
     click.echo(f"   Banned concepts: {len(banned)}")
-    click.echo(f"   Available categories: {len(available)}")
-    click.echo(f"\nUse --list to see all topics, --suggest for AI recommendation, or --backfill-concepts to extract concepts.")
+    click.echo(f"   Pending concept extractions: {len(topic_manager.get_pending_concepts())}")
+    click.echo(f"   Unexplored categories: {len(available)}")
+    click.echo(f"   Next content type: {topic_manager.get_next_content_type()}")
+    click.echo("\nUse --list to see all topics, --suggest for AI recommendation, --backfill-concepts to extract concepts, or --drain to finish pending extractions.")
 
 
 @cli.command()
-def status():
+@click.option('--refresh', is_flag=True, help='Re-check every post and image (after editing posts by hand).')
+@click.option('--months', type=int, default=6, help='Number of recent months to show.')
+def status(refresh: bool, months: int):
     """Show generator status and statistics."""
-    topic_manager = TopicManager()
+    stats = load_corpus_stats(full=refresh)
     
     click.echo("\n📊 Blog Post Generator Status")
     click.echo("=" * 40)
     
-    # Count existing posts
-    mdx_files = list(OUTPUT_DIR.glob("*.mdx"))
-    image_files = list(IMAGES_DIR.glob("*.png"))
+    click.echo(f"\n📝 Generated Posts: {len(stats.posts)}")
+    variants = sum(1 for name in stats.images if is_image_variant(name))
+    click.echo(f"🖼️  Generated Images: {len(stats.images) - variants} (+{variants} resized variants)")
     
-    click.echo(f"\n📝 Generated Posts: {len(mdx_files)}")
-    click.echo(f"🖼️  Generated Images: {len(image_files)}")
+    # Posts per month
+    per_month = stats.posts_per_month()
+    if per_month:
+        click.echo("\n🗓️  Posts per month:")
+        for month, count in list(per_month.items())[-months:]:
+            click.echo(f"   {month}: {count}")
     
-    # Topic stats
-    used_topics = topic_manager.get_used_topics()
-    available = topic_manager.get_available_categories()
+    # Images per post
+    per_post = stats.images_per_post()
+    if per_post:
+        total = sum(count * posts for count, posts in per_post.items())
+        click.echo(f"\n🖼️  Images per post: {total / len(stats.posts):.1f} on average")
+        for count, posts in per_post.items():
+            click.echo(f"   {count} images: {posts} posts")
+    
+    # Orphaned and missing images
+    orphaned = stats.orphaned_images()
+    missing = stats.missing_images()
+    click.echo(f"\n🔗 Orphaned images (not used by any post): {len(orphaned)}")
+    for name in orphaned[:5]:
+        click.echo(f"   • {name}")
+    click.echo(f"❓ Missing images: {sum(len(names) for names in missing.values())}")
+    for post_name, names in list(missing.items())[:5]:
+        click.echo(f"   • {post_name}: {len(names)} ({names[0]}{', ...' if len(names) > 1 else ''})")
     
-    click.echo(f"\n📚 Topics:")
-    click.echo(f"   Used: {len(used_topics)}")
-    click.echo(f"   Available categories: {len(available)}")
+    # Disk usage
+    click.echo("\n💾 Disk usage:")
+    for kind, total in sorted(stats.bytes_by_type().items()):
+        click.echo(f"   {kind}: {total['files']} files, {total['bytes'] / (1024 * 1024):.1f} MB")
     
-    # Next available date
-    next_date = topic_manager.get_next_available_date()
-    click.echo(f"\n📅 Next available date: {next_date}")
+    # Next available dates (only the date list is read, not the topic history)
+    calendar = DateCalendar(open_topic_store().load_dates())
+    next_dates = calendar.free_dates((datetime.now() + timedelta(days=1)).date(), 5)
+    click.echo(f"\n📅 Next available dates: {', '.join(next_dates)}")
     
     # Recent posts
-    if mdx_files:
-        recent = sorted(mdx_files, reverse=True)[:5]
+    recent = stats.recent_posts()
+    if recent:
         click.echo(f"\n📄 Recent posts:")
-        for f in recent:
-            click.echo(f"   • {f.name}")
+        for name in recent:
+            click.echo(f"   • {name}")
+
+
+@cli.command()
+@click.option('--workers', '-w', type=int, default=None, help='Processes reading the posts (default: CPU count).')
+def reindex(workers: Optional[int]):
+    """Rebuild the post manifest (index.json) from all MDX files."""
+    start = time.perf_counter()
+    entries = rebuild_manifest(workers=workers)
+    elapsed = time.perf_counter() - start
+    
+    words = sum(entry['word_count'] for entry in entries)
+    click.echo(f"✅ Indexed {len(entries)} posts ({words} words) in {elapsed:.2f}s")
+    click.echo(f"📁 Manifest: {MANIFEST_FILE}")
+
+
+@cli.command()
+@click.option('--file', '-f', 'filenames', multiple=True, help='Only re-render this post (repeatable).')
+@click.option('--workers', '-w', type=int, default=None, help='Processes rendering the posts (default: CPU count).')
+@click.option('--dry-run', is_flag=True, help='Only list the posts that would change.')
+def rerender(filenames: Tuple[str, ...], workers: Optional[int], dry_run: bool):
+    """Re-render existing posts with the current formatter (no model calls)."""
+    paths = None
+    if filenames:
+        paths = [OUTPUT_DIR / Path(name).name for name in filenames]
+        missing = [path.name for path in paths if not path.exists()]
+        if missing:
+            click.echo(f"❌ Post not found: {', '.join(missing)}")
+            return
+    
+    start = time.perf_counter()
+    results = rerender_posts(workers=workers, dry_run=dry_run, paths=paths)
+    elapsed = time.perf_counter() - start
+    
+    updated = [r for r in results if r['status'] == 'updated']
+    skipped = [r for r in results if r['status'] == 'skipped']
+    for result in updated:
+        click.echo(f"   {'would update' if dry_run else '✏️  updated'}: {result['file']}")
+    for result in skipped:
+        click.echo(f"   ⚠️  skipped {result['file']}: {result['reason']}")
+    
+    click.echo(
+        f"\n✅ {len(results)} posts in {elapsed:.2f}s: {len(updated)} {'to update' if dry_run else 'updated'}, "
+        f"{len(results) - len(updated) - len(skipped)} unchanged, {len(skipped)} skipped"
+    )
+
+
+@cli.group()
+def images():
+    """Inspect the generated images."""
+    pass
+
+
+@images.command('dedup')
+@click.option('--distance', type=int, default=IMAGE_DUPLICATE_DISTANCE, help='Bits (of 64) both perceptual hashes may differ by.')
+@click.option('--workers', '-w', type=int, default=None, help='Processes hashing images not in the store yet (default: CPU count).')
+def images_dedup(distance: int, workers: Optional[int]):
+    """Report identical and visually near-identical images."""
+    store = ImageStore()
+    start = time.perf_counter()
+    hashed = store.backfill(workers=workers)
+    groups = store.duplicates(max_distance=distance)
+    elapsed = time.perf_counter() - start
+    
+    click.echo(f"🔍 {len(store.images)} images ({hashed} newly hashed) in {elapsed:.2f}s")
+    if not groups:
+        click.echo("✅ No duplicate images")
+        return
+    
+    for group in groups:
+        kind = "identical" if group['exact'] else f"near-identical (distance ≤ {group['distance']})"
+        click.echo(f"\n🖼️  {len(group['images'])} {kind} images, {group['bytes'] / 1024:.0f} KB in copies:")
+        for name in group['images']:
+            if name in group['identical']:
+                click.echo(f"   • {name} (same bytes as {group['identical'][name]})")
+            else:
+                click.echo(f"   • {name}")
+            if group['prompts'][name]:
+                click.echo(f"     {group['prompts'][name][:100]}")
+    
+    copies = sum(len(group['images']) - 1 for group in groups)
+    total = sum(group['bytes'] for group in groups)
+    click.echo(f"\n📊 {len(groups)} group(s), {copies} copies, {total / 1024 / 1024:.1f} MB")
+    click.echo("   Use `generate --reuse-images` to reuse images for near-identical prompts.")
+
+
+@cli.group()
+def bench():
+    """Benchmarks against the local fake backend (no API key needed)."""
+    pass
+
+
+@bench.command('pipeline')
+@click.option('--days', '-n', type=int, default=10, help='Number of posts to generate.')
+@click.option('--pipeline', 'use_pipeline', is_flag=True, help='Benchmark the pipelined mode.')
+@click.option('--image-workers', type=int, default=2, help='Posts with concurrent image generation in --pipeline mode.')
+@click.option('--stream', is_flag=True, help='Benchmark streamed text generation.')
+@click.option('--text-latency', type=float, default=2.0, help='Fake seconds per text call.')
+@click.option('--image-latency', type=float, default=5.0, help='Fake seconds per image call.')
+@click.option('--error-rate', type=float, default=0.0, help='Share of fake calls failing with a 500.')
+@click.option('--rate-limit-rate', type=float, default=0.0, help='Share of fake calls failing with a 429.')
+@click.option('--text-rpm', type=int, default=600, help='Text model requests per minute budget.')
+@click.option('--image-rpm', type=int, default=600, help='Image model requests per minute budget.')
+@click.option('--keep-output', is_flag=True, help='Keep the generated files for inspection.')
+def bench_pipeline(
+    days: int,
+    use_pipeline: bool,
+    image_workers: int,
+    stream: bool,
+    text_latency: float,
+    image_latency: float,
+    error_rate: float,
+    rate_limit_rate: float,
+    text_rpm: int,
+    image_rpm: int,
+    keep_output: bool
+):
+    """Run `generate --days N` end-to-end and report throughput."""
+    mode = 'pipeline' if use_pipeline else 'serial'
+    click.echo(f"🏁 Benchmarking generate --days {days} ({mode}{', streamed' if stream else ''})")
+    click.echo(f"   Fake latency: text {text_latency}s, image {image_latency}s")
+    click.echo(f"   Injected errors: {error_rate:.0%} 500s, {rate_limit_rate:.0%} 429s")
+    
+    result = run_pipeline_benchmark(
+        days=days,
+        pipeline=use_pipeline,
+        image_workers=image_workers,
+        text_latency=text_latency,
+        image_latency=image_latency,
+        error_rate=error_rate,
+        rate_limit_rate=rate_limit_rate,
+        text_rpm=text_rpm,
+        image_rpm=image_rpm,
+        extra_args=['--stream'] if stream else None,
+        keep_output=keep_output
+    )
+    
+    if result['exit_code'] != 0:
+        click.echo(f"\n⚠️  generate exited with code {result['exit_code']}:")
+        click.echo(result['stderr'])
+    
+    click.echo(f"\n📝 Posts: {result['posts']} in {result['seconds']:.1f}s")
+    click.echo(f"🚀 Throughput: {result['posts_per_minute']:.2f} posts/minute")
+    if result['peak_rss_mb'] is not None:
+        click.echo(f"💾 Peak RSS: {result['peak_rss_mb']:.1f} MB")
+    else:
+        click.echo("💾 Peak RSS: not available on this platform")
+    
+    click.echo("\n⏱️  Stage latency (seconds):")
+    click.echo(f"   {'stage':<14}{'count':>7}{'p50':>9}{'p90':>9}{'p99':>9}")
+    for stage, stats in result['stages'].items():
+        click.echo(
+            f"   {stage:<14}{stats['count']:>7}{stats['p50']:>9.3f}{stats['p90']:>9.3f}{stats['p99']:>9.3f}"
+        )
+    
+    if result['output_dir']:
+        click.echo(f"\n📁 Output kept in: {result['output_dir']}")
+
+
+@bench.command('parser')
+@click.option('--sizes', default='10000,100000,1000000,4000000', help='Comma-separated response sizes in bytes.')
+@click.option('--repeats', type=int, default=5, help='Runs per size (the fastest is reported).')
+def bench_parser(sizes: str, repeats: int):
+    """Time the post response parser on synthetic responses of growing size."""
+    sizes_list = [int(size) for size in sizes.split(',') if size.strip()]
+    click.echo(f"🏁 Benchmarking the response parser ({repeats} runs per size)")
+    
+    results = run_parser_benchmark(sizes_list, repeats)
+    
+    click.echo(f"\n   {'bytes':>10}{'parse ms':>11}{'MB/s':>9}{'ns/byte':>9}{'legacy ms':>11}{'speedup':>9}")
+    for r in results:
+        click.echo(
+            f"   {r['bytes']:>10}{r['seconds'] * 1000:>11.3f}{r['mb_per_second']:>9.0f}"
+            f"{r['ns_per_byte']:>9.2f}{r['legacy_seconds'] * 1000:>11.3f}"
+            f"{r['legacy_seconds'] / r['seconds'] if r['seconds'] else 0:>8.1f}x"
+        )
+    
+    # Linear scaling keeps the time per byte flat as responses grow
+    if len(results) > 1:
+        growth = results[-1]['ns_per_byte'] / results[0]['ns_per_byte']
+        click.echo(f"\n📈 ns/byte at {results[-1]['bytes']} vs {results[0]['bytes']} bytes: {growth:.2f}x")
+
+
+@bench.command('mdx')
+@click.option('--posts', '-n', type=int, default=5000, help='Number of synthetic posts.')
+@click.option('--repeats', type=int, default=3, help='Runs over the corpus (the fastest is reported).')
+def bench_mdx(posts: int, repeats: int):
+    """Time the MDX body transforms on a synthetic corpus."""
+    click.echo(f"🏁 Benchmarking MDX rendering of {posts} synthetic posts ({repeats} runs)")
+    
+    result = run_mdx_benchmark(posts, repeats)
+    
+    click.echo(f"\n📝 Corpus: {result['posts']} posts, {result['bytes'] / 1e6:.1f} MB")
+    click.echo(f"🚀 Transform pipeline: {result['seconds']:.3f}s ({result['posts_per_second']:.0f} posts/s)")
+    click.echo(
+        f"🐢 Legacy renderer: {result['legacy_seconds']:.3f}s "
+        f"({result['legacy_seconds'] / result['seconds'] if result['seconds'] else 0:.1f}x slower)"
+    )
+    click.echo(f"♻️  Re-rendering the output: {result['rerender_seconds']:.3f}s (unchanged)")
 
 
 @cli.command('regenerate-image')
@@ -360,6 +650,8 @@ def status():
 @click.option('--list', '-l', 'list_images', is_flag=True, help='List all images and select which to regenerate.')
 def regenerate_image(filename: Optional[str], list_images: bool):
     """Regenerate one or more blog post images."""
+    # The existing image is faulty, so never reuse a cached one
+    configure_response_cache(refresh=True)
     
     if list_images:
         # Interactive mode: list all images and let user select
@@ -431,14 +723,16 @@ def regenerate_image(filename: Optional[str], list_images: bool):
             return
         
         # Find the prompt
-        prompt = find_image_prompt_in_mdx(filename)
+        ref = load_image_index().lookup(filename)
         
-        if not prompt:
+        if not ref:
             click.echo(f"❌ Could not find prompt for: {filename}")
             click.echo("   The image might not be referenced in any MDX file.")
             return
         
+        prompt = ref['alt']
         click.echo(f"\n🖼️  Image: {filename}")
+        click.echo(f"📄 Used in: {ref['post']} (line {ref['line']})")
         click.echo(f"📝 Prompt: {prompt}")
         
         if not click.confirm("\nRegenerate this image?"):
@@ -0,0 +1,334 @@
+"""
+Benchmarks for the Finnish Blog Post Generator.
+Run the generator end-to-end against the local fake backend and report throughput,
+or time single stages (like response parsing or MDX rendering) on synthetic input.
+"""
+
+import json
+import os
+import random
+import re
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from .config import BASE_DIR
+from .metrics import percentile
+from .response_parser import POST_SECTIONS, parse_sections
+from .mdx_formatter import create_image_markup, render_body
+
+
+def _children_peak_rss_mb() -> Optional[float]:
+    """Peak RSS of the finished child processes in MB, or None where `resource` doesn't exist (Windows)."""
+    try:
+        import resource
+    except ImportError:
+        return None
+    # The only child we ran is the generator. ru_maxrss is in bytes on macOS, kilobytes elsewhere
+    peak = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def run_pipeline_benchmark(
+    days: int,
+    pipeline: bool = False,
+    image_workers: int = 2,
+    text_latency: float = 2.0,
+    image_latency: float = 5.0,
+    error_rate: float = 0.0,
+    rate_limit_rate: float = 0.0,
+    text_rpm: int = 600,
+    image_rpm: int = 600,
+    extra_args: Optional[List[str]] = None,
+    keep_output: bool = False
+) -> Dict:
+    """
+    Run `main.py generate --days N` in a subprocess against the fake backend.
+
+    Output and data go to a temporary directory, so the real blog is never touched.
+
+    Args:
+        days: Number of posts to generate
+        pipeline: Use the pipelined generation mode
+        image_workers: Posts with concurrent image generation (pipeline mode)
+        text_latency: Fake seconds per text call
+        image_latency: Fake seconds per image call
+        error_rate: Share of fake calls failing with a 500
+        rate_limit_rate: Share of fake calls failing with a 429
+        text_rpm: Requests per minute budget for the text model
+        image_rpm: Requests per minute budget for the image model
+        extra_args: Additional arguments for `generate`
+        keep_output: Keep the temporary directory and report its path
+
+    Returns:
+        Dict with posts, seconds, posts_per_minute, peak_rss_mb (None where it can't be measured),
+        stages, exit_code and output_dir
+    """
+    work_dir = Path(tempfile.mkdtemp(prefix="blog-bench-"))
+    metrics_file = work_dir / "metrics.json"
+
+    env = dict(
+        os.environ,
+        FAKE_BACKEND="1",
+        FAKE_TEXT_LATENCY=str(text_latency),
+        FAKE_IMAGE_LATENCY=str(image_latency),
+        FAKE_ERROR_RATE=str(error_rate),
+        FAKE_RATE_LIMIT_RATE=str(rate_limit_rate),
+        TEXT_MODEL_RPM=str(text_rpm),
+        IMAGE_MODEL_RPM=str(image_rpm),
+        BLOG_OUTPUT_DIR=str(work_dir / "blogs"),
+        BLOG_DATA_DIR=str(work_dir / "data"),
+    )
+
+    command = [
+        sys.executable, str(BASE_DIR / "main.py"), "generate",
+        "--days", str(days),
+        "--date", "2030-01-01",
+        "--no-cache",
+        "--metrics-file", str(metrics_file),
+    ]
+    if pipeline:
+        command += ["--pipeline", "--image-workers", str(image_workers)]
+    command += extra_args or []
+
+    start = time.perf_counter()
+    completed = subprocess.run(command, env=env, capture_output=True, text=True)
+    seconds = time.perf_counter() - start
+
+    peak_rss_mb = _children_peak_rss_mb()
+
+    posts = len(list((work_dir / "blogs").glob("*.mdx")))
+    samples = {}
+    if metrics_file.exists():
+        with open(metrics_file, 'r', encoding='utf-8') as f:
+            samples = json.load(f)
+
+    stages = {
+        stage: {
+            "count": len(values),
+            "p50": percentile(values, 50),
+            "p90": percentile(values, 90),
+            "p99": percentile(values, 99),
+        }
+        for stage, values in samples.items()
+    }
+
+    if not keep_output:
+        for path in sorted(work_dir.rglob("*"), reverse=True):
+            path.rmdir() if path.is_dir() else path.unlink()
+        work_dir.rmdir()
+
+    return {
+        "posts": posts,
+        "seconds": seconds,
+        "posts_per_minute": posts / seconds * 60 if seconds else 0.0,
+        "peak_rss_mb": peak_rss_mb,
+        "stages": stages,
+        "exit_code": completed.returncode,
+        "stderr": completed.stderr[-2000:],
+        "output_dir": str(work_dir) if keep_output else None,
+    }
+
+
+def _legacy_extract_sections(text: str) -> Dict[str, str]:
+    """The per-section regex scans generate_blog_post used before parse_sections (baseline)."""
+    result = {}
+    for section in POST_SECTIONS:
+        pattern = rf'---{section}---\s*(.*?)(?=---[A-Z_]+---|---END---|$)'
+        match = re.search(pattern, text, re.DOTALL | re.IGNORECASE)
+        result[section] = match.group(1).strip() if match else ""
+    return result
+
+
+def synthetic_post_response(size: int) -> str:
+    """A post response in the ---SECTION--- format whose CONTENT makes it about `size` bytes long."""
+    paragraph = (
+        "## Kahvi in Practice\n\nFinns drink more *kahvi* than almost anyone. Try ordering: "
+        "**Yksi kahvi, kiitos!** - One coffee, please. --- Tip: say it with a smile.\n\n"
+        "[IMAGE:Warm illustration of a Finnish café]\n\n"
+        "| Finnish | English |\n|---------|---------|\n| kahvi | coffee |\n\n"
+    )
+    content = paragraph * max(1, size // len(paragraph))
+    return (
+        "---TITLE---\nKahvi! Finnish Coffee Culture\n\n"
+        "---SLUG---\nkahvi-finnish-coffee\n\n"
+        "---DESCRIPTION---\nLearn to order coffee in Finnish. Start today!\n\n"
+        "---TAGS---\nLearn Finnish, Finnish Language, kahvi\n\n"
+        "---IMAGE_PROMPT---\nA cozy café in Helsinki, no text in image\n\n"
+        "---IMAGE_ALT---\nFinnish café illustration\n\n"
+        f"---CONTENT---\n{content}\n---END---\n"
+    )
+
+
+def run_parser_benchmark(sizes: List[int], repeats: int = 5) -> List[Dict]:
+    """
+    Time parse_sections against the old per-section regex scans on synthetic responses.
+
+    Args:
+        sizes: Response sizes in bytes
+        repeats: Runs per size (the fastest one is reported)
+
+    Returns:
+        One dict per size with bytes, seconds, legacy_seconds, mb_per_second and ns_per_byte
+    """
+    results = []
+    for size in sizes:
+        text = synthetic_post_response(size)
+        if parse_sections(text).sections != {k: v for k, v in _legacy_extract_sections(text).items() if v}:
+            raise AssertionError(f"parse_sections disagrees with the legacy parser at {size} bytes")
+
+        timings = {}
+        for name, parse in (("new", parse_sections), ("legacy", _legacy_extract_sections)):
+            best = float("inf")
+            for _ in range(repeats):
+                start = time.perf_counter()
+                parse(text)
+                best = min(best, time.perf_counter() - start)
+            timings[name] = best
+
+        results.append({
+            "bytes": len(text),
+            "seconds": timings["new"],
+            "legacy_seconds": timings["legacy"],
+            "mb_per_second": len(text) / timings["new"] / 1e6 if timings["new"] else 0.0,
+            "ns_per_byte": timings["new"] / len(text) * 1e9,
+        })
+    return results
+
+
+
+def _legacy_render_body(
+    content: str,
+    inline_images: Dict[str, Path],
+    header_image_url: str,
+    header_alt: str
+) -> str:
+    """How create_mdx_file rendered the body before the transform pipeline (baseline)."""
+    for marker, img_path in inline_images.items():
+        description_match = re.search(r'\[IMAGE:([^\]]+)\]', marker)
+        alt_text = description_match.group(1).strip() if description_match else "Illustration"
+        content = content.replace(marker, create_image_markup(alt_text, f"/blogs/images/{img_path.name}"))
+
+    if header_image_url:
+        content = f"{create_image_markup(header_alt[:125], header_image_url)}\n\n{content}"
+
+    content = re.sub(
+        r'^>\s*💡\s*(?:Tip|Vinkki):\s*(.+?)$', r'<Callout type="tip">\n\1\n</Callout>',
+        content, flags=re.MULTILINE
+    )
+    content = re.sub(
+        r'^>\s*⚠️\s*(?:Note|Huom):\s*(.+?)$', r'<Callout type="warning">\n\1\n</Callout>',
+        content, flags=re.MULTILINE
+    )
+    content = re.sub(
+        r'^>\s*🇫🇮\s*(?:Cultural Note|Kulttuurivinkki):\s*(.+?)$',
+        r'<Callout type="info" title="Cultural Note">\n\1\n</Callout>',
+        content, flags=re.MULTILINE
+    )
+    return content
+
+
+def synthetic_corpus(posts: int, seed: int = 1) -> List[Dict]:
+    """
+    Generated-looking posts (content with image markers and callouts, plus image paths).
+
+    Returns:
+        One dict per post with content, inline_images, header_image_url and header_alt
+    """
+    rng = random.Random(seed)
+    words = ["sauna", "mökki", "kahvi", "pulla", "järvi", "metsä", "talvi", "kesä", "tori", "kirjasto"]
+    callouts = [
+        "> 💡 Tip: Say *{word}* slowly at first.",
+        "> ⚠️ Note: *{word}* changes form in the partitive.",
+        "> 🇫🇮 Cultural Note: Finns talk about {word} a lot in summer.",
+        "> Just a quote about {word}.",
+    ]
+    corpus = []
+    for n in range(posts):
+        word = rng.choice(words)
+        date = f"2030-{n % 12 + 1:02d}-{n % 28 + 1:02d}"
+        parts, markers = [f"# {word.capitalize()}! Finnish Basics Part {n}\n"], []
+        for i in range(rng.randint(4, 8)):
+            parts.append(
+                f"## Section {i + 1}: {word.capitalize()} in Practice\n\n"
+                + f"Finnish learners meet *{word}* in everyday conversations, so practise it. " * rng.randint(4, 10)
+                + "\n"
+            )
+            if rng.random() < 0.4:
+                marker = f"[IMAGE:Warm illustration of {word} scene {i + 1} in Finland]"
+                markers.append(marker)
+                parts.append(marker + "\n")
+            if rng.random() < 0.5:
+                parts.append(rng.choice(callouts).format(word=word) + "\n")
+            if rng.random() < 0.3:
+                parts.append(f"| Finnish | English |\n|---------|---------|\n| {word} | {word} |\n\n---\n")
+        corpus.append({
+            "content": "\n".join(parts),
+            "inline_images": {
+                marker: Path(f"{date}-{word}-{n}-img{i + 1}.webp") for i, marker in enumerate(markers)
+            },
+            "header_image_url": f"/blogs/images/{date}-header-{word}-{n}.webp",
+            "header_alt": f"Illustration of {word} for learning Finnish",
+        })
+    return corpus
+
+
+def run_mdx_benchmark(posts: int = 5000, repeats: int = 3) -> Dict:
+    """
+    Render a synthetic corpus with the transform pipeline and with the old
+    per-marker replaces and per-callout passes, then re-render the output.
+
+    Args:
+        posts: Number of synthetic posts
+        repeats: Runs over the corpus (the fastest is reported)
+
+    Returns:
+        Dict with posts, bytes, seconds, legacy_seconds, rerender_seconds and posts_per_second
+    """
+    corpus = synthetic_corpus(posts)
+
+    def render_all(render) -> List[str]:
+        return [
+            render(post["content"], post["inline_images"], post["header_image_url"], post["header_alt"])
+            for post in corpus
+        ]
+
+    rendered = render_all(render_body)
+    for post, new, old in zip(corpus, rendered, render_all(_legacy_render_body)):
+        if new != old:
+            raise AssertionError(f"Transform pipeline disagrees with the legacy renderer for {post['header_image_url']}")
+
+    # Re-rendering an existing body must be a no-op
+    rerender_posts = [dict(post, content=body) for post, body in zip(corpus, rendered)]
+    if [
+        render_body(post["content"], post["inline_images"], post["header_image_url"], post["header_alt"])
+        for post in rerender_posts
+    ] != rendered:
+        raise AssertionError("Re-rendering a rendered body changed it")
+
+    def best_of(run) -> float:
+        best = float("inf")
+        for _ in range(repeats):
+            start = time.perf_counter()
+            run()
+            best = min(best, time.perf_counter() - start)
+        return best
+
+    seconds = best_of(lambda: render_all(render_body))
+    legacy_seconds = best_of(lambda: render_all(_legacy_render_body))
+    rerender_seconds = best_of(lambda: [
+        render_body(post["content"], post["inline_images"], post["header_image_url"], post["header_alt"])
+        for post in rerender_posts
+    ])
+
+    return {
+        "posts": posts,
+        "bytes": sum(len(post["content"].encode("utf-8")) for post in corpus),
+        "seconds": seconds,
+        "legacy_seconds": legacy_seconds,
+        "rerender_seconds": rerender_seconds,
+        "posts_per_second": posts / seconds if seconds else 0.0,
+    }
@@ -3,36 +3,121 @@ Blog Post Generator using Gemini AI.
 Generates engaging Finnish language learning content.
 """
 
-from google import genai
 from google.genai import types
-from typing import Dict, List, Optional
+from types import SimpleNamespace
+from typing import Callable, Dict, List, Optional, Tuple
 import random
 import re
-import time
 from google.genai.errors import ClientError
 
 from .config import (
-    GEMINI_API_KEY, TEXT_MODEL, BLOG_SETTINGS, DEFAULT_LEVEL,
-    CONTENT_MIX, LEARNING_CATEGORIES, CULTURE_CATEGORIES
+    TEXT_MODEL, BLOG_SETTINGS, DEFAULT_LEVEL,
+    CONTENT_MIX, SUGGESTION_ATTEMPTS
 )
 from .topic_manager import TopicManager
+from .client_registry import get_client
+from .rate_limiter import get_rate_limiter, estimate_tokens, is_rate_limit_error
+from .response_cache import get_response_cache
+from .response_parser import parse_sections, parse_fields, StreamingSectionParser
+
+
+def _request_text(
+    client,
+    prompt: str,
+    config=None,
+    parser_factory: Optional[Callable[[], StreamingSectionParser]] = None
+):
+    """
+    One text request. With a parser factory the response is streamed: every chunk
+    is fed to a fresh parser as it arrives (so a retried request starts over).
+    """
+    if parser_factory is None:
+        return client.models.generate_content(model=TEXT_MODEL, contents=prompt, config=config)
+    
+    parser = parser_factory()
+    usage = None
+    for chunk in client.models.generate_content_stream(model=TEXT_MODEL, contents=prompt, config=config):
+        if chunk.text:
+            parser.feed(chunk.text)
+        # Token usage is reported on the last chunk
+        usage = getattr(chunk, "usage_metadata", None) or usage
+    return SimpleNamespace(text=parser.close(), usage_metadata=usage)
+
+
+def generate_grounded_content(
+    client,
+    prompt: str,
+    output_tokens: int,
+    parser_factory: Optional[Callable[[], StreamingSectionParser]] = None
+):
+    """
+    Generate text with Google Search grounding through the shared rate limiter.
+    Grounding is only dropped once the limiter has used up all its 429 retries.
+    
+    Args:
+        client: Gemini client
+        prompt: The prompt to send
+        output_tokens: Expected response size, used for the tokens-per-minute budget
+        parser_factory: Stream the response through a parser from this factory
+    
+    Returns:
+        (response, config) - the generate_content response (an object with .text
+        when streamed) and the cache config it was made with: "google_search", or
+        None after the fallback without grounding
+    """
+    limiter = get_rate_limiter()
+    tokens = estimate_tokens(prompt) + output_tokens
+    grounding = types.GenerateContentConfig(
+        tools=[types.Tool(google_search=types.GoogleSearch())]
+    )
+    
+    try:
+        return limiter.call(
+            TEXT_MODEL,
+            lambda: _request_text(client, prompt, grounding, parser_factory),
+            tokens=tokens
+        ), "google_search"
+    except ClientError as e:
+        if not is_rate_limit_error(e):
+            raise
+        print("⚠️ Rate limit budget exhausted with Google Search grounding. Falling back to standard generation without search...")
+        return limiter.call(
+            TEXT_MODEL,
+            lambda: _request_text(client, prompt, None, parser_factory),
+            tokens=tokens
+        ), None
+
+
+def cached_grounded_text(
+    client,
+    prompt: str,
+    output_tokens: int,
+    parser_factory: Optional[Callable[[], StreamingSectionParser]] = None
+) -> str:
+    """
+    generate_grounded_content through the response cache. A response that fell back
+    to generation without search is stored under that config, not "google_search",
+    so a later run asks again with grounding instead of replaying it.
+    """
+    cache = get_response_cache()
+    text = cache.get_text(cache.make_key(TEXT_MODEL, prompt, "google_search"))
+    if text is None:
+        response, config = generate_grounded_content(client, prompt, output_tokens, parser_factory)
+        text = response.text
+        if text:
+            cache.put_text(cache.make_key(TEXT_MODEL, prompt, config), text)
+    return text
 
 
-def get_client():
-    """Get the Gemini client."""
-    if not GEMINI_API_KEY:
-        raise ValueError("GEMINI_API_KEY not found. Please set it in your .env file.")
-    return genai.Client(api_key=GEMINI_API_KEY)
-
-
-
-
-
-def pick_content_type() -> str:
+def pick_content_type(topic_manager: Optional[TopicManager] = None) -> str:
     """
-    Randomly select whether the next post should be learning-focused or culture-focused,
+    Select whether the next post should be learning-focused or culture-focused,
     based on the configured CONTENT_MIX ratio (default 60% learning / 40% culture).
+    With a topic manager the type whose share of the history is behind the ratio is
+    picked; without one the choice is random.
     """
+    if topic_manager is not None:
+        return topic_manager.get_next_content_type()
     return "learning" if random.random() < CONTENT_MIX["learning"] else "culture"
 
 
@@ -43,18 +128,18 @@ def generate_topic_suggestion(topic_manager: TopicManager, content_type: Optiona
     
     Args:
         topic_manager: TopicManager instance
-        content_type: 'learning' or 'culture'. If None, randomly selected.
+        content_type: 'learning' or 'culture'. If None, the type behind CONTENT_MIX is used.
     
-    Returns dict with: topic, category, brief, content_type
+    Returns dict with: topic, category, brief, content_type, and rejected (why)
+    when every attempt was rejected and the least overlapping one is returned
     """
     client = get_client()
     
     if content_type is None:
-        content_type = pick_content_type()
+        content_type = pick_content_type(topic_manager)
     
     # Build category-specific guidance
     if content_type == "learning":
-        categories_list = LEARNING_CATEGORIES
         focus_instruction = """## CONTENT FOCUS: PRACTICAL LEARNING
 This post must be a PRACTICAL FINNISH LANGUAGE LEARNING article.
 Focus on teaching useful Finnish skills: grammar tips, vocabulary, pronunciation,
@@ -69,7 +154,6 @@ Good examples:
 - "Finnish vs English: Word Order Differences That Trip Up Beginners"
 """
     else:
-        categories_list = CULTURE_CATEGORIES
         focus_instruction = """## CONTENT FOCUS: CULTURE & LIFESTYLE
 This post should explore Finnish culture, traditions, travel, or lifestyle.
 Bring Finland to life with engaging stories, local insights, and hidden gems.
@@ -81,9 +165,18 @@ Good examples:
 - "Hidden Gems of Tampere: Beyond the Factory Museums"
 """
     
-    categories_str = '\n'.join(f'- {cat}' for cat in categories_list)
+    # Least covered categories first, with their post counts
+    coverage = topic_manager.get_category_coverage()
+    categories_list = topic_manager.get_least_covered_categories(content_type)
+    categories_str = '\n'.join(f'- {cat} ({coverage.get(cat, 0)} posts)' for cat in categories_list)
     
-    prompt = f"""You are a creative Finnish language & culture editor planning blog topics.
+    # Re-ask when the suggestion nearly duplicates a used topic or hits long-tail
+    # concepts that didn't fit in the prompt
+    avoid: List[str] = []
+    rejected: List[str] = []
+    candidates: List[Tuple[Dict, List, List[str], str]] = []
+    for attempt in range(SUGGESTION_ATTEMPTS):
+        prompt = f"""You are a creative Finnish language & culture editor planning blog topics.
 
 FIRST: Use Google Search to find CURRENT and TRENDING topics about Finland. Search for:
 - Recent Finnish news and events
@@ -93,7 +186,7 @@ FIRST: Use Google Search to find CURRENT and TRENDING topics about Finland. Sear
 
 {focus_instruction}
 
-{topic_manager.suggest_topic_prompt()}
+{topic_manager.suggest_topic_prompt(avoid, rejected, content_type)}
 
 Based on your research and the banned concepts above, SUGGEST A COMPLETELY NEW TOPIC from these categories:
 {categories_str}
@@ -114,39 +207,50 @@ TOPIC: [topic title - specific, catchy, and UNIQUE]
 CATEGORY: [category name]
 BRIEF: [2-3 sentence description of what the post will teach/cover]
 """
-    
-    try:
-        response = client.models.generate_content(
-            model=TEXT_MODEL,
-            contents=prompt,
-            config=types.GenerateContentConfig(
-                tools=[types.Tool(google_search=types.GoogleSearch())]
-            )
-        )
-    except ClientError as e:
-        if e.code == 429:
-            print("⚠️ Rate limit hit with Google Search grounding. Falling back to standard generation without search...")
-            # Fallback without search grounding
-            response = client.models.generate_content(
-                model=TEXT_MODEL,
-                contents=prompt
-            )
+        
+        # Not cached: a replayed suggestion would be the same one on every call
+        # (topics --suggest, or asking again after a rejection)
+        response, _ = generate_grounded_content(client, prompt, output_tokens=200)
+        text = response.text
+        
+        # Parse the response
+        fields = parse_fields(text)
+        if fields.problems():
+            print(f"Warning: topic suggestion {'; '.join(fields.problems())}")
+        
+        suggestion = {
+            "topic": fields.get("TOPIC", "Finnish Basics"),
+            "category": fields.get("CATEGORY", "General"),
+            "brief": fields.get("BRIEF"),
+            "content_type": content_type
+        }
+        
+        similar = topic_manager.find_similar_topics(suggestion['topic'])
+        covered = [] if similar else topic_manager.find_covered_concepts(suggestion['topic'], suggestion['brief'])
+        if not similar and not covered:
+            break
+        if similar:
+            previous, score = similar[0]
+            reason = f"near-duplicate of {previous} ({score:.0%})"
+            rejected.append(f"{suggestion['topic']} (too similar to: {previous})")
         else:
-            raise
-            
-    text = response.text
-    
-    # Parse the response
-    topic_match = re.search(r'TOPIC:\s*(.+?)(?:\n|$)', text)
-    category_match = re.search(r'CATEGORY:\s*(.+?)(?:\n|$)', text)
-    brief_match = re.search(r'BRIEF:\s*(.+?)(?:\n|$)', text, re.DOTALL)
+            reason = f"overlaps covered concepts ({', '.join(covered[:5])})"
+            avoid += [c for c in covered if c not in avoid]
+        candidates.append((suggestion, similar, covered, reason))
+        if attempt + 1 < SUGGESTION_ATTEMPTS:
+            print(f"Suggestion '{suggestion['topic']}' rejected: {reason}, asking again")
+    else:
+        # Every attempt was rejected: take one that only shares concepts over a
+        # near-duplicate, then the least overlapping one, and flag it for the caller
+        suggestion, _, _, reason = min(
+            candidates,
+            key=lambda c: (bool(c[1]), c[1][0][1] if c[1] else len(c[2]))
+        )
+        suggestion['rejected'] = reason
+        print(f"⚠️  WARNING: all {SUGGESTION_ATTEMPTS} topic suggestions were rejected, "
+              f"using '{suggestion['topic']}' anyway: {reason}")
     
-    return {
-        "topic": topic_match.group(1).strip() if topic_match else "Finnish Basics",
-        "category": category_match.group(1).strip() if category_match else "General",
-        "brief": brief_match.group(1).strip() if brief_match else "",
-        "content_type": content_type
-    }
+    return suggestion
 
 
 def generate_blog_post(
@@ -155,11 +259,17 @@ def generate_blog_post(
     category: Optional[str] = None,
     level: str = DEFAULT_LEVEL,
     custom_context: Optional[str] = None,
-    content_type: str = "learning"
+    content_type: str = "learning",
+    on_section: Optional[Callable[[str, str], None]] = None,
+    on_image_marker: Optional[Callable[[Dict[str, str]], None]] = None
 ) -> Dict[str, str]:
     """
     Generate a complete blog post using Gemini AI.
     
+    With on_section or on_image_marker the response is streamed, and they are
+    called as soon as each section / [IMAGE:...] marker is complete
+    (see StreamingSectionParser). Cached responses are not replayed through them.
+    
     Args:
         topic: The topic to write about
         date: Publication date (YYYY-MM-DD)
@@ -167,6 +277,8 @@ def generate_blog_post(
         level: Finnish level (A1, A2, or A1-A2)
         custom_context: Optional additional context
         content_type: 'learning' or 'culture' - determines content structure
+        on_section: Called as on_section(name, text) while streaming
+        on_image_marker: Called as on_image_marker({'marker', 'description'}) while streaming
     
     Returns:
         Dict with: title, content, description, tags, slug, image_prompt
@@ -382,39 +494,27 @@ Provide your response in this EXACT format:
 ---END---
 """
 
-    try:
-        response = client.models.generate_content(
-            model=TEXT_MODEL,
-            contents=prompt,
-            config=types.GenerateContentConfig(
-                tools=[types.Tool(google_search=types.GoogleSearch())]
-            )
-        )
-    except ClientError as e:
-        if e.code == 429:
-            print("⚠️ Rate limit hit with Google Search grounding. Falling back to standard generation without search...")
-            response = client.models.generate_content(
-                model=TEXT_MODEL,
-                contents=prompt
-            )
-        else:
-            raise
-            
-    text = response.text
+    parser_factory = None
+    if on_section or on_image_marker:
+        parser_factory = lambda: StreamingSectionParser(on_section, on_image_marker)
+    
+    text = cached_grounded_text(
+        client, prompt, output_tokens=settings['max_words'] * 2, parser_factory=parser_factory
+    )
     
-    # Parse the response
-    def extract_section(text: str, section: str) -> str:
-        pattern = rf'---{section}---\s*(.*?)(?=---[A-Z_]+---|---END---|$)'
-        match = re.search(pattern, text, re.DOTALL | re.IGNORECASE)
-        return match.group(1).strip() if match else ""
+    # Parse the response (the post can't be written without its content)
+    sections = parse_sections(text)
+    if sections.problems():
+        print(f"Warning: post response {'; '.join(sections.problems())}")
+    sections.require("CONTENT")
     
-    title = extract_section(text, "TITLE")
-    slug = extract_section(text, "SLUG")
-    description = extract_section(text, "DESCRIPTION")
-    tags_raw = extract_section(text, "TAGS")
-    image_prompt = extract_section(text, "IMAGE_PROMPT")
-    image_alt = extract_section(text, "IMAGE_ALT")
-    content = extract_section(text, "CONTENT")
+    title = sections.get("TITLE")
+    slug = sections.get("SLUG")
+    description = sections.get("DESCRIPTION")
+    tags_raw = sections.get("TAGS")
+    image_prompt = sections.get("IMAGE_PROMPT")
+    image_alt = sections.get("IMAGE_ALT")
+    content = sections.get("CONTENT")
     
     # Parse tags
     tags = [tag.strip().strip('"\'') for tag in tags_raw.split(',') if tag.strip()]
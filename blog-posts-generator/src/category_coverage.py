@@ -0,0 +1,83 @@
+"""
+Per-category post counts for topic selection.
+Kept incrementally from the recorded topics so the least covered categories
+(and content type) can be picked first.
+"""
+
+from typing import Dict, List, Optional
+
+from .config import TOPIC_CATEGORIES, LEARNING_CATEGORIES, CULTURE_CATEGORIES, CONTENT_MIX
+
+
+def split_category(category: Optional[str]) -> List[str]:
+    """
+    Map a recorded category to the configured categories it names.
+    Handles combined values like 'Travel and Tourism in Finland / Finnish Lifestyle and Society'
+    and stray markdown or casing from the model. Unknown names are dropped.
+    """
+    if not category:
+        return []
+    known = {name.lower(): name for name in TOPIC_CATEGORIES}
+    result = []
+    for part in category.split("/"):
+        name = known.get(part.strip().strip("*\"'").strip().lower())
+        if name and name not in result:
+            result.append(name)
+    return result
+
+
+class CategoryCoverage:
+    """Number of posts per configured category, updated as topics are recorded."""
+
+    def __init__(self):
+        self.counts: Dict[str, int] = {category: 0 for category in TOPIC_CATEGORIES}
+        self._topic_categories: Dict[str, List[str]] = {}
+
+    @classmethod
+    def from_history(cls, topic_details: Dict[str, Dict]) -> 'CategoryCoverage':
+        """Count the categories of all recorded topics in one pass."""
+        coverage = cls()
+        for topic, details in topic_details.items():
+            coverage.set_topic(topic, details.get("category"))
+        return coverage
+
+    def set_topic(self, topic: str, category: Optional[str]):
+        """Count a topic's category, replacing the one it was counted under before."""
+        for previous in self._topic_categories.pop(topic, []):
+            self.counts[previous] -= 1
+        categories = split_category(category)
+        for name in categories:
+            self.counts[name] += 1
+        if categories:
+            self._topic_categories[topic] = categories
+
+    def least_covered(self, categories: Optional[List[str]] = None) -> List[str]:
+        """
+        Categories ordered by post count, fewest first (ties keep the configured order).
+
+        Args:
+            categories: Subset to order (defaults to all TOPIC_CATEGORIES)
+        """
+        categories = categories or TOPIC_CATEGORIES
+        order = {name: i for i, name in enumerate(TOPIC_CATEGORIES)}
+        return sorted(categories, key=lambda name: (self.counts.get(name, 0), order.get(name, 0)))
+
+    def uncovered(self) -> List[str]:
+        """Categories without any post yet."""
+        return [name for name in TOPIC_CATEGORIES if self.counts[name] == 0]
+
+    def content_type_counts(self) -> Dict[str, int]:
+        """Posts per content type ('learning' / 'culture')."""
+        return {
+            "learning": sum(self.counts[name] for name in LEARNING_CATEGORIES),
+            "culture": sum(self.counts[name] for name in CULTURE_CATEGORIES),
+        }
+
+    def next_content_type(self) -> str:
+        """
+        The content type that keeps the history closest to CONTENT_MIX:
+        learning while its share (counting the next post) is below target, else culture.
+        """
+        counts = self.content_type_counts()
+        total = counts["learning"] + counts["culture"]
+        return "learning" if counts["learning"] < CONTENT_MIX["learning"] * (total + 1) else "culture"
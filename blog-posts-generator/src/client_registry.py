@@ -0,0 +1,118 @@
+"""
+Shared Gemini client for the whole process.
+One genai.Client with a pooled keep-alive HTTP connection, reused by every module.
+"""
+
+import threading
+import time
+from typing import Any, Callable, Dict, Optional
+
+import httpx
+from google import genai
+from google.genai import types
+
+from .config import GEMINI_API_KEY, HTTP_MAX_CONNECTIONS, HTTP_KEEPALIVE_SECONDS, FAKE_BACKEND
+
+
+_lock = threading.Lock()
+_client = None
+_client_factory: Optional[Callable[[], Any]] = None
+_seen_streams: Dict[int, Any] = {}
+_stats = {
+    "clients_created": 0,
+    "client_reuses": 0,
+    "setup_seconds": 0.0,
+    "http_requests": 0,
+    "connections_opened": 0,
+    "connections_reused": 0,
+}
+
+
+def _track_connection(response: httpx.Response):
+    """httpx response hook: count new vs. reused pooled connections."""
+    stream = response.extensions.get("network_stream")
+    with _lock:
+        _stats["http_requests"] += 1
+        if stream is None:
+            return
+        if id(stream) in _seen_streams:
+            _stats["connections_reused"] += 1
+        else:
+            # Keep a reference so the id can't be recycled by another stream
+            _seen_streams[id(stream)] = stream
+            _stats["connections_opened"] += 1
+
+
+def _create_client():
+    """Build a genai.Client backed by a keep-alive connection pool."""
+    if FAKE_BACKEND:
+        from .fake_backend import FakeClient
+        return FakeClient()
+
+    if not GEMINI_API_KEY:
+        raise ValueError("GEMINI_API_KEY not found. Please set it in your .env file.")
+
+    return genai.Client(
+        api_key=GEMINI_API_KEY,
+        http_options=types.HttpOptions(
+            client_args={
+                "limits": httpx.Limits(
+                    max_connections=HTTP_MAX_CONNECTIONS,
+                    max_keepalive_connections=HTTP_MAX_CONNECTIONS,
+                    keepalive_expiry=HTTP_KEEPALIVE_SECONDS
+                ),
+                "event_hooks": {"response": [_track_connection]},
+            }
+        )
+    )
+
+
+def get_client():
+    """
+    Get the shared Gemini client, creating it on first use.
+
+    The client (and its httpx connection pool) is thread-safe, so the pipeline's
+    worker threads all share it.
+    """
+    global _client
+
+    with _lock:
+        if _client is not None:
+            _stats["client_reuses"] += 1
+            return _client
+
+        start = time.perf_counter()
+        _client = (_client_factory or _create_client)()
+        _stats["setup_seconds"] += time.perf_counter() - start
+        _stats["clients_created"] += 1
+        return _client
+
+
+def set_client_factory(factory: Optional[Callable[[], Any]]):
+    """
+    Replace how the shared client is built, e.g. to inject a fake client in tests.
+    Pass None to go back to the real Gemini client. The cached client is dropped.
+
+    Args:
+        factory: Zero-argument callable returning an object with a genai.Client-like `models` API
+    """
+    global _client_factory
+
+    with _lock:
+        _client_factory = factory
+    reset_client()
+
+
+def reset_client():
+    """Drop the cached client so the next get_client() builds a new one."""
+    global _client
+
+    with _lock:
+        _client = None
+        _seen_streams.clear()
+
+
+def get_client_stats() -> Dict:
+    """Client reuse counts, client setup time and HTTP connection reuse counts."""
+    with _lock:
+        return dict(_stats)
@@ -0,0 +1,169 @@
+"""
+Index of the concepts covered by previous topics.
+Ranks concepts by frequency and recency so topic prompts can carry a bounded
+top-K list, and matches the long tail locally against new suggestions.
+"""
+
+import re
+from datetime import datetime
+from typing import Dict, List, Optional, Set, Tuple
+
+from .config import CONCEPT_PROMPT_TOKEN_BUDGET, CONCEPT_RECENCY_HALF_LIFE_DAYS
+from .rate_limiter import estimate_tokens
+
+
+# A concept used by the newest post scores like one extra occurrence times this weight
+RECENCY_WEIGHT = 2.0
+
+
+def _days_between(earlier: str, later: str) -> int:
+    try:
+        return (datetime.strptime(later, "%Y-%m-%d") - datetime.strptime(earlier, "%Y-%m-%d")).days
+    except (TypeError, ValueError):
+        return 0
+
+
+class ConceptIndex:
+    """
+    Concept -> topics using it, maintained incrementally as topics get concepts.
+
+    Scores are `frequency + RECENCY_WEIGHT * 0.5 ** (age / half_life)`, where age is
+    counted in days back from the newest post, so the ranking (and the prompt built
+    from it) only changes when the history does.
+    """
+
+    def __init__(self, half_life_days: int = CONCEPT_RECENCY_HALF_LIFE_DAYS):
+        self.half_life_days = half_life_days
+        self._topic_concepts: Dict[str, Tuple[List[str], str]] = {}
+        self._concept_topics: Dict[str, Dict[str, str]] = {}
+        self._ranked: Optional[List[str]] = None
+        self._patterns: Dict[str, re.Pattern] = {}
+
+    @classmethod
+    def from_history(cls, topic_details: Dict[str, Dict]) -> 'ConceptIndex':
+        """Build the index from TopicManager's topic_details in one pass."""
+        index = cls()
+        for topic, details in topic_details.items():
+            index.set_topic(topic, details.get("concepts", []), details.get("date") or "")
+        return index
+
+    def __len__(self) -> int:
+        return len(self._concept_topics)
+
+    @property
+    def concepts(self) -> List[str]:
+        """All indexed concepts in alphabetical order."""
+        return sorted(self._concept_topics)
+
+    def set_topic(self, topic: str, concepts: List[str], date: str):
+        """Add a topic's concepts, replacing whatever was indexed for it before."""
+        previous, _ = self._topic_concepts.pop(topic, ([], ""))
+        for concept in previous:
+            topics = self._concept_topics.get(concept, {})
+            topics.pop(topic, None)
+            if not topics:
+                self._concept_topics.pop(concept, None)
+
+        if concepts:
+            self._topic_concepts[topic] = (list(concepts), date)
+            for concept in concepts:
+                self._concept_topics.setdefault(concept, {})[topic] = date
+        self._ranked = None
+
+    def _score(self, concept: str, newest: str) -> float:
+        dates = self._concept_topics[concept].values()
+        age = _days_between(max(dates), newest)
+        return len(dates) + RECENCY_WEIGHT * 0.5 ** (max(age, 0) / self.half_life_days)
+
+    def ranked(self) -> List[str]:
+        """All concepts, highest score first (cached until the index changes)."""
+        if self._ranked is None:
+            newest = max((date for _, date in self._topic_concepts.values()), default="")
+            self._ranked = sorted(
+                self._concept_topics,
+                key=lambda concept: (-self._score(concept, newest), concept)
+            )
+        return self._ranked
+
+    def top_concepts(self, token_budget: int = CONCEPT_PROMPT_TOKEN_BUDGET) -> List[str]:
+        """
+        The highest scoring concepts whose comma-separated list fits the token budget.
+
+        Args:
+            token_budget: Maximum estimated tokens for the list
+
+        Returns:
+            Concepts in score order
+        """
+        selected = []
+        used = 0
+        for concept in self.ranked():
+            cost = estimate_tokens(f"{concept}, ")
+            if used + cost > token_budget:
+                break
+            selected.append(concept)
+            used += cost
+        return selected
+
+    def _pattern(self, concept: str) -> re.Pattern:
+        pattern = self._patterns.get(concept)
+        if pattern is None:
+            words = [re.escape(word) for word in concept.split()]
+            pattern = re.compile(r'(?<!\w)' + r'\s+'.join(words) + r'(?!\w)', re.IGNORECASE)
+            self._patterns[concept] = pattern
+        return pattern
+
+    def find_matches(self, text: str, exclude: Optional[Set[str]] = None) -> List[str]:
+        """
+        Concepts that appear as whole words in a text (e.g. a suggested title and brief).
+
+        Args:
+            text: Text to check
+            exclude: Concepts to skip, e.g. the ones already given to the model
+
+        Returns:
+            Matching concepts in score order
+        """
+        exclude = exclude or set()
+        return [
+            concept for concept in self.ranked()
+            if concept not in exclude and self._pattern(concept).search(text)
+        ]
+
+    def find_overlapping_topics(
+        self,
+        title: str,
+        text: str = "",
+        exclude: Optional[Set[str]] = None,
+        min_matches: int = 2
+    ) -> Dict[str, List[str]]:
+        """
+        Previous topics that share several concepts with a suggested title and text.
+
+        Single shared words ("beginner", "phrases") are common between unrelated
+        topics, so a topic only counts when at least `min_matches` of its concepts
+        appear and at least one of them is in the title and not excluded.
+
+        Args:
+            title: Suggested topic title
+            text: More text of the suggestion (e.g. its brief)
+            exclude: Concepts that don't count as the title match (e.g. the ones
+                already banned in the prompt, which the model was told about)
+            min_matches: Concepts a topic must share to count
+
+        Returns:
+            Dict mapping each overlapping topic to its matching concepts
+        """
+        in_title = set(self.find_matches(title, exclude=exclude))
+        if not in_title:
+            return {}
+
+        by_topic: Dict[str, List[str]] = {}
+        for concept in self.find_matches(f"{title}\n{text}"):
+            for topic in self._concept_topics[concept]:
+                by_topic.setdefault(topic, []).append(concept)
+
+        return {
+            topic: concepts for topic, concepts in by_topic.items()
+            if len(concepts) >= min_matches and in_title.intersection(concepts)
+        }
@@ -13,24 +13,101 @@ load_dotenv()
 BASE_DIR = Path(__file__).parent.parent
 # Go up one more level from BASE_DIR (blog-posts-generator) to project root, then to public/blogs
 PROJECT_ROOT = BASE_DIR.parent
-OUTPUT_DIR = PROJECT_ROOT / "public" / "blogs"
-DATA_DIR = BASE_DIR / "data"
+# BLOG_OUTPUT_DIR / BLOG_DATA_DIR redirect all output, e.g. for benchmarks
+OUTPUT_DIR = Path(os.getenv("BLOG_OUTPUT_DIR", PROJECT_ROOT / "public" / "blogs"))
+DATA_DIR = Path(os.getenv("BLOG_DATA_DIR", BASE_DIR / "data"))
 # Images go into a subfolder as requested
 IMAGES_DIR = OUTPUT_DIR / "images"
 
 # Ensure directories exist
 OUTPUT_DIR.mkdir(parents=True, exist_ok=True)
-DATA_DIR.mkdir(exist_ok=True)
+DATA_DIR.mkdir(parents=True, exist_ok=True)
 IMAGES_DIR.mkdir(exist_ok=True)
 
 # API Configuration
 GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
 
+# Local stand-in backend instead of the real API (FAKE_BACKEND=1, no API key needed)
+FAKE_BACKEND = os.getenv("FAKE_BACKEND", "") == "1"
+FAKE_TEXT_LATENCY = float(os.getenv("FAKE_TEXT_LATENCY", "2.0"))  # seconds per text call
+FAKE_IMAGE_LATENCY = float(os.getenv("FAKE_IMAGE_LATENCY", "5.0"))  # seconds per image call
+FAKE_ERROR_RATE = float(os.getenv("FAKE_ERROR_RATE", "0"))  # share of calls failing with a 500
+FAKE_RATE_LIMIT_RATE = float(os.getenv("FAKE_RATE_LIMIT_RATE", "0"))  # share of calls failing with a 429
+
 # Model settings
 TEXT_MODEL = "gemini-2.0-flash"
 IMAGE_MODEL = "imagen-4.0-generate-001"
 IMAGE_ASPECT_RATIO = "16:9"
 
+# API quotas per model: requests per minute (rpm) and tokens per minute (tpm, 0 = unlimited)
+# Override with env vars to match your project's quota tier
+RATE_LIMITS = {
+    TEXT_MODEL: {
+        "rpm": int(os.getenv("TEXT_MODEL_RPM", "15")),
+        "tpm": int(os.getenv("TEXT_MODEL_TPM", "1000000")),
+    },
+    IMAGE_MODEL: {
+        "rpm": int(os.getenv("IMAGE_MODEL_RPM", "10")),
+        "tpm": 0,
+    },
+}
+# How many times a call is retried after a 429 before giving up
+RATE_LIMIT_RETRIES = 5
+
+# Maximum number of images generated at the same time for a single post
+IMAGE_WORKERS = int(os.getenv("IMAGE_WORKERS", "4"))
+
+# WebP encoding: widths emitted next to the full-size image (for srcset), run on a process pool
+IMAGE_VARIANT_WIDTHS = [480, 960, 1600]
+IMAGE_WEBP_QUALITY = 85
+IMAGE_ENCODER_PROCESSES = int(os.getenv("IMAGE_ENCODER_PROCESSES", str(max(1, (os.cpu_count() or 2) // 2))))
+# Width and height of every encoded image and its variants
+IMAGE_VARIANTS_FILE = DATA_DIR / "image_variants.json"
+# Image filename -> alt text/post/line index used by regenerate-image
+IMAGE_INDEX_FILE = DATA_DIR / "image_index.json"
+# `sizes` attribute for inline images (the post body is at most 896px wide)
+IMAGE_SIZES = "(max-width: 896px) 100vw, 896px"
+# Content hash, perceptual hashes (dHash/pHash) and prompt of every full-size image
+IMAGE_STORE_FILE = DATA_DIR / "image_store.json"
+# Prompt similarity (0-1) at which `generate --reuse-images` uses a stored image instead of calling Imagen
+IMAGE_REUSE_THRESHOLD = float(os.getenv("IMAGE_REUSE_THRESHOLD", "0.9"))
+# Bits (of 64) by which both perceptual hashes of two images may differ to count as near-duplicates
+IMAGE_DUPLICATE_DISTANCE = int(os.getenv("IMAGE_DUPLICATE_DISTANCE", "6"))
+
+# Manifest of all posts (frontmatter, image refs, word count, hash), kept up to date by create_mdx_file
+MANIFEST_FILE = OUTPUT_DIR / "index.json"
+
+# Cached post/image statistics for the status command
+CORPUS_STATS_FILE = DATA_DIR / "corpus_stats.json"
+
+# Shared HTTP connection pool for the Gemini client
+HTTP_MAX_CONNECTIONS = 20
+HTTP_KEEPALIVE_SECONDS = 60
+
+# On-disk cache for model responses (text and raw image bytes)
+CACHE_DIR = DATA_DIR / "cache"
+CACHE_MAX_BYTES = 500 * 1024 * 1024  # 500 MB
+CACHE_MAX_AGE_DAYS = 30
+
+# Topic history storage: 'sharded' (the default: data/topics/index.json with titles, dates and
+# concepts, an append-only index.log, plus one details file per year) or 'sqlite' (data/topics.db
+# in WAL mode). Both migrate the original topics_history.json + dates_used.json on first use
+TOPIC_STORE = os.getenv("TOPIC_STORE", "sharded")
+TOPIC_DB_FILE = DATA_DIR / "topics.db"
+TOPIC_SHARDS_DIR = DATA_DIR / "topics"
+
+# Banned concepts in topic prompts: the top concepts (by frequency and recency) that fit the
+# token budget go into the prompt, the long tail is matched locally against each suggestion
+CONCEPT_PROMPT_TOKEN_BUDGET = int(os.getenv("CONCEPT_PROMPT_TOKEN_BUDGET", "300"))
+CONCEPT_RECENCY_HALF_LIFE_DAYS = 60
+# Suggestions whose title overlaps a used topic (title + concepts) at least this much are near-duplicates
+TOPIC_SIMILARITY_THRESHOLD = 0.6
+# How often a topic suggestion is re-asked when it overlaps already covered concepts
+SUGGESTION_ATTEMPTS = 3
+
+# Checkpoint journals of posts that are being generated (for generate --resume)
+JOURNAL_DIR = DATA_DIR / "journal"
+
 # Illustration style for consistent image generation
 ILLUSTRATION_STYLE = """High-quality digital vector art. Flat aesthetic with clean shapes and soft, harmonious colors. 
 Minimalist and modern. 
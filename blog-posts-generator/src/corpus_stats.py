@@ -0,0 +1,208 @@
+"""
+Cached statistics about the generated posts and images, for the status command.
+Updated whenever a post or image is written; a status call only lists the two
+output directories to pick up files that were added or removed by hand.
+"""
+
+import json
+import os
+import threading
+from collections import Counter
+from pathlib import Path
+from typing import Dict, Iterable, List
+
+from .config import OUTPUT_DIR, IMAGES_DIR, CORPUS_STATS_FILE
+from .image_encoder import is_image_variant
+from .post_manifest import build_entry
+from .output_writer import is_temp_file, locked_file, write_json
+
+
+STATS_VERSION = 1
+
+_thread_lock = threading.Lock()
+
+
+def _post_record(mdx_path: Path, entry: Dict) -> Dict:
+    stat = mdx_path.stat()
+    return {
+        'date': entry['date'],
+        'images': entry['images'],
+        'size': stat.st_size,
+        'mtime_ns': stat.st_mtime_ns
+    }
+
+
+class CorpusStats:
+    """
+    Per-post (date, image refs, size) and per-image (size) records in one JSON file.
+
+    Everything `status` reports is aggregated from these records, so it never
+    has to open a post or stat an image that is already known.
+    """
+
+    def __init__(
+        self,
+        output_dir: Path = OUTPUT_DIR,
+        images_dir: Path = IMAGES_DIR,
+        stats_file: Path = CORPUS_STATS_FILE
+    ):
+        self.output_dir = output_dir
+        self.images_dir = images_dir
+        self.stats_file = stats_file
+        self.lock_file = stats_file.with_name(".stats.lock")
+        self.posts: Dict[str, Dict] = {}
+        self.images: Dict[str, int] = {}
+
+    def _locked(self):
+        return locked_file(self.lock_file, _thread_lock)
+
+    def _read(self):
+        self.posts, self.images = {}, {}
+        if not self.stats_file.exists():
+            return
+        try:
+            with open(self.stats_file, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, json.JSONDecodeError):
+            return
+        if data.get('version') == STATS_VERSION and data.get('output_dir') == str(self.output_dir):
+            self.posts = data.get('posts', {})
+            self.images = data.get('images', {})
+
+    def _write(self):
+        write_json(self.stats_file, {
+            'version': STATS_VERSION,
+            'output_dir': str(self.output_dir),
+            'posts': self.posts,
+            'images': self.images
+        }, indent=None)
+
+    def record_post(self, mdx_path: Path, entry: Dict):
+        """
+        Store a post that was just written.
+
+        Args:
+            mdx_path: Path to the MDX file
+            entry: Its manifest entry (see post_manifest.build_entry)
+        """
+        with self._locked():
+            self._read()
+            self.posts[mdx_path.name] = _post_record(mdx_path, entry)
+            self._write()
+
+    def record_images(self, image_paths: Iterable[Path]):
+        """Store image files that were just written (a full-size image and its variants)."""
+        with self._locked():
+            self._read()
+            for path in image_paths:
+                self.images[path.name] = path.stat().st_size
+            self._write()
+
+    def refresh(self, full: bool = False) -> 'CorpusStats':
+        """
+        Bring the records up to date with the output directories.
+
+        Only the directory listings are read: new files are scanned, removed ones dropped.
+
+        Args:
+            full: Also re-check the size and mtime of every known post and image
+                  (picks up posts edited in place by hand)
+        """
+        with self._locked():
+            self._read()
+            changed = False
+
+            post_names = {entry.name for entry in os.scandir(self.output_dir) if entry.name.endswith('.mdx')}
+            for name in set(self.posts) - post_names:
+                del self.posts[name]
+                changed = True
+            for name in sorted(post_names):
+                cached = self.posts.get(name)
+                if cached and not full:
+                    continue
+                path = self.output_dir / name
+                if cached:
+                    stat = path.stat()
+                    if cached['mtime_ns'] == stat.st_mtime_ns and cached['size'] == stat.st_size:
+                        continue
+                self.posts[name] = _post_record(path, build_entry(path))
+                changed = True
+
+            image_entries = {
+                entry.name: entry for entry in os.scandir(self.images_dir)
+                if entry.is_file() and not is_temp_file(entry.name)
+            }
+            for name in set(self.images) - set(image_entries):
+                del self.images[name]
+                changed = True
+            for name, entry in image_entries.items():
+                if name in self.images and not full:
+                    continue
+                size = entry.stat().st_size
+                if self.images.get(name) != size:
+                    self.images[name] = size
+                    changed = True
+
+            if changed:
+                self._write()
+        return self
+
+    def posts_per_month(self) -> Dict[str, int]:
+        """Number of posts per YYYY-MM, oldest month first."""
+        months = Counter(post['date'][:7] for post in self.posts.values() if post['date'])
+        return dict(sorted(months.items()))
+
+    def images_per_post(self) -> Dict[int, int]:
+        """How many posts reference how many images (header included)."""
+        return dict(sorted(Counter(len(post['images']) for post in self.posts.values()).items()))
+
+    def orphaned_images(self) -> List[str]:
+        """Full-size images on disk that no post references."""
+        referenced = {name for post in self.posts.values() for name in post['images']}
+        return sorted(name for name in self.images if not is_image_variant(name) and name not in referenced)
+
+    def missing_images(self) -> Dict[str, List[str]]:
+        """Images referenced by a post but not on disk, by post."""
+        missing = {}
+        for post_name, post in self.posts.items():
+            names = [name for name in post['images'] if name not in self.images]
+            if names:
+                missing[post_name] = names
+        return dict(sorted(missing.items()))
+
+    def bytes_by_type(self) -> Dict[str, Dict[str, int]]:
+        """Files and bytes on disk per asset type ('posts', 'images', 'image variants', ...)."""
+        totals: Dict[str, Dict[str, int]] = {}
+
+        def add(kind: str, size: int):
+            total = totals.setdefault(kind, {'files': 0, 'bytes': 0})
+            total['files'] += 1
+            total['bytes'] += size
+
+        for post in self.posts.values():
+            add('posts (.mdx)', post['size'])
+        for name, size in self.images.items():
+            if is_image_variant(name):
+                add('image variants', size)
+            else:
+                add(f"images ({os.path.splitext(name)[1] or 'no extension'})", size)
+        return totals
+
+    def recent_posts(self, count: int = 5) -> List[str]:
+        """The newest posts by date."""
+        return sorted(self.posts, key=lambda name: (self.posts[name]['date'], name), reverse=True)[:count]
+
+
+def load_corpus_stats(full: bool = False) -> CorpusStats:
+    """Load the cached statistics and pick up files added or removed outside the generator."""
+    return CorpusStats().refresh(full)
+
+
+def record_post(mdx_path: Path, entry: Dict):
+    """Update the statistics for a post that was just written."""
+    CorpusStats().record_post(mdx_path, entry)
+
+
+def record_images(image_paths: Iterable[Path]):
+    """Update the statistics for image files that were just written."""
+    CorpusStats().record_images(image_paths)
@@ -0,0 +1,84 @@
+"""
+Calendar of publication dates that already have a post.
+Keeps the used dates as a set (membership) plus a sorted list (gap queries with bisect).
+"""
+
+import bisect
+from datetime import date as Date, timedelta
+from typing import Iterable, List, Optional, Set
+
+
+DATE_FORMAT = "%Y-%m-%d"
+
+
+class DateCalendar:
+    """Used dates as YYYY-MM-DD strings, which sort chronologically."""
+
+    def __init__(self, dates: Iterable[str] = ()):
+        self._used: Set[str] = set(dates)
+        self._sorted: List[str] = sorted(self._used)
+
+    def __contains__(self, date: str) -> bool:
+        return date in self._used
+
+    def __len__(self) -> int:
+        return len(self._used)
+
+    @property
+    def dates(self) -> List[str]:
+        """All used dates in order."""
+        return list(self._sorted)
+
+    def add(self, date: str):
+        """Mark a date as used."""
+        if date not in self._used:
+            self._used.add(date)
+            bisect.insort(self._sorted, date)
+
+    def clear(self):
+        self._used.clear()
+        self._sorted.clear()
+
+    def free_dates(
+        self,
+        start: Date,
+        count: int,
+        weekdays_only: bool = False,
+        include: Optional[Set[str]] = None
+    ) -> List[str]:
+        """
+        The first `count` free dates on or after `start`.
+
+        Walks the calendar and the sorted used dates side by side, so the cost is
+        O(log n) to find the start plus the length of the returned span.
+
+        Args:
+            start: First date to consider
+            count: Number of dates to return
+            weekdays_only: Skip Saturdays and Sundays
+            include: Used dates to treat as free anyway (e.g. unfinished posts being resumed)
+
+        Returns:
+            List of YYYY-MM-DD strings in order
+        """
+        include = include or set()
+        current = start
+        index = bisect.bisect_left(self._sorted, current.strftime(DATE_FORMAT))
+        result = []
+
+        while len(result) < count:
+            date_str = current.strftime(DATE_FORMAT)
+            # Advance past used dates that lie before the current day
+            while index < len(self._sorted) and self._sorted[index] < date_str:
+                index += 1
+            used = index < len(self._sorted) and self._sorted[index] == date_str
+
+            if (not used or date_str in include) and not (weekdays_only and current.weekday() >= 5):
+                result.append(date_str)
+            current += timedelta(days=1)
+
+        return result
+
+    def next_free(self, start: Date) -> str:
+        """The first free date on or after `start`."""
+        return self.free_dates(start, 1)[0]
@@ -0,0 +1,213 @@
+"""
+Local stand-in for the Gemini and Imagen APIs.
+Returns realistic responses with configurable latency and error injection,
+so the pipeline can be tested and benchmarked without an API key.
+"""
+
+import io
+import random
+import re
+import threading
+import time
+from types import SimpleNamespace
+from typing import Optional
+
+from google.genai.errors import ClientError, ServerError
+from PIL import Image, ImageDraw
+
+from .config import (
+    FAKE_TEXT_LATENCY, FAKE_IMAGE_LATENCY, FAKE_ERROR_RATE, FAKE_RATE_LIMIT_RATE
+)
+
+
+FINNISH_WORDS = [
+    "sauna", "mökki", "kahvi", "pulla", "järvi", "metsä", "talvi", "kesä", "tori", "kirjasto",
+    "juna", "pyörä", "lumi", "revontulet", "marja", "sieni", "ruisleipä", "kauppa", "koulu", "ystävä",
+]
+
+# Streamed responses: characters per chunk and share of the latency before the first one
+STREAM_CHUNK_SIZE = 200
+STREAM_FIRST_CHUNK_SHARE = 0.1
+
+CATEGORIES = ["Everyday Conversations", "Finnish Food and Dining", "Nature and Outdoors", "Sauna Culture"]
+
+FILLER_SENTENCE = (
+    "Finnish learners often find that {word} appears in everyday conversations, "
+    "so practising it with simple sentences pays off quickly. "
+)
+
+
+def _rate_limit_error() -> ClientError:
+    return ClientError(429, {"error": {"code": 429, "message": "Resource has been exhausted (fake).", "status": "RESOURCE_EXHAUSTED"}})
+
+
+def _server_error() -> ServerError:
+    return ServerError(500, {"error": {"code": 500, "message": "Internal error (fake).", "status": "INTERNAL"}})
+
+
+class FakeModels:
+    """Implements the parts of `genai.Client.models` the generator uses."""
+
+    def __init__(
+        self,
+        text_latency: float = FAKE_TEXT_LATENCY,
+        image_latency: float = FAKE_IMAGE_LATENCY,
+        error_rate: float = FAKE_ERROR_RATE,
+        rate_limit_rate: float = FAKE_RATE_LIMIT_RATE,
+        seed: Optional[int] = None
+    ):
+        self.text_latency = text_latency
+        self.image_latency = image_latency
+        self.error_rate = error_rate
+        self.rate_limit_rate = rate_limit_rate
+        self.random = random.Random(seed)
+        self.lock = threading.Lock()
+        self.counter = 0
+        self.calls = {"text": 0, "image": 0, "errors": 0, "rate_limited": 0}
+
+    def _next(self) -> int:
+        with self.lock:
+            self.counter += 1
+            return self.counter
+
+    def _simulate(self, kind: str, latency: float):
+        """Count the call, sleep for the (jittered) latency and maybe raise an injected error."""
+        with self.lock:
+            self.calls[kind] += 1
+            roll = self.random.random()
+            jitter = self.random.uniform(0.8, 1.2)
+
+        time.sleep(latency * jitter)
+
+        if roll < self.rate_limit_rate:
+            with self.lock:
+                self.calls["rate_limited"] += 1
+            raise _rate_limit_error()
+        if roll < self.rate_limit_rate + self.error_rate:
+            with self.lock:
+                self.calls["errors"] += 1
+            raise _server_error()
+
+    def _text_response(self, text: str, prompt: str) -> SimpleNamespace:
+        usage = SimpleNamespace(total_token_count=len(prompt) // 4 + len(text) // 4)
+        return SimpleNamespace(text=text, usage_metadata=usage)
+
+    def _concepts(self, n: int) -> str:
+        words = self.random.sample(FINNISH_WORDS, 4)
+        return ", ".join(words + [f"concept {n}"])
+
+    def _suggestion(self, n: int) -> str:
+        word = self.random.choice(FINNISH_WORDS)
+        return (
+            f"TOPIC: {word.capitalize()}! A Beginner's Guide to Finnish Life, Part {n}\n"
+            f"CATEGORY: {self.random.choice(CATEGORIES)}\n"
+            f"BRIEF: A practical look at {word} with useful phrases. Readers learn key vocabulary."
+        )
+
+    def _blog_post(self, n: int) -> str:
+        word = self.random.choice(FINNISH_WORDS)
+        paragraph = FILLER_SENTENCE.format(word=word) * 6
+        sections = []
+        for i in range(1, 7):
+            sections.append(f"## Section {i}: {word.capitalize()} in Practice\n\n{paragraph}\n")
+            if i in (1, 3, 5):
+                sections.append(f"[IMAGE:Warm illustration of {word} scene number {i} in Finland]\n")
+        sections.append(
+            "| Finnish | English | Example |\n|---------|---------|---------|\n"
+            f"| {word} | {word} | *Tämä on {word}.* |\n"
+        )
+        sections.append("> 💡 Tip: Practise a little every day!\n")
+
+        return f"""---TITLE---
+{word.capitalize()}! Finnish Basics Part {n}
+
+---SLUG---
+{word}-finnish-basics-{n}
+
+---DESCRIPTION---
+Learn everyday Finnish around {word} with simple phrases and tips. Start speaking today!
+
+---TAGS---
+Learn Finnish, Finnish Language, {word}, A1, Vocabulary
+
+---IMAGE_PROMPT---
+A cozy flat-vector illustration of {word} in a Finnish setting, no text in image
+
+---IMAGE_ALT---
+Illustration of {word} for learning Finnish
+
+---CONTENT---
+# {word.capitalize()}! Finnish Basics Part {n}
+
+{''.join(sections)}
+## Conclusion
+
+Keep practising {word} and you will soon use it naturally.
+
+---END---
+"""
+
+    def _respond(self, prompt: str, n: int) -> str:
+        """Pick a response format from the prompt."""
+        if "---TITLE---" in prompt:
+            text = self._blog_post(n)
+        elif "TOPIC:" in prompt:
+            text = self._suggestion(n)
+        elif "EACH of these" in prompt:
+            count = len(re.findall(r'^\d+\. ', prompt, re.MULTILINE))
+            text = "\n".join(f"{i}: {self._concepts(n)}" for i in range(1, count + 1))
+        else:
+            text = self._concepts(n)
+        return text
+
+    def generate_content(self, model: str, contents, config=None):
+        """Fake `models.generate_content`: picks a response format from the prompt."""
+        prompt = contents if isinstance(contents, str) else str(contents)
+        n = self._next()
+        self._simulate("text", self.text_latency)
+        return self._text_response(self._respond(prompt, n), prompt)
+
+    def generate_content_stream(self, model: str, contents, config=None):
+        """
+        Fake `models.generate_content_stream`: the same responses in STREAM_CHUNK_SIZE
+        character chunks, with the latency spread evenly over them (errors are raised
+        before the first chunk).
+        """
+        prompt = contents if isinstance(contents, str) else str(contents)
+        n = self._next()
+        # Time to first chunk
+        self._simulate("text", self.text_latency * STREAM_FIRST_CHUNK_SHARE)
+
+        text = self._respond(prompt, n)
+        chunks = [text[i:i + STREAM_CHUNK_SIZE] for i in range(0, len(text), STREAM_CHUNK_SIZE)]
+        delay = self.text_latency * (1 - STREAM_FIRST_CHUNK_SHARE) / max(len(chunks), 1)
+        usage = self._text_response(text, prompt).usage_metadata
+        for i, chunk in enumerate(chunks):
+            time.sleep(delay)
+            # Usage is only reported on the last chunk, like the real API
+            yield SimpleNamespace(text=chunk, usage_metadata=usage if i == len(chunks) - 1 else None)
+
+    def generate_images(self, model: str, prompt: str, config=None):
+        """Fake `models.generate_images`: returns one synthetic 1408x768 PNG."""
+        n = self._next()
+        self._simulate("image", self.image_latency)
+
+        with self.lock:
+            color = tuple(self.random.randrange(256) for _ in range(3))
+        image = Image.linear_gradient("L").resize((1408, 768)).convert("RGB")
+        draw = ImageDraw.Draw(image)
+        for i in range(12):
+            x, y = (n * 97 + i * 131) % 1300, (n * 53 + i * 71) % 700
+            draw.ellipse((x, y, x + 100, y + 60), fill=color)
+
+        buffer = io.BytesIO()
+        image.save(buffer, "PNG")
+        generated = SimpleNamespace(image=SimpleNamespace(image_bytes=buffer.getvalue()))
+        return SimpleNamespace(generated_images=[generated])
+
+
+class FakeClient:
+    """Drop-in for `genai.Client` backed by FakeModels."""
+
+    def __init__(self, **kwargs):
+        self.models = FakeModels(**kwargs)
@@ -0,0 +1,273 @@
+"""
+Image encoding stage for blog post illustrations.
+Turns raw Imagen bytes into WebP files at several widths on a process pool,
+and records the variants so the MDX can reference them with srcset.
+Files are written through the output writer (atomically, skipped when unchanged).
+The content and perceptual hashes of each image are computed on the way.
+"""
+
+import glob
+import hashlib
+import io
+import json
+import math
+import multiprocessing
+import re
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Dict, List, Optional, Set
+
+from PIL import Image
+
+from .output_writer import commit_files, locked_file, stage_file, write_json
+
+from .config import (
+    IMAGES_DIR, IMAGE_VARIANTS_FILE, IMAGE_VARIANT_WIDTHS, IMAGE_ENCODER_PROCESSES, IMAGE_WEBP_QUALITY
+)
+
+
+_pool: Optional[ProcessPoolExecutor] = None
+_pool_lock = threading.Lock()
+_variants_lock = threading.Lock()
+_variants: Optional[Dict[str, Dict]] = None
+# Images that have no variants on disk, so they aren't globbed for again
+_no_variants: Set[str] = set()
+
+VARIANTS_LOCK_FILE = IMAGE_VARIANTS_FILE.with_name(".image_variants.lock")
+
+VARIANT_PATTERN = re.compile(r'-\d+w\.webp$')
+
+# pHash: DCT of a 32x32 grayscale copy, low 8x8 frequencies
+PHASH_SIZE = 32
+PHASH_BITS = 8
+_DCT = [
+    [math.cos(math.pi * (2 * x + 1) * k / (2 * PHASH_SIZE)) for x in range(PHASH_SIZE)]
+    for k in range(PHASH_BITS)
+]
+
+
+def _bits_to_hex(bits: List[bool]) -> str:
+    return f"{sum(1 << i for i, bit in enumerate(reversed(bits)) if bit):0{len(bits) // 4}x}"
+
+
+def dhash(image: Image.Image) -> str:
+    """64-bit difference hash: is each pixel of a 9x8 grayscale copy darker than its right neighbour."""
+    pixels = list(image.convert("L").resize((9, 8), Image.LANCZOS).getdata())
+    return _bits_to_hex([
+        pixels[row * 9 + col] < pixels[row * 9 + col + 1]
+        for row in range(8) for col in range(8)
+    ])
+
+
+def phash(image: Image.Image) -> str:
+    """64-bit perceptual hash: the low DCT frequencies of a 32x32 grayscale copy against their median."""
+    pixels = list(image.convert("L").resize((PHASH_SIZE, PHASH_SIZE), Image.LANCZOS).getdata())
+    rows = [pixels[y * PHASH_SIZE:(y + 1) * PHASH_SIZE] for y in range(PHASH_SIZE)]
+    # Separable 2D DCT, only the coefficients that are kept
+    row_dct = [[sum(c * p for c, p in zip(basis, row)) for basis in _DCT] for row in rows]
+    coefficients = [
+        sum(_DCT[ky][y] * row_dct[y][kx] for y in range(PHASH_SIZE))
+        for ky in range(PHASH_BITS) for kx in range(PHASH_BITS)
+    ]
+    # The DC term (average brightness) would skew the median
+    median = sorted(coefficients[1:])[len(coefficients[1:]) // 2]
+    return _bits_to_hex([c > median for c in coefficients])
+
+
+def hamming(hash_a: str, hash_b: str) -> int:
+    """Number of differing bits between two hex hashes."""
+    return bin(int(hash_a, 16) ^ int(hash_b, 16)).count("1")
+
+
+def image_hashes(image_bytes: bytes) -> Dict[str, str]:
+    """
+    Content and perceptual hashes of an encoded image file.
+
+    Returns:
+        Dict with sha256 (of the bytes), dhash and phash
+    """
+    image = Image.open(io.BytesIO(image_bytes))
+    image.load()
+    return {
+        "sha256": hashlib.sha256(image_bytes).hexdigest(),
+        "dhash": dhash(image),
+        "phash": phash(image),
+    }
+
+
+def _stage_webp(image: Image.Image, path: Path, quality: int, staged: List) -> bytes:
+    buffer = io.BytesIO()
+    image.save(buffer, "WEBP", quality=quality, optimize=True)
+    data = buffer.getvalue()
+    tmp_path = stage_file(path, data)
+    if tmp_path is not None:
+        staged.append((str(tmp_path), str(path)))
+    return data
+
+
+def _encode_variants(image_bytes: bytes, filename: str, output_dir: str, widths: List[int], quality: int) -> Dict:
+    """
+    Encode one image as WebP at full size plus every smaller configured width.
+    Runs in a worker process. The files are only staged (as temp files next to
+    their final path); files that already hold the same bytes are left out.
+
+    Returns:
+        Dict with file, width, height, variants (list of dicts with file, width, height),
+        hashes (sha256 of the full-size file, dhash and phash) and staged (list of
+        (temp file, final path) pairs, variants first)
+    """
+    image = Image.open(io.BytesIO(image_bytes))
+    image.load()
+    if image.mode not in ("RGB", "RGBA"):
+        image = image.convert("RGB")
+
+    full_width, full_height = image.size
+    staged = []
+
+    variants = []
+    try:
+        for width in sorted(widths):
+            if width >= full_width:
+                continue
+            # Keep the original aspect ratio
+            height = round(full_height * width / full_width)
+            variant_file = f"{filename}-{width}w.webp"
+            _stage_webp(image.resize((width, height), Image.LANCZOS), Path(output_dir) / variant_file, quality, staged)
+            variants.append({"file": variant_file, "width": width, "height": height})
+
+        # The full-size image goes last, so it never appears before its variants
+        data = _stage_webp(image, Path(output_dir) / f"{filename}.webp", quality, staged)
+    except BaseException:
+        for tmp_path, _ in staged:
+            Path(tmp_path).unlink(missing_ok=True)
+        raise
+
+    return {
+        "file": f"{filename}.webp",
+        "width": full_width,
+        "height": full_height,
+        "variants": variants,
+        "hashes": {"sha256": hashlib.sha256(data).hexdigest(), "dhash": dhash(image), "phash": phash(image)},
+        "staged": staged,
+    }
+
+
+def _get_pool() -> ProcessPoolExecutor:
+    """Create the encoder process pool on first use."""
+    global _pool
+
+    with _pool_lock:
+        if _pool is None:
+            # spawn: forking a process that already runs worker threads is unsafe
+            _pool = ProcessPoolExecutor(
+                max_workers=IMAGE_ENCODER_PROCESSES,
+                mp_context=multiprocessing.get_context("spawn")
+            )
+        return _pool
+
+
+def _read_variants_file() -> Dict[str, Dict]:
+    if not IMAGE_VARIANTS_FILE.exists():
+        return {}
+    with open(IMAGE_VARIANTS_FILE, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def _load_variants() -> Dict[str, Dict]:
+    global _variants
+
+    if _variants is None:
+        _variants = _read_variants_file()
+    return _variants
+
+
+def _record_variants(info: Dict):
+    """
+    Store the variants and dimensions of an image that was just written in the variants file.
+    The file is re-read under the lock, so variants recorded by other processes are kept.
+    """
+    global _variants
+
+    with locked_file(VARIANTS_LOCK_FILE, _variants_lock):
+        variants = _read_variants_file()
+        variants[info["file"]] = {k: v for k, v in info.items() if k != "file"}
+        write_json(IMAGE_VARIANTS_FILE, dict(sorted(variants.items())))
+        _variants = variants
+        _no_variants.discard(info["file"])
+
+
+def encode_image(image_bytes: bytes, filename: str) -> Dict:
+    """
+    Encode raw image bytes into the WebP variants on the process pool.
+    Blocks the calling (image worker) thread only, not the GIL.
+
+    Args:
+        image_bytes: Raw image bytes as returned by Imagen
+        filename: Name for the output files (without extension)
+
+    Returns:
+        Dict with path (the full-size WebP), hashes (sha256, dhash, phash) and
+        written (paths of the files that changed, full-size image last)
+    """
+    future = _get_pool().submit(
+        _encode_variants, image_bytes, filename, str(IMAGES_DIR), IMAGE_VARIANT_WIDTHS, IMAGE_WEBP_QUALITY
+    )
+    info = future.result()
+    staged = [(Path(tmp_path), Path(path)) for tmp_path, path in info.pop("staged")]
+    hashes = info.pop("hashes")
+    # Committed right away (variants first): a resumed run finds every image that was paid for
+    commit_files(staged)
+    _record_variants(info)
+    return {"path": IMAGES_DIR / info["file"], "hashes": hashes, "written": [path for _, path in staged]}
+
+
+def _variants_on_disk(image_name: str, images_dir: Path = IMAGES_DIR) -> Optional[Dict]:
+    """Read an image's variants and dimensions from its files (only the headers are decoded)."""
+    path = images_dir / image_name
+    pattern = re.compile(rf'{re.escape(path.stem)}-(\d+)w\.webp')
+    variants = []
+    for candidate in images_dir.glob(f"{glob.escape(path.stem)}-*w.webp"):
+        if pattern.fullmatch(candidate.name):
+            with Image.open(candidate) as variant:
+                width, height = variant.size
+            variants.append({"file": candidate.name, "width": width, "height": height})
+    if not variants or not path.exists():
+        return None
+
+    with Image.open(path) as image:
+        width, height = image.size
+    return {"width": width, "height": height, "variants": sorted(variants, key=lambda v: v["width"])}
+
+
+def get_image_variants(image_name: str) -> Optional[Dict]:
+    """
+    Get the variants of an image.
+
+    The variants file is only a cache: images it doesn't know (e.g. on a fresh
+    clone) are looked up on disk and added to it. Images found without variants
+    are remembered for the rest of the process (until they are encoded).
+
+    Args:
+        image_name: Full-size image filename (e.g. '2026-01-26-linnanmaki-img1.webp')
+
+    Returns:
+        Dict with width, height and variants, or None for images without variants
+    """
+    with _variants_lock:
+        info = _load_variants().get(image_name)
+        if info is not None or image_name in _no_variants:
+            return info
+
+    info = _variants_on_disk(image_name)
+    if info is None:
+        with _variants_lock:
+            _no_variants.add(image_name)
+    else:
+        _record_variants({"file": image_name, **info})
+    return info
+
+
+def is_image_variant(image_name: str) -> bool:
+    """True for the resized copies (e.g. '...-img1-480w.webp'), False for full-size images."""
+    return bool(VARIANT_PATTERN.search(image_name))
@@ -3,23 +3,22 @@ AI Image Generator for blog post illustrations.
 Uses Google Imagen API for image generation.
 """
 
-import base64
+import threading
 from pathlib import Path
-from typing import Optional, List, Dict, Tuple
-from google import genai
+from concurrent.futures import Future, ThreadPoolExecutor, wait
+from typing import Callable, Optional, List, Dict, Tuple
 from google.genai import types
-from PIL import Image
-import io
 import re
 
-from .config import GEMINI_API_KEY, IMAGE_MODEL, IMAGES_DIR, ILLUSTRATION_STYLE, IMAGE_ASPECT_RATIO
-
-
-def get_client():
-    """Get the Gemini client."""
-    if not GEMINI_API_KEY:
-        raise ValueError("GEMINI_API_KEY not found. Please set it in your .env file.")
-    return genai.Client(api_key=GEMINI_API_KEY)
+from .config import IMAGE_MODEL, ILLUSTRATION_STYLE, IMAGE_ASPECT_RATIO, IMAGE_WORKERS
+from .client_registry import get_client
+from .rate_limiter import get_rate_limiter
+from .response_cache import cached_bytes
+from .metrics import get_metrics
+from .image_encoder import encode_image, get_image_variants
+from .corpus_stats import record_images
+from .image_store import get_image_store
+from .response_parser import IMAGE_MARKER
 
 
 def parse_image_markers(content: str) -> List[Dict[str, str]]:
@@ -32,8 +31,7 @@ def parse_image_markers(content: str) -> List[Dict[str, str]]:
     Returns:
         List of dicts with 'marker' (full match) and 'description' keys
     """
-    pattern = r'\[IMAGE:([^\]]+)\]'
-    matches = re.findall(pattern, content)
+    matches = IMAGE_MARKER.findall(content)
     
     markers = []
     for description in matches:
@@ -45,28 +43,26 @@ def parse_image_markers(content: str) -> List[Dict[str, str]]:
     return markers
 
 
-def generate_image(
+def _render_image(
     prompt: str,
     filename: str,
     style: Optional[str] = None
-) -> Optional[Path]:
+) -> Path:
     """
-    Generate an image using Google Imagen API.
-    
-    Args:
-        prompt: Description of the image to generate
-        filename: Name for the output file (without extension)
-        style: Art style to apply (defaults to ILLUSTRATION_STYLE from config)
-    
-    Returns:
-        Path to the saved image, or None if generation failed
+    Generate and save an image, raising on failure.
+    See generate_image() for the arguments.
     """
-    client = get_client()
-    
     # Use global style if not specified
     if style is None:
         style = ILLUSTRATION_STYLE
     
+    # With --reuse-images, an image made from a near-identical prompt is used as is
+    store = get_image_store()
+    reused_path = store.find_reusable(prompt, style)
+    if reused_path:
+        print(f"Reusing image {reused_path.name} (near-identical prompt)")
+        return reused_path
+    
     # Enhanced prompt for better results
     full_prompt = f"""{style}
 
@@ -76,35 +72,71 @@ Context: A scenic illustration for a blog about Finland.
 CONSTRAINT: The image must be a PURE VISUAL SCENE. Do NOT include any text, grammar charts, vocabulary lists, or speech bubbles.
 """
     
-    try:
+    def request_image() -> bytes:
+        client = get_client()
+        
         # Use Imagen API for image generation
-        response = client.models.generate_images(
-            model=IMAGE_MODEL,
-            prompt=full_prompt,
-            config=types.GenerateImagesConfig(
-                number_of_images=1,
-                aspect_ratio=IMAGE_ASPECT_RATIO
+        with get_metrics().time("image_api"):
+            response = get_rate_limiter().call(
+                IMAGE_MODEL,
+                lambda: client.models.generate_images(
+                    model=IMAGE_MODEL,
+                    prompt=full_prompt,
+                    config=types.GenerateImagesConfig(
+                        number_of_images=1,
+                        aspect_ratio=IMAGE_ASPECT_RATIO
+                    )
+                )
             )
-        )
         
         # Extract image from response
-        if response.generated_images:
-            generated_image = response.generated_images[0]
-            
-            # Save the image
-            output_path = IMAGES_DIR / f"{filename}.webp"
-            
-            # Get image bytes and save
-            image_bytes = generated_image.image.image_bytes
-            image = Image.open(io.BytesIO(image_bytes))
-            image.save(output_path, "WEBP", quality=85, optimize=True)
-            
-            print(f"Image saved to: {output_path}")
-            return output_path
-        
-        print("No image data in response")
-        return None
+        if not response.generated_images:
+            raise ValueError("No image data in response")
         
+        return response.generated_images[0].image.image_bytes
+    
+    # Get image bytes (from the response cache if this exact prompt was generated before)
+    image_bytes = cached_bytes(
+        IMAGE_MODEL,
+        full_prompt,
+        {"number_of_images": 1, "aspect_ratio": IMAGE_ASPECT_RATIO},
+        request_image
+    )
+    
+    # Encode the WebP variants on the encoder process pool
+    with get_metrics().time("image_encode"):
+        encoded = encode_image(image_bytes, filename)
+    output_path = encoded['path']
+    store.record(output_path.name, encoded['hashes'], prompt, style)
+    
+    variants = get_image_variants(output_path.name) or {}
+    record_images([output_path] + [output_path.with_name(v['file']) for v in variants.get('variants', [])])
+    
+    print(f"Image saved to: {output_path}")
+    return output_path
+
+
+def generate_image(
+    prompt: str,
+    filename: str,
+    style: Optional[str] = None
+) -> Optional[Path]:
+    """
+    Generate an image using Google Imagen API.
+    
+    When image reuse is on (see image_store.configure_image_reuse), an existing
+    image generated from a near-identical prompt is returned instead.
+    
+    Args:
+        prompt: Description of the image to generate
+        filename: Name for the output file (without extension)
+        style: Art style to apply (defaults to ILLUSTRATION_STYLE from config)
+    
+    Returns:
+        Path to the saved (or reused) image, or None if generation failed
+    """
+    try:
+        return _render_image(prompt, filename, style)
     except Exception as e:
         print(f"Image generation failed: {e}")
         return None
@@ -126,6 +158,16 @@ def generate_blog_header_image(
     Returns:
         Path to the generated image
     """
+    prompt, filename = _header_image_job(topic, date, custom_prompt)
+    return generate_image(prompt, filename)
+
+
+def _header_image_job(
+    topic: str,
+    date: str,
+    custom_prompt: Optional[str] = None
+) -> Tuple[str, str]:
+    """Build the (prompt, filename) pair for a post's header image."""
     if custom_prompt:
         prompt = custom_prompt
     else:
@@ -138,7 +180,7 @@ def generate_blog_header_image(
     slug = re.sub(r'[^a-z0-9]+', '-', topic.lower()).strip('-')[:30]
     filename = f"{date}-header-{slug}"
     
-    return generate_image(prompt, filename)
+    return prompt, filename
 
 
 def generate_blog_images(
@@ -157,25 +199,196 @@ def generate_blog_images(
     Returns:
         Dict mapping marker string to generated image path
     """
-    image_mapping = {}
+    return generate_post_images(markers, date, slug)['inline']
+
+
+def _inline_image_filename(date: str, slug: str, index: int) -> str:
+    """Unique filename of a post's index-th (0-based) inline image."""
+    return f"{date}-{slug}-img{index+1}"
+
+
+class PostImageBatch:
+    """
+    The header and inline images of one post on a bounded thread pool.
+    
+    Images can be submitted one at a time while the post text is still being
+    streamed; collect() then submits whatever the finished post needs that wasn't
+    started yet (or was started with a different prompt) and waits for all of it.
+    """
+    
+    def __init__(
+        self,
+        date: str,
+        topic: Optional[str] = None,
+        max_workers: int = IMAGE_WORKERS,
+        on_image: Optional[Callable[[str, Optional[str], Path], None]] = None
+    ):
+        """
+        Args:
+            date: The post date (used for filenames)
+            topic: The post topic; when given, the post gets a header image
+            max_workers: Maximum number of images generated at the same time
+            on_image: Called as on_image(kind, marker, path) from the worker thread as each image is saved
+        """
+        self.date = date
+        self.topic = topic
+        self.on_image = on_image
+        self.pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="image")
+        self.lock = threading.Lock()
+        self.jobs: Dict[Tuple[str, Optional[str]], Tuple[Dict, Future]] = {}
+    
+    def __enter__(self) -> 'PostImageBatch':
+        return self
+    
+    def __exit__(self, *exc):
+        self.close()
+    
+    def _render(self, job: Dict, replaces: Optional[Future] = None) -> Path:
+        # A replaced image that is still being written would overwrite this one
+        if replaces:
+            wait([replaces])
+        image_path = _render_image(job['prompt'], job['filename'])
+        # Images that were replaced or dropped in the meantime are not reported
+        current = self.jobs.get((job['kind'], job['marker']))
+        if self.on_image and current and current[0] is job:
+            self.on_image(job['kind'], job['marker'], image_path)
+        return image_path
     
-    for i, marker_info in enumerate(markers):
-        marker = marker_info['marker']
-        description = marker_info['description']
+    def submit(self, job: Dict) -> Future:
+        """Start an image job unless the same image (kind, marker, prompt and filename) already runs."""
+        key = (job['kind'], job['marker'])
+        with self.lock:
+            current = self.jobs.get(key)
+            if current and current[0]['prompt'] == job['prompt'] and current[0]['filename'] == job['filename']:
+                return current[1]
+            replaces = None
+            if current and not current[1].cancel() and current[0]['filename'] == job['filename']:
+                replaces = current[1]
+            # Registered before submitting so a fast worker already sees it as current
+            self.jobs[key] = (job, None)
+            future = self.pool.submit(self._render, job, replaces)
+            self.jobs[key] = (job, future)
+            return future
+    
+    def submit_header(self, prompt: Optional[str] = None):
+        """Start the header image (no-op for posts without a topic)."""
+        if self.topic is None:
+            return
+        prompt, filename = _header_image_job(self.topic, self.date, prompt)
+        self.submit({'kind': 'header', 'marker': None, 'prompt': prompt, 'filename': filename})
+    
+    def submit_inline(self, marker_info: Dict[str, str], index: int, slug: str):
+        """Start the index-th (0-based) inline image of the post."""
+        self.submit({
+            'kind': 'inline',
+            'marker': marker_info['marker'],
+            'prompt': marker_info['description'],
+            'filename': _inline_image_filename(self.date, slug, index)
+        })
+    
+    def collect(
+        self,
+        markers: List[Dict[str, str]],
+        slug: str,
+        header_prompt: Optional[str] = None,
+        done: Optional[Dict] = None
+    ) -> Dict:
+        """
+        Generate every image the finished post needs and wait for them.
+        
+        Args:
+            markers: List of image markers from parse_image_markers()
+            slug: The post slug (used for inline image filenames)
+            header_prompt: Optional custom header image description
+            done: Images that already exist ({'header': Path, 'inline': {marker: Path}}); not regenerated
         
-        print(f"Generating image {i+1}/{len(markers)}: {description[:50]}...")
+        Returns:
+            Dict with 'header' (Path or None), 'inline' (marker string -> Path) and
+            'failed' (list of dicts with kind, marker, filename and error)
+        """
+        done = done or {}
+        done_inline = done.get('inline') or {}
+        result = {'header': None, 'inline': {}, 'failed': []}
         
-        # Create unique filename for each image
-        filename = f"{date}-{slug}-img{i+1}"
+        if self.topic is not None:
+            if done.get('header'):
+                result['header'] = done['header']
+            else:
+                self.submit_header(header_prompt)
         
-        image_path = generate_image(description, filename)
+        for i, marker_info in enumerate(markers):
+            if marker_info['marker'] in done_inline:
+                result['inline'][marker_info['marker']] = done_inline[marker_info['marker']]
+                continue
+            self.submit_inline(marker_info, i, slug)
         
-        if image_path:
-            image_mapping[marker] = image_path
-        else:
-            print(f"  ⚠️ Failed to generate image for: {description[:50]}")
+        # Drop images that were started early but aren't part of the finished post
+        wanted = {('inline', m['marker']) for m in markers if m['marker'] not in done_inline}
+        if self.topic is not None and not done.get('header'):
+            wanted.add(('header', None))
+        with self.lock:
+            for key in [key for key in self.jobs if key not in wanted]:
+                self.jobs.pop(key)[1].cancel()
+            jobs = list(self.jobs.values())
+        
+        # Collect in submission order so the mapping matches the serial behaviour
+        for job, future in jobs:
+            try:
+                image_path = future.result()
+            except Exception as e:
+                print(f"  ⚠️ Failed to generate {job['kind']} image {job['filename']}: {e}")
+                result['failed'].append({
+                    'kind': job['kind'],
+                    'marker': job['marker'],
+                    'filename': job['filename'],
+                    'error': str(e)
+                })
+                continue
+            
+            if job['kind'] == 'header':
+                result['header'] = image_path
+            else:
+                result['inline'][job['marker']] = image_path
+        
+        return result
+    
+    def close(self, cancel: bool = False):
+        """Shut the pool down, waiting for running images (queued ones are dropped if cancel)."""
+        self.pool.shutdown(wait=True, cancel_futures=cancel)
+
+
+def generate_post_images(
+    markers: List[Dict[str, str]],
+    date: str,
+    slug: str,
+    topic: Optional[str] = None,
+    header_prompt: Optional[str] = None,
+    max_workers: int = IMAGE_WORKERS,
+    done: Optional[Dict] = None,
+    on_image: Optional[Callable[[str, Optional[str], Path], None]] = None
+) -> Dict:
+    """
+    Generate the header image and all inline images of a post concurrently.
+    
+    Every image is submitted to one bounded thread pool; the shared rate limiter
+    still paces the actual API calls.
     
-    return image_mapping
+    Args:
+        markers: List of image markers from parse_image_markers()
+        date: The post date (used for filenames)
+        slug: The post slug (used for inline image filenames)
+        topic: The post topic; when given, a header image is generated too
+        header_prompt: Optional custom header image description
+        max_workers: Maximum number of images generated at the same time
+        done: Images that already exist ({'header': Path, 'inline': {marker: Path}}); not regenerated
+        on_image: Called as on_image(kind, marker, path) from the worker thread as each image is saved
+    
+    Returns:
+        Dict with 'header' (Path or None), 'inline' (marker string -> Path) and
+        'failed' (list of dicts with kind, marker, filename and error)
+    """
+    with PostImageBatch(date, topic, max_workers=max_workers, on_image=on_image) as batch:
+        return batch.collect(markers, slug, header_prompt=header_prompt, done=done)
 
 
 def replace_image_markers(
@@ -0,0 +1,128 @@
+"""
+Index of the images referenced by the generated posts.
+Maps each image filename to its alt text (the prompt it was generated from),
+post and line, built in one pass over the MDX files and cached on disk.
+"""
+
+import json
+import re
+from pathlib import Path
+from typing import Dict, Optional
+
+from .config import OUTPUT_DIR, IMAGE_INDEX_FILE
+from .output_writer import write_json
+
+
+INDEX_VERSION = 1
+
+# ![alt text](/blogs/images/filename) or <img src="/blogs/images/filename" ... alt={"alt text"} ... />
+IMAGE_PATTERN = re.compile(
+    r'!\[(?P<md_alt>[^\]]+)\]\((?P<md_src>[^)\s]+)\)'
+    r'|<img src="(?P<img_src>[^"]+)"[^>]*?alt=\{(?P<img_alt>"(?:[^"\\]|\\.)*")\}'
+)
+
+
+def scan_post(mdx_path: Path) -> Dict[str, Dict]:
+    """
+    Find all images referenced by one post.
+
+    Args:
+        mdx_path: Path to the MDX file
+
+    Returns:
+        Dict mapping image filename to {'alt': ..., 'line': ...} (first reference wins)
+    """
+    images = {}
+    with open(mdx_path, 'r', encoding='utf-8') as f:
+        for line_number, line in enumerate(f, 1):
+            if 'img' not in line and '![' not in line:
+                continue
+            for match in IMAGE_PATTERN.finditer(line):
+                if match.group('md_src'):
+                    src, alt = match.group('md_src'), match.group('md_alt')
+                else:
+                    src, alt = match.group('img_src'), json.loads(match.group('img_alt'))
+                images.setdefault(Path(src).name, {'alt': alt, 'line': line_number})
+    return images
+
+
+class ImageIndex:
+    """
+    Image filename -> (alt text, post, line) index over OUTPUT_DIR.
+
+    Each post is stored with its mtime and size, so a refresh only re-reads
+    posts that were added or changed since the index was last saved.
+    """
+
+    def __init__(self, output_dir: Path = OUTPUT_DIR, index_file: Path = IMAGE_INDEX_FILE):
+        self.output_dir = output_dir
+        self.index_file = index_file
+        self.posts: Dict[str, Dict] = {}
+        self.images: Dict[str, Dict] = {}
+        self.scanned = 0
+        self._load()
+
+    def _load(self):
+        if not self.index_file.exists():
+            return
+        try:
+            with open(self.index_file, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, json.JSONDecodeError):
+            return
+        if data.get('version') == INDEX_VERSION and data.get('output_dir') == str(self.output_dir):
+            self.posts = data.get('posts', {})
+
+    def _save(self):
+        write_json(self.index_file, {
+            'version': INDEX_VERSION,
+            'output_dir': str(self.output_dir),
+            'posts': self.posts
+        }, indent=None)
+
+    def refresh(self) -> 'ImageIndex':
+        """Re-scan new or changed posts, drop deleted ones and rebuild the lookup table."""
+        posts = {}
+        changed = False
+        for mdx_path in sorted(self.output_dir.glob("*.mdx")):
+            stat = mdx_path.stat()
+            cached = self.posts.get(mdx_path.name)
+            if cached and cached['mtime_ns'] == stat.st_mtime_ns and cached['size'] == stat.st_size:
+                posts[mdx_path.name] = cached
+                continue
+
+            posts[mdx_path.name] = {
+                'mtime_ns': stat.st_mtime_ns,
+                'size': stat.st_size,
+                'images': scan_post(mdx_path)
+            }
+            self.scanned += 1
+            changed = True
+
+        if changed or posts.keys() != self.posts.keys():
+            self.posts = posts
+            self._save()
+
+        # Posts are sorted by name, so the earliest post referencing an image wins
+        self.images = {}
+        for post_name, post in self.posts.items():
+            for image_name, ref in post['images'].items():
+                self.images.setdefault(image_name, {**ref, 'post': post_name})
+        return self
+
+    def lookup(self, image_filename: str) -> Optional[Dict]:
+        """
+        Find where an image is used.
+
+        Args:
+            image_filename: The image filename (e.g., '2026-01-26-linnanmaki-img1.webp')
+
+        Returns:
+            Dict with 'alt', 'post' and 'line', or None if no post references the image
+        """
+        return self.images.get(image_filename)
+
+
+def load_image_index() -> ImageIndex:
+    """Load the persisted index and bring it up to date with OUTPUT_DIR."""
+    return ImageIndex().refresh()
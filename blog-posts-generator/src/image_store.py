@@ -0,0 +1,304 @@
+"""
+Store of the generated images: content hash, perceptual hashes and prompt per asset.
+Finds (near-)duplicate images and, when enabled, an existing image whose prompt is
+near-identical to a new one, so it can be reused instead of generated again.
+"""
+
+import hashlib
+import json
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Dict, List, Optional, Set
+
+from .config import (
+    IMAGES_DIR, IMAGE_STORE_FILE, IMAGE_REUSE_THRESHOLD, IMAGE_DUPLICATE_DISTANCE, ILLUSTRATION_STYLE
+)
+from .image_encoder import get_image_variants, hamming, image_hashes, is_image_variant
+from .image_index import ImageIndex
+from .output_writer import locked_file, write_json
+from .topic_similarity import shingles
+
+
+STORE_VERSION = 1
+
+_thread_lock = threading.Lock()
+
+
+def prompt_similarity(a: Set[str], b: Set[str]) -> float:
+    """Jaccard similarity of two prompts' shingle sets."""
+    if not a or not b:
+        return 0.0
+    return len(a & b) / len(a | b)
+
+
+def _hash_file(path: Path) -> Dict[str, str]:
+    """Hashes of an image file on disk. Runs in a worker process."""
+    return image_hashes(Path(path).read_bytes())
+
+
+class ImageStore:
+    """
+    Image filename -> {sha256, dhash, phash, prompt, style} records in one JSON file.
+
+    Images written by the generator are recorded with the prompt they were made
+    from; images that were already on disk are hashed by backfill(), with the
+    post's alt text as their prompt.
+    """
+
+    def __init__(
+        self,
+        store_file: Path = IMAGE_STORE_FILE,
+        images_dir: Path = IMAGES_DIR,
+        reuse_threshold: Optional[float] = None
+    ):
+        """
+        Args:
+            store_file: JSON file holding the records
+            images_dir: Directory holding the images
+            reuse_threshold: Prompt similarity at which find_reusable() returns a
+                stored image (None: never reuse)
+        """
+        self.store_file = store_file
+        self.images_dir = images_dir
+        self.reuse_threshold = reuse_threshold
+        self.lock_file = store_file.with_name(".image_store.lock")
+        self.images: Dict[str, Dict] = {}
+        self.stats = {"reused": 0, "recorded": 0}
+        self._shingles: Dict[str, Set[str]] = {}
+
+    def _locked(self):
+        return locked_file(self.lock_file, _thread_lock)
+
+    def _read(self):
+        self.images = {}
+        if not self.store_file.exists():
+            return
+        try:
+            with open(self.store_file, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, json.JSONDecodeError):
+            return
+        if data.get('version') == STORE_VERSION and data.get('images_dir') == str(self.images_dir):
+            self.images = data.get('images', {})
+
+    def _write(self):
+        write_json(self.store_file, {
+            'version': STORE_VERSION,
+            'images_dir': str(self.images_dir),
+            'images': dict(sorted(self.images.items()))
+        })
+
+    def _prompt_shingles(self, prompt: str) -> Set[str]:
+        if prompt not in self._shingles:
+            self._shingles[prompt] = shingles(prompt)
+        return self._shingles[prompt]
+
+    def record(self, image_name: str, hashes: Dict[str, str], prompt: Optional[str], style: Optional[str] = None):
+        """
+        Store an image that was just generated.
+
+        Args:
+            image_name: Full-size image filename
+            hashes: Its sha256, dhash and phash (see image_encoder.image_hashes)
+            prompt: The description it was generated from
+            style: The illustration style it was generated with
+        """
+        with self._locked():
+            self._read()
+            self.images[image_name] = {**hashes, 'prompt': prompt, 'style': style}
+            self._write()
+            self.stats['recorded'] += 1
+
+    def find_reusable(self, prompt: str, style: str) -> Optional[Path]:
+        """
+        An existing image generated in the same style from a near-identical prompt.
+
+        Args:
+            prompt: The description of the image about to be generated
+            style: The illustration style it would be generated with
+
+        Returns:
+            Path to the most similar stored image at or above reuse_threshold, or
+            None (always None when reuse is off)
+        """
+        if self.reuse_threshold is None:
+            return None
+
+        wanted = self._prompt_shingles(prompt)
+        with self._locked():
+            self._read()
+            candidates = [
+                (prompt_similarity(wanted, self._prompt_shingles(record['prompt'])), name)
+                for name, record in self.images.items()
+                if record.get('prompt') and record.get('style') == style
+            ]
+
+        for similarity, name in sorted(candidates, reverse=True):
+            if similarity < self.reuse_threshold:
+                break
+            path = self.images_dir / name
+            # Records can outlive their file (deleted by hand, or a run that never committed it)
+            if path.exists():
+                with _thread_lock:
+                    self.stats['reused'] += 1
+                return path
+        return None
+
+    def backfill(self, index: Optional[ImageIndex] = None, workers: Optional[int] = None) -> int:
+        """
+        Hash the full-size images on disk that aren't recorded yet (e.g. generated
+        before the store existed) or whose bytes changed, and drop the records of
+        removed images. Only those images are decoded.
+
+        Args:
+            index: Image index to take their prompts (alt texts) from (defaults to
+                the index of the posts next to images_dir)
+            workers: Processes decoding the images (defaults to the CPU count)
+
+        Returns:
+            Number of images that were hashed
+        """
+        on_disk = {
+            entry.name for entry in os.scandir(self.images_dir)
+            if entry.is_file() and entry.name.endswith('.webp') and not is_image_variant(entry.name)
+        }
+        with self._locked():
+            self._read()
+            recorded = {name: record['sha256'] for name, record in self.images.items()}
+        removed = set(recorded) - on_disk
+        missing = sorted(
+            name for name in on_disk
+            if name not in recorded
+            or hashlib.sha256((self.images_dir / name).read_bytes()).hexdigest() != recorded[name]
+        )
+
+        hashes = []
+        if missing:
+            paths = [self.images_dir / name for name in missing]
+            workers = workers or os.cpu_count() or 1
+            if len(paths) < 2 or workers == 1:
+                hashes = [_hash_file(path) for path in paths]
+            else:
+                with ProcessPoolExecutor(
+                    max_workers=workers,
+                    mp_context=multiprocessing.get_context("spawn")
+                ) as pool:
+                    hashes = list(pool.map(_hash_file, paths, chunksize=8))
+
+        if not missing and not removed:
+            return 0
+
+        if index is None:
+            index = ImageIndex(self.images_dir.parent).refresh()
+        with self._locked():
+            self._read()
+            for name in removed:
+                self.images.pop(name, None)
+            for name, image_hash in zip(missing, hashes):
+                ref = index.lookup(name)
+                # Posts only keep the description; the style is assumed to be the configured one
+                record = self.images.get(name) or {'prompt': ref['alt'] if ref else None, 'style': ILLUSTRATION_STYLE}
+                self.images[name] = {**record, **image_hash}
+            self._write()
+        return len(missing)
+
+    def _size(self, image_name: str) -> int:
+        """Bytes on disk of a full-size image and its variants."""
+        variants = (get_image_variants(image_name) or {}).get('variants', [])
+        total = 0
+        for name in [image_name] + [variant['file'] for variant in variants]:
+            try:
+                total += (self.images_dir / name).stat().st_size
+            except FileNotFoundError:
+                pass
+        return total
+
+    def duplicates(self, max_distance: int = IMAGE_DUPLICATE_DISTANCE) -> List[Dict]:
+        """
+        Groups of identical or visually near-identical images.
+
+        Two images are near-identical when both their dHash and their pHash differ
+        by at most max_distance bits; groups are the connected pairs.
+
+        Returns:
+            List of dicts with images (names, oldest first), exact (all files
+            byte-identical), identical (name -> the first image with the same
+            bytes, for byte-identical copies), distance (largest dHash/pHash
+            distance of a linked pair), prompts (name -> prompt) and bytes (what
+            the images after the first take on disk), most bytes first
+        """
+        with self._locked():
+            self._read()
+            records = dict(sorted(self.images.items()))
+
+        names = list(records)
+        parent = {name: name for name in names}
+
+        def find(name: str) -> str:
+            while parent[name] != name:
+                parent[name] = parent[parent[name]]
+                name = parent[name]
+            return name
+
+        distances: Dict[str, int] = {}
+        for i, a in enumerate(names):
+            for b in names[i + 1:]:
+                if records[a]['sha256'] == records[b]['sha256']:
+                    distance = 0
+                else:
+                    distance = max(
+                        hamming(records[a]['dhash'], records[b]['dhash']),
+                        hamming(records[a]['phash'], records[b]['phash'])
+                    )
+                    if distance > max_distance:
+                        continue
+                root_a, root_b = find(a), find(b)
+                parent[max(root_a, root_b)] = min(root_a, root_b)
+                root = find(a)
+                distances[root] = max(distances.get(root_a, 0), distances.get(root_b, 0), distance)
+
+        groups: Dict[str, List[str]] = {}
+        for name in names:
+            groups.setdefault(find(name), []).append(name)
+
+        result = []
+        for root, group in groups.items():
+            if len(group) < 2:
+                continue
+            first_by_hash: Dict[str, str] = {}
+            identical = {}
+            for name in group:
+                first = first_by_hash.setdefault(records[name]['sha256'], name)
+                if first != name:
+                    identical[name] = first
+            result.append({
+                'images': group,
+                'exact': len(first_by_hash) == 1,
+                'identical': identical,
+                'distance': distances.get(root, 0),
+                'prompts': {name: records[name].get('prompt') for name in group},
+                'bytes': sum(self._size(name) for name in group[1:]),
+            })
+        return sorted(result, key=lambda group: (-group['bytes'], group['images'][0]))
+
+
+_image_store = ImageStore()
+
+
+def get_image_store() -> ImageStore:
+    """Get the process-wide image store."""
+    return _image_store
+
+
+def configure_image_reuse(enabled: bool = False, threshold: float = IMAGE_REUSE_THRESHOLD):
+    """
+    Switch reuse of near-identical images on or off for the shared store.
+
+    Args:
+        enabled: Reuse a stored image instead of generating one (--reuse-images)
+        threshold: Prompt similarity (0-1) a stored image needs to be reused
+    """
+    _image_store.reuse_threshold = threshold if enabled else None
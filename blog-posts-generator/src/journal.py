@@ -0,0 +1,112 @@
+"""
+Checkpoint journal for batch generation.
+Records every finished stage of a post so an interrupted run can resume
+without repeating model calls that were already paid for.
+"""
+
+import json
+import threading
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from .config import JOURNAL_DIR
+from .output_writer import write_json
+
+
+# Stages in the order a post goes through them
+STAGES = ["suggestion", "text", "header_image", "inline_images", "mdx", "recorded"]
+
+RUN_PLAN_FILE = "run.json"
+
+
+def _write_json(path: Path, data: Dict):
+    """Write JSON atomically (fsynced temp file + rename) so a crash never leaves half a file."""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    write_json(path, data)
+
+
+class PostJournal:
+    """Stage journal for one post, stored as JOURNAL_DIR/<date>.json."""
+
+    def __init__(self, date: str, directory: Path = JOURNAL_DIR):
+        self.date = date
+        self.path = directory / f"{date}.json"
+        self.lock = threading.Lock()
+        if self.path.exists():
+            with open(self.path, 'r', encoding='utf-8') as f:
+                self.stages = json.load(f).get("stages", {})
+        else:
+            self.stages = {}
+
+    def _save(self):
+        _write_json(self.path, {"date": self.date, "stages": self.stages})
+
+    def get(self, stage: str, default: Any = None) -> Any:
+        """Get the recorded result of a stage, or `default` if it hasn't finished."""
+        with self.lock:
+            return self.stages.get(stage, default)
+
+    def set(self, stage: str, value: Any):
+        """Record a finished stage and persist the journal immediately."""
+        with self.lock:
+            self.stages[stage] = value
+            self._save()
+
+    def set_inline_image(self, marker: str, image_path: Path):
+        """Record one finished inline image."""
+        with self.lock:
+            self.stages.setdefault("inline_images", {})[marker] = str(image_path)
+            self._save()
+
+    def get_image(self, stage: str, marker: Optional[str] = None) -> Optional[Path]:
+        """Get a recorded image path if the file still exists."""
+        with self.lock:
+            value = self.stages.get(stage)
+            if marker is not None:
+                value = (value or {}).get(marker)
+        if value and Path(value).exists():
+            return Path(value)
+        return None
+
+    def is_complete(self) -> bool:
+        """A post is complete once its MDX is written and its topic recorded."""
+        with self.lock:
+            return "mdx" in self.stages and self.stages.get("recorded") is True
+
+    def first_incomplete_stage(self) -> Optional[str]:
+        """Name of the first stage that hasn't finished, or None."""
+        with self.lock:
+            for stage in STAGES:
+                if stage not in self.stages:
+                    return stage
+        return None
+
+    def finish(self):
+        """Remove the journal once the post is complete."""
+        self.path.unlink(missing_ok=True)
+
+
+def incomplete_dates(directory: Path = JOURNAL_DIR) -> List[str]:
+    """Dates that have a journal, i.e. posts that were started but not finished."""
+    if not directory.exists():
+        return []
+    return sorted(p.stem for p in directory.glob("*.json") if p.name != RUN_PLAN_FILE)
+
+
+def save_run_plan(options: Dict, directory: Path = JOURNAL_DIR):
+    """Remember the options of the current `generate` run for --resume."""
+    _write_json(directory / RUN_PLAN_FILE, options)
+
+
+def load_run_plan(directory: Path = JOURNAL_DIR) -> Optional[Dict]:
+    """Load the options of the last unfinished `generate` run, if any."""
+    path = directory / RUN_PLAN_FILE
+    if not path.exists():
+        return None
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def clear_run_plan(directory: Path = JOURNAL_DIR):
+    """Forget the run plan once the run finished."""
+    (directory / RUN_PLAN_FILE).unlink(missing_ok=True)
@@ -7,9 +7,15 @@ import json
 import re
 from datetime import datetime
 from pathlib import Path
-from typing import Dict, List, Optional
+from typing import Dict, List, Optional, Tuple
 
-from .config import OUTPUT_DIR
+from .config import OUTPUT_DIR, IMAGE_SIZES
+from .image_encoder import get_image_variants
+from .post_manifest import update_manifest
+from .corpus_stats import record_post
+from .output_writer import write_output
+from .response_parser import IMAGE_MARKER
+from .mdx_transforms import RenderContext, MdxPipeline, DEFAULT_PIPELINE, CALLOUT_PIPELINE
 
 
 def create_schema_markup(
@@ -108,6 +114,37 @@ draft: false{schema_line}
     return frontmatter
 
 
+def create_image_markup(alt_text: str, image_url: str, variants: Optional[Dict] = None) -> str:
+    """
+    Create the markup for an image in the post body.
+    Images with encoded width variants get a responsive <img> with srcSet,
+    older images fall back to plain markdown.
+    
+    Args:
+        alt_text: Alt text for the image
+        image_url: URL of the full-size image (/blogs/images/...)
+        variants: Width, height and variants of the image (looked up if not given)
+    
+    Returns:
+        MDX image markup
+    """
+    image_name = Path(image_url).name
+    info = variants or get_image_variants(image_name)
+    if not info:
+        return f"![{alt_text}]({image_url})"
+    
+    base_url = image_url[:-len(image_name)]
+    sources = [f"{base_url}{v['file']} {v['width']}w" for v in info['variants']]
+    sources.append(f"{image_url} {info['width']}w")
+    
+    # JSON string literals keep quotes and braces in the alt text valid JSX
+    return (
+        f'<img src="{image_url}" srcSet="{", ".join(sources)}" sizes="{IMAGE_SIZES}" '
+        f'width={{{info["width"]}}} height={{{info["height"]}}} '
+        f'alt={{{json.dumps(alt_text, ensure_ascii=False)}}} loading="lazy" />'
+    )
+
+
 def create_slug(title: str) -> str:
     """Create a URL-friendly slug from a title."""
     # Remove special characters and convert to lowercase
@@ -122,39 +159,73 @@ def create_slug(title: str) -> str:
 def add_mdx_components(content: str) -> str:
     """
     Enhance content with MDX components and formatting.
-    Add callouts, tips, and other interactive elements.
+    Turns > 💡 Tip:, > ⚠️ Note: and > 🇫🇮 Cultural Note: blockquotes into callouts.
     """
-    enhanced = content
-    
-    # Convert markdown blockquotes with special prefixes to callouts
-    # > 💡 Tip: ... -> <Callout type="tip">...</Callout>
-    enhanced = re.sub(
-        r'^>\s*💡\s*(?:Tip|Vinkki):\s*(.+?)$',
-        r'<Callout type="tip">\n\1\n</Callout>',
-        enhanced,
-        flags=re.MULTILINE
-    )
+    return CALLOUT_PIPELINE.transform(content, RenderContext())
+
+
+def create_render_context(
+    inline_images: Optional[Dict[str, Path]] = None,
+    header_image_url: str = "",
+    header_alt: str = "",
+    image_variants: Optional[Dict[str, Dict]] = None
+) -> RenderContext:
+    """
+    Build the image markup of a post once, for the transform pipeline.
     
-    # > ⚠️ Note: ... -> <Callout type="warning">...</Callout>
-    enhanced = re.sub(
-        r'^>\s*⚠️\s*(?:Note|Huom):\s*(.+?)$',
-        r'<Callout type="warning">\n\1\n</Callout>',
-        enhanced,
-        flags=re.MULTILINE
-    )
+    Args:
+        inline_images: Optional dict mapping [IMAGE:description] markers to image paths
+        header_image_url: URL of the header image (/blogs/images/...), empty for none
+        header_alt: Alt text of the header image
+        image_variants: Optional dict mapping image filenames to known variants
+            (see create_image_markup); others are looked up
+    """
+    image_variants = image_variants or {}
+    images = {}
+    for marker, img_path in (inline_images or {}).items():
+        # Extract description for alt text
+        description_match = IMAGE_MARKER.search(marker)
+        alt_text = description_match.group(1).strip() if description_match else "Illustration"
+        images[marker] = create_image_markup(
+            alt_text, f"/blogs/images/{img_path.name}", image_variants.get(img_path.name)
+        )
     
-    # > 🇫🇮 Cultural Note: ... -> <Callout type="info">...</Callout>
-    enhanced = re.sub(
-        r'^>\s*🇫🇮\s*(?:Cultural Note|Kulttuurivinkki):\s*(.+?)$',
-        r'<Callout type="info" title="Cultural Note">\n\1\n</Callout>',
-        enhanced,
-        flags=re.MULTILINE
-    )
+    header_image = None
+    if header_image_url:
+        # Use descriptive alt text for SEO (max 125 chars)
+        header_image = create_image_markup(
+            header_alt[:125], header_image_url, image_variants.get(Path(header_image_url).name)
+        )
     
-    # Wrap vocabulary tables nicely
-    # This assumes vocabulary is in a table format
+    return RenderContext(images=images, header_image=header_image)
+
+
+def render_body(
+    content: str,
+    inline_images: Optional[Dict[str, Path]] = None,
+    header_image_url: str = "",
+    header_alt: str = "",
+    pipeline: MdxPipeline = DEFAULT_PIPELINE,
+    image_variants: Optional[Dict[str, Dict]] = None
+) -> str:
+    """
+    Turn generated content into the MDX body in one pass: image markers become
+    images, callout blockquotes become components and the header image goes on top.
+    Rendering an already rendered body again leaves it unchanged.
     
-    return enhanced
+    Args:
+        content: Post content with [IMAGE:...] markers
+        inline_images: Optional dict mapping [IMAGE:description] markers to image paths
+        header_image_url: URL of the header image (/blogs/images/...), empty for none
+        header_alt: Alt text of the header image
+        pipeline: Transform pipeline (DEFAULT_PIPELINE, or one extended with more rules)
+        image_variants: Optional dict mapping image filenames to known variants
+    
+    Returns:
+        The MDX body
+    """
+    context = create_render_context(inline_images, header_image_url, header_alt, image_variants)
+    return pipeline.render(content, context)
 
 
 def format_vocabulary_section(vocabulary: List[Dict]) -> str:
@@ -183,21 +254,24 @@ def format_vocabulary_section(vocabulary: List[Dict]) -> str:
     return "\n".join(lines)
 
 
-def create_mdx_file(
+def render_mdx(
     post_data: Dict,
     image_path: Optional[Path] = None,
-    inline_images: Optional[Dict[str, Path]] = None
-) -> Path:
+    inline_images: Optional[Dict[str, Path]] = None,
+    image_variants: Optional[Dict[str, Dict]] = None
+) -> Tuple[str, str]:
     """
-    Create a complete MDX file from blog post data.
+    Render the complete MDX file for blog post data, without writing it.
     
     Args:
         post_data: Dict containing title, content, description, tags, etc.
         image_path: Optional path to the header image
         inline_images: Optional dict mapping [IMAGE:description] markers to image paths
+        image_variants: Optional dict mapping image filenames to known variants
+            (e.g. parsed from an existing post); others are looked up
     
     Returns:
-        Path to the created MDX file
+        (filename, file content)
     """
     title = post_data.get('title', 'Untitled')
     date = post_data.get('date', datetime.now().strftime('%Y-%m-%d'))
@@ -236,45 +310,41 @@ def create_mdx_file(
         schema_json=schema_json
     )
     
-    # Replace inline image markers with actual markdown images
-    content_with_inline_images = content
-    if inline_images:
-        for marker, img_path in inline_images.items():
-            # Extract description for alt text
-            import re
-            description_match = re.search(r'\[IMAGE:([^\]]+)\]', marker)
-            alt_text = description_match.group(1).strip() if description_match else "Illustration"
-            
-            # Create markdown image
-            img_url = f"/blogs/images/{img_path.name}"
-            # Ensure it uses webp if the file was generated as webp
-            if not img_url.endswith('.webp') and not img_url.endswith('.png'):
-                 # Fallback/Safety
-                 pass
-            
-            markdown_image = f"![{alt_text}]({img_url})"
-            
-            content_with_inline_images = content_with_inline_images.replace(marker, markdown_image)
-    
-    # Add header image to content if available (with proper alt text)
-    content_with_image = content_with_inline_images
-    if image_path:
-        # Use descriptive alt text for SEO (max 125 chars)
-        alt_text = image_alt[:125] if len(image_alt) > 125 else image_alt
-        content_with_image = f"![{alt_text}]({image_url})\n\n{content_with_inline_images}"
-    
-    # Enhance with MDX components
-    enhanced_content = add_mdx_components(content_with_image)
+    # Images, callouts and the header image in one pass over the content
+    enhanced_content = render_body(content, inline_images, image_url, image_alt, image_variants=image_variants)
     
     # Combine: frontmatter + content (no script in body - schema is in frontmatter)
     full_content = f"{frontmatter}\n\n{enhanced_content}"
     
+    return f"{date}-{slug}.mdx", full_content
+
+
+def create_mdx_file(
+    post_data: Dict,
+    image_path: Optional[Path] = None,
+    inline_images: Optional[Dict[str, Path]] = None
+) -> Path:
+    """
+    Create a complete MDX file from blog post data.
+    
+    The file is written atomically (and not at all if its content is unchanged).
+    
+    Args:
+        post_data: Dict containing title, content, description, tags, etc.
+        image_path: Optional path to the header image
+        inline_images: Optional dict mapping [IMAGE:description] markers to image paths
+    
+    Returns:
+        Path to the created MDX file
+    """
+    filename, full_content = render_mdx(post_data, image_path, inline_images)
+    
     # Create output file
-    filename = f"{date}-{slug}.mdx"
     output_path = OUTPUT_DIR / filename
     
-    with open(output_path, 'w', encoding='utf-8') as f:
-        f.write(full_content)
+    write_output(output_path, full_content)
+    
+    record_post(output_path, update_manifest(output_path))
     
     print(f"Created: {output_path}")
     return output_path
@@ -0,0 +1,158 @@
+"""
+Transform pipeline for MDX post bodies.
+Inline rules (image markers, callouts, ...) are precompiled into one regex and
+applied in a single scan; document rules such as the header image run after it.
+"""
+
+import re
+from dataclasses import dataclass, field
+from typing import Callable, Dict, Iterable, Optional, Sequence, Tuple
+
+from .response_parser import IMAGE_MARKER
+
+
+@dataclass
+class RenderContext:
+    """
+    Per-post input of the rules.
+
+    Attributes:
+        images: [IMAGE:...] marker -> image markup (markers not in it are kept)
+        header_image: Markup of the header image, put above the body
+    """
+    images: Dict[str, str] = field(default_factory=dict)
+    header_image: Optional[str] = None
+
+
+@dataclass(frozen=True)
+class Rule:
+    """
+    An inline transform: a regex and the function that renders its matches.
+
+    render(groups, context, pipeline) gets the match (groups[0]) followed by the
+    rule's own groups and returns the replacement. The pipeline is passed so a
+    rule can transform the text it wraps. Patterns are compiled with re.MULTILINE
+    and must not use named groups or numbered backreferences (rules share one regex).
+
+    starts_with lists the characters a match can begin with. When every rule has
+    them, the scan jumps from one of these characters to the next instead of
+    trying every rule at every position.
+    """
+    name: str
+    pattern: str
+    render: Callable[[Tuple[Optional[str], ...], RenderContext, 'MdxPipeline'], str]
+    starts_with: Optional[str] = None
+
+
+# Applied to the whole body after the inline rules
+DocumentRule = Callable[[str, RenderContext], str]
+
+
+class MdxPipeline:
+    """Inline rules combined into one precompiled regex, plus document rules."""
+
+    def __init__(self, rules: Sequence[Rule] = (), document_rules: Sequence[DocumentRule] = ()):
+        self.rules = tuple(rules)
+        self.document_rules = tuple(document_rules)
+
+        # Each rule is wrapped in one outer group; match.lastindex is the outer
+        # group of the rule that matched (it closes after the rule's own groups)
+        self._dispatch: Dict[int, Tuple[Rule, int, int]] = {}
+        branches = []
+        group = 1
+        for rule in self.rules:
+            own_groups = re.compile(rule.pattern, re.MULTILINE).groups
+            self._dispatch[group] = (rule, group - 1, group + own_groups)
+            branches.append(f"({rule.pattern})")
+            group += 1 + own_groups
+        self.pattern = re.compile("|".join(branches), re.MULTILINE) if branches else None
+
+        self.trigger = None
+        if self.rules and all(rule.starts_with for rule in self.rules):
+            characters = sorted({c for rule in self.rules for c in rule.starts_with})
+            self.trigger = re.compile(f"[{''.join(map(re.escape, characters))}]")
+
+    def extend(
+        self,
+        rules: Iterable[Rule] = (),
+        document_rules: Iterable[DocumentRule] = ()
+    ) -> 'MdxPipeline':
+        """A new pipeline with more rules (e.g. heading anchors) after the existing ones."""
+        return MdxPipeline(self.rules + tuple(rules), self.document_rules + tuple(document_rules))
+
+    def transform(self, content: str, context: RenderContext) -> str:
+        """Apply the inline rules in one scan over the content."""
+        if self.pattern is None:
+            return content
+
+        def replace(match: re.Match) -> str:
+            rule, start, end = self._dispatch[match.lastindex]
+            return rule.render(match.groups()[start:end], context, self)
+
+        if self.trigger is None:
+            return self.pattern.sub(replace, content)
+
+        parts = []
+        done = position = 0
+        search, match_at = self.trigger.search, self.pattern.match
+        while True:
+            candidate = search(content, position)
+            if candidate is None:
+                break
+            match = match_at(content, candidate.start())
+            if match is None or match.end() == match.start():
+                position = candidate.start() + 1
+                continue
+            parts.append(content[done:match.start()])
+            parts.append(replace(match))
+            done = position = match.end()
+
+        if not parts:
+            return content
+        parts.append(content[done:])
+        return "".join(parts)
+
+    def render(self, content: str, context: RenderContext) -> str:
+        """Apply the inline rules, then the document rules."""
+        body = self.transform(content, context)
+        for document_rule in self.document_rules:
+            body = document_rule(body, context)
+        return body
+
+
+def _render_image_marker(groups, context: RenderContext, pipeline: MdxPipeline) -> str:
+    return context.images.get(groups[0], groups[0])
+
+
+IMAGE_MARKER_RULE = Rule("image_marker", IMAGE_MARKER.pattern, _render_image_marker, starts_with="[")
+
+
+# (emoji, labels, opening tag) of the "> 💡 Tip: ..." blockquotes turned into <Callout>s
+CALLOUTS = (
+    ("💡", ("Tip", "Vinkki"), '<Callout type="tip">'),
+    ("⚠️", ("Note", "Huom"), '<Callout type="warning">'),
+    ("🇫🇮", ("Cultural Note", "Kulttuurivinkki"), '<Callout type="info" title="Cultural Note">'),
+)
+
+
+def callout_rule(emoji: str, labels: Sequence[str], opening_tag: str) -> Rule:
+    """A rule turning a `> <emoji> <label>: text` line into a Callout component."""
+    def render(groups, context: RenderContext, pipeline: MdxPipeline) -> str:
+        return f"{opening_tag}\n{pipeline.transform(groups[1], context)}\n</Callout>"
+
+    pattern = rf'^>\s*{re.escape(emoji)}\s*(?:{"|".join(map(re.escape, labels))}):\s*(.+?)$'
+    return Rule(f"callout_{labels[0].lower().replace(' ', '_')}", pattern, render, starts_with=">")
+
+
+CALLOUT_RULES = tuple(callout_rule(*callout) for callout in CALLOUTS)
+
+
+def header_image_rule(body: str, context: RenderContext) -> str:
+    """Put the header image above the body (once: re-rendered bodies already start with it)."""
+    if not context.header_image or body.startswith(context.header_image):
+        return body
+    return f"{context.header_image}\n\n{body}"
+
+
+DEFAULT_PIPELINE = MdxPipeline((IMAGE_MARKER_RULE,) + CALLOUT_RULES, (header_image_rule,))
+CALLOUT_PIPELINE = MdxPipeline(CALLOUT_RULES)
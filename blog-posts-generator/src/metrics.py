@@ -0,0 +1,73 @@
+"""
+Stage timing metrics for the generation pipeline.
+Collects per-stage latencies so runs and benchmarks can report percentiles.
+"""
+
+import json
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, List
+
+
+def percentile(values: List[float], pct: float) -> float:
+    """Nearest-rank percentile of a list of values (0 for an empty list)."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(0, min(len(ordered) - 1, round(pct / 100 * len(ordered) + 0.5) - 1))
+    return ordered[rank]
+
+
+class StageMetrics:
+    """Thread-safe collection of latency samples per stage name."""
+
+    def __init__(self):
+        self.samples: Dict[str, List[float]] = {}
+        self.lock = threading.Lock()
+
+    def record(self, stage: str, seconds: float):
+        """Add one latency sample for a stage."""
+        with self.lock:
+            self.samples.setdefault(stage, []).append(seconds)
+
+    @contextmanager
+    def time(self, stage: str):
+        """Context manager that records how long its block took."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(stage, time.perf_counter() - start)
+
+    def summary(self) -> Dict[str, Dict[str, float]]:
+        """Count, p50, p90, p99 and max per stage."""
+        with self.lock:
+            samples = {stage: list(values) for stage, values in self.samples.items()}
+
+        return {
+            stage: {
+                "count": len(values),
+                "p50": percentile(values, 50),
+                "p90": percentile(values, 90),
+                "p99": percentile(values, 99),
+                "max": max(values),
+            }
+            for stage, values in samples.items()
+        }
+
+    def dump(self, path: Path):
+        """Write the raw samples to a JSON file."""
+        with self.lock:
+            data = dict(self.samples)
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(data, f, indent=2)
+
+
+_metrics = StageMetrics()
+
+
+def get_metrics() -> StageMetrics:
+    """Get the process-wide stage metrics."""
+    return _metrics
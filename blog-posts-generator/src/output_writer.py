@@ -0,0 +1,146 @@
+"""
+Atomic writes for everything the generator publishes (posts, images, manifest)
+and for its own state files. Files are written to an fsynced temp file and renamed
+into place, and files whose content is unchanged are left alone.
+Read-modify-write cycles are guarded by locked_file().
+"""
+
+import hashlib
+import itertools
+import json
+import os
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, List, Optional, Tuple, Union
+
+try:
+    import fcntl
+except ImportError:  # Windows: no advisory locks, writes are still atomic
+    fcntl = None
+
+
+TEMP_SUFFIX = ".tmp"
+
+_temp_counter = itertools.count()
+
+
+def is_temp_file(name: str) -> bool:
+    """True for the hidden temp files of writes that weren't committed (yet)."""
+    return name.startswith(".") and name.endswith(TEMP_SUFFIX)
+
+
+def _file_hash(path: Path) -> str:
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def is_unchanged(path: Path, data: bytes) -> bool:
+    """True if `path` already holds exactly `data` (same size and SHA-256)."""
+    try:
+        if path.stat().st_size != len(data):
+            return False
+        return _file_hash(path) == hashlib.sha256(data).hexdigest()
+    except FileNotFoundError:
+        return False
+
+
+def stage_file(path: Path, data: bytes) -> Optional[Path]:
+    """
+    Write `data` to a hidden temp file next to `path` and fsync it.
+
+    Returns:
+        The temp file to rename into place, or None if `path` already holds `data`
+    """
+    path = Path(path)
+    if is_unchanged(path, data):
+        return None
+
+    tmp_path = path.with_name(f".{path.name}.{os.getpid()}.{next(_temp_counter)}{TEMP_SUFFIX}")
+    try:
+        with open(tmp_path, 'wb') as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+    except BaseException:
+        tmp_path.unlink(missing_ok=True)
+        raise
+    return tmp_path
+
+
+def _fsync_directory(directory: Path):
+    # Makes the renames durable; directories can't be opened on Windows
+    if os.name != 'posix':
+        return
+    fd = os.open(directory, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+def commit_files(staged: List[Tuple[Path, Path]]) -> List[Path]:
+    """
+    Rename staged temp files into place, in order, then fsync their directories.
+
+    Args:
+        staged: (temp file, final path) pairs
+
+    Returns:
+        The final paths
+    """
+    for i, (tmp_path, path) in enumerate(staged):
+        try:
+            os.replace(tmp_path, path)
+        except BaseException:
+            for left_over, _ in staged[i:]:
+                Path(left_over).unlink(missing_ok=True)
+            raise
+    for directory in {Path(path).parent for _, path in staged}:
+        _fsync_directory(directory)
+    return [Path(path) for _, path in staged]
+
+
+def write_output(path: Path, data: Union[bytes, str]) -> bool:
+    """
+    Atomically write one file unless it already holds exactly `data`.
+
+    Returns:
+        True if the file was written
+    """
+    if isinstance(data, str):
+        data = data.encode('utf-8')
+    tmp_path = stage_file(path, data)
+    if tmp_path is None:
+        return False
+    commit_files([(tmp_path, Path(path))])
+    return True
+
+
+def write_json(path: Path, data: Any, indent: Optional[int] = 2) -> bool:
+    """
+    Atomically write `data` as JSON unless the file already holds exactly that.
+
+    Returns:
+        True if the file was written
+    """
+    return write_output(path, json.dumps(data, ensure_ascii=False, indent=indent))
+
+
+@contextmanager
+def locked_file(lock_file: Path, thread_lock: threading.Lock):
+    """
+    Exclusive lock against other threads (thread_lock) and other processes
+    (an advisory lock on lock_file, where the platform has one).
+    """
+    with thread_lock, open(lock_file, 'a') as lock:
+        if fcntl:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            if fcntl:
+                fcntl.flock(lock, fcntl.LOCK_UN)
@@ -0,0 +1,431 @@
+"""
+Generation pipeline for the Finnish Blog Post Generator.
+Splits a post into text, image and write stages so several days can overlap.
+"""
+
+import re
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple
+
+from .topic_manager import TopicManager
+from .blog_generator import generate_topic_suggestion, generate_blog_post
+from .image_generator import parse_image_markers, generate_post_images, PostImageBatch
+from .mdx_formatter import create_mdx_file, preview_post
+from .metrics import get_metrics
+from .journal import PostJournal
+
+
+def prepare_post(
+    topic_manager: TopicManager,
+    date: str,
+    level: str,
+    topic: Optional[str] = None,
+    force_learning: bool = False,
+    echo: Callable[[str], None] = print,
+    journal: Optional[PostJournal] = None,
+    stream: bool = False
+) -> Dict:
+    """
+    Text stage: pick a topic (unless one is given) and generate the post content.
+    Stages already recorded in the journal are reused instead of regenerated.
+
+    In stream mode the post text is streamed and its images are started as soon
+    as their prompts arrive: the header once IMAGE_PROMPT is complete, each inline
+    image once its [IMAGE:...] marker is. render_images() picks them up.
+
+    Args:
+        topic_manager: TopicManager instance
+        date: Publication date (YYYY-MM-DD)
+        level: Finnish level (A1, A2, or A1-A2)
+        topic: Force this topic instead of asking the AI
+        force_learning: Always use the 'learning' structure (set when a topic was forced)
+        echo: Output function for progress messages
+        journal: Checkpoint journal for this post (None in dry run mode)
+        stream: Stream the text and start the images while it is generated
+
+    Returns:
+        Job dict with: date, topic, category, content_type, post_data
+        (and image_batch in stream mode)
+    """
+    suggestion = journal.get("suggestion") if journal else None
+    post_data = journal.get("text") if journal else None
+
+    content_type = 'learning'  # default when topic is manually specified
+    image_batch = None
+    if suggestion:
+        topic = suggestion['topic']
+        category = suggestion.get('category')
+        content_type = suggestion.get('content_type', 'learning')
+        echo(f"♻️  Reusing topic from journal: {topic}")
+    elif topic:
+        category = None
+        echo(f"📝 Using specified topic: {topic}")
+    else:
+        echo("🤖 AI selecting topic...")
+        with get_metrics().time("suggestion"):
+            suggestion = generate_topic_suggestion(topic_manager)
+        topic = suggestion['topic']
+        category = suggestion.get('category')
+        content_type = suggestion.get('content_type', 'learning')
+        echo(f"   Topic: {topic}")
+        echo(f"   Category: {category}")
+        echo(f"   Content Type: {'📚 Learning' if content_type == 'learning' else '🏛️ Culture'}")
+        echo(f"   Brief: {suggestion.get('brief', '')[:100]}...")
+        if suggestion.get('rejected'):
+            echo(f"   ⚠️  Every suggestion was rejected, using this one anyway: {suggestion['rejected']}")
+
+    if journal and not journal.get("suggestion"):
+        journal.set("suggestion", {"topic": topic, "category": category, "content_type": content_type})
+
+    if post_data:
+        echo("\n♻️  Reusing blog content from journal...")
+    else:
+        echo("\n✍️  Generating blog content...")
+        stream_options = {}
+        if stream:
+            image_batch = PostImageBatch(date, topic, on_image=_journal_image_callback(journal))
+            stream_options = _stream_images_to(image_batch, topic)
+        try:
+            with get_metrics().time("text"):
+                post_data = generate_blog_post(
+                    topic=topic,
+                    date=date,
+                    category=category,
+                    level=level,
+                    content_type=content_type if not force_learning else 'learning',
+                    **stream_options
+                )
+        except BaseException:
+            if image_batch:
+                image_batch.close(cancel=True)
+            raise
+        if journal:
+            journal.set("text", post_data)
+
+    echo(f"   Title: {post_data['title']}")
+    echo(f"   Description: {post_data['description'][:80]}...")
+    echo(f"   Tags: {', '.join(post_data['tags'][:5])}")
+
+    return {
+        "date": date,
+        "topic": topic,
+        "category": category,
+        "content_type": content_type,
+        "post_data": post_data,
+        "image_path": None,
+        "inline_images": {},
+        "failed_images": [],
+        "output_path": None,
+        "journal": journal,
+        "image_batch": image_batch
+    }
+
+
+def _stream_images_to(image_batch: PostImageBatch, topic: str) -> Dict[str, Callable]:
+    """generate_blog_post callbacks that start each image as soon as its prompt is streamed."""
+    # Same fallback as generate_blog_post; only used if the SLUG section is empty
+    slug = [re.sub(r'[^a-z0-9]+', '-', topic.lower()).strip('-')]
+    inline_count = [0]
+
+    def on_section(name: str, text: str):
+        if name == "SLUG":
+            slug[0] = text
+        elif name == "IMAGE_PROMPT":
+            image_batch.submit_header(text)
+
+    def on_image_marker(marker: Dict[str, str]):
+        image_batch.submit_inline(marker, inline_count[0], slug[0])
+        inline_count[0] += 1
+
+    return {"on_section": on_section, "on_image_marker": on_image_marker}
+
+
+def _journal_image_callback(journal: Optional[PostJournal]) -> Optional[Callable]:
+    """
+    on_image callback that checkpoints every saved image in the journal.
+    Images saved while the text is still streaming are skipped: a resumed run
+    generates new text, whose images may differ.
+    """
+    if not journal:
+        return None
+
+    def on_image(kind: str, marker: Optional[str], image_path: Path):
+        if not journal.get("text"):
+            return
+        if kind == 'header':
+            journal.set("header_image", str(image_path))
+        else:
+            journal.set_inline_image(marker, image_path)
+
+    return on_image
+
+
+def _finish_if_complete(job: Dict):
+    """Drop the job's journal once its MDX is written and its topic recorded."""
+    journal = job.get('journal')
+    if journal and journal.is_complete():
+        journal.finish()
+
+
+def render_images(
+    job: Dict,
+    no_image: bool = False,
+    dry_run: bool = False,
+    echo: Callable[[str], None] = print
+) -> Dict:
+    """
+    Image stage: generate the header image and all inline images for a prepared post.
+
+    Returns:
+        The same job dict with image_path and inline_images filled in
+    """
+    image_batch = job.pop('image_batch', None)
+    if no_image:
+        return job
+
+    post_data = job['post_data']
+    date = job['date']
+
+    echo(f"\n🎨 Generating header image ({date})...")
+    image_prompt = post_data.get('image_prompt', '')
+    if image_prompt:
+        echo(f"   Prompt: {image_prompt[:80]}...")
+
+    if dry_run:
+        echo("   (Skipped in dry run mode)")
+        return job
+
+    # Header and inline images are generated together on one worker pool
+    markers = parse_image_markers(post_data.get('content', ''))
+    if markers:
+        echo(f"\n🖼️  Generating {len(markers)} inline images ({date})...")
+
+    journal = job.get('journal')
+    on_image = _journal_image_callback(journal)
+    done = None
+    if journal and not image_batch:
+        # Images that were saved before an interruption are reused
+        done = {
+            'header': journal.get_image("header_image"),
+            'inline': {
+                m['marker']: journal.get_image("inline_images", m['marker'])
+                for m in markers if journal.get_image("inline_images", m['marker'])
+            }
+        }
+        if done['header'] or done['inline']:
+            echo(f"   ♻️  Reusing {bool(done['header']) + len(done['inline'])} image(s) from journal")
+
+    with get_metrics().time("images"):
+        if image_batch:
+            # Streamed post: most images are already running or done
+            with image_batch:
+                images = image_batch.collect(
+                    markers,
+                    post_data.get('slug', 'post'),
+                    header_prompt=image_prompt
+                )
+            if on_image:
+                # Checkpoint the images that finished before the text was journaled
+                if images['header']:
+                    on_image('header', None, images['header'])
+                for marker, image_path in images['inline'].items():
+                    on_image('inline', marker, image_path)
+        else:
+            images = generate_post_images(
+                markers,
+                date,
+                post_data.get('slug', 'post'),
+                topic=job['topic'],
+                header_prompt=image_prompt,
+                done=done,
+                on_image=on_image
+            )
+
+    job['image_path'] = images['header']
+    job['inline_images'] = images['inline']
+    job['failed_images'] = images['failed']
+
+    if images['header']:
+        echo(f"   ✅ Header image saved: {images['header'].name}")
+    else:
+        echo("   ⚠️  Header image failed, continuing without it")
+    if markers:
+        echo(f"   ✅ Generated {len(images['inline'])} inline images")
+    for failure in images['failed']:
+        if failure['kind'] == 'inline':
+            echo(f"   ⚠️  Inline image {failure['filename']} failed: {failure['error']}")
+
+    return job
+
+
+def save_post(
+    job: Dict,
+    dry_run: bool = False,
+    echo: Callable[[str], None] = print
+) -> Dict:
+    """
+    Write stage: create the MDX file (or print a preview in dry run mode).
+    """
+    post_data = job['post_data']
+
+    if dry_run:
+        echo("\n" + preview_post(post_data))
+        return job
+
+    echo(f"\n💾 Saving MDX file ({job['date']})...")
+    with get_metrics().time("write"):
+        job['output_path'] = create_mdx_file(post_data, job['image_path'], job['inline_images'])
+    echo(f"   ✅ Saved: {job['output_path'].name}")
+
+    if job.get('journal'):
+        job['journal'].set("mdx", str(job['output_path']))
+        _finish_if_complete(job)
+    return job
+
+
+def record_post(job: Dict, topic_manager: TopicManager, level: str):
+    """Record the job's topic and date in the topic history."""
+    journal = job.get('journal')
+    if journal and journal.get("recorded"):
+        return
+
+    post_data = job['post_data']
+    with get_metrics().time("record"):
+        topic_manager.record_topic(
+            topic=job['topic'],
+            date=job['date'],
+            category=job['category'],
+            metadata={
+                "title": post_data['title'],
+                "level": level,
+                "tags": post_data['tags']
+            }
+        )
+
+    if journal:
+        journal.set("recorded", True)
+        _finish_if_complete(job)
+
+
+def reserve_post(job: Dict, topic_manager: TopicManager):
+    """Mark the job's topic and date as used for the following suggestions, without saving them."""
+    topic_manager.reserve_topic(job['topic'], job['date'], job['category'])
+
+
+def run_serial(
+    schedule: List[Tuple[int, str]],
+    topic_manager: TopicManager,
+    level: str,
+    days: int,
+    topic: Optional[str] = None,
+    no_image: bool = False,
+    dry_run: bool = False,
+    stream: bool = False,
+    echo: Callable[[str], None] = print
+) -> List[Dict]:
+    """
+    Generate posts one day at a time: text, images, MDX, then record.
+    API pacing is handled by the shared rate limiter. Every finished stage is
+    checkpointed in a PostJournal (except in dry run mode).
+
+    Args:
+        schedule: List of (day index, date) pairs to generate
+        days: Total number of requested days (for progress output)
+        stream: Stream the text and start each image as soon as its prompt arrives
+
+    Returns:
+        List of finished job dicts
+    """
+    finished = []
+
+    for i, date in schedule:
+        echo(f"\n{'='*50}")
+        echo(f"📅 Generating post for {date} ({i+1}/{days})")
+        echo(f"{'='*50}")
+
+        job = prepare_post(
+            topic_manager, date, level,
+            topic=topic if i == 0 else None,
+            force_learning=bool(topic),
+            echo=echo,
+            journal=None if dry_run else PostJournal(date),
+            stream=stream and not (no_image or dry_run)
+        )
+        render_images(job, no_image=no_image, dry_run=dry_run, echo=echo)
+        save_post(job, dry_run=dry_run, echo=echo)
+        if not dry_run:
+            record_post(job, topic_manager, level)
+        finished.append(job)
+
+    return finished
+
+
+def run_pipelined(
+    schedule: List[Tuple[int, str]],
+    topic_manager: TopicManager,
+    level: str,
+    days: int,
+    topic: Optional[str] = None,
+    no_image: bool = False,
+    dry_run: bool = False,
+    stream: bool = False,
+    image_workers: int = 2,
+    max_in_flight: Optional[int] = None,
+    echo: Callable[[str], None] = print
+) -> List[Dict]:
+    """
+    Generate posts with day N+1's text overlapping day N's images.
+
+    The text stage runs on the calling thread, one day at a time, because each
+    topic suggestion depends on the history of the previous days. The topic is
+    reserved in memory as soon as its text exists, so the next suggestion sees
+    the same history as in the serial path. Image jobs run on a bounded worker
+    pool; MDX files are written in date order as their images complete, and each
+    topic is recorded (saved) only after its MDX file is written, like in the
+    serial path. A post whose images or MDX fail is never recorded.
+
+    Args:
+        stream: Stream the text and start each image as soon as its prompt arrives
+        image_workers: Number of posts whose images are generated concurrently
+        max_in_flight: Maximum number of posts waiting on images (defaults to image_workers)
+
+    Returns:
+        List of finished job dicts, in date order
+    """
+    max_in_flight = max_in_flight or image_workers
+    finished = []
+    pending = deque()
+
+    def drain(limit: int):
+        # Write the oldest posts first so MDX files appear in date order
+        while len(pending) > limit:
+            job = pending.popleft().result()
+            finished.append(save_post(job, dry_run=dry_run, echo=echo))
+            if not dry_run:
+                record_post(job, topic_manager, level)
+
+    with ThreadPoolExecutor(max_workers=image_workers, thread_name_prefix="images") as image_pool:
+        for i, date in schedule:
+            echo(f"\n{'='*50}")
+            echo(f"📅 Generating post for {date} ({i+1}/{days})")
+            echo(f"{'='*50}")
+
+            job = prepare_post(
+                topic_manager, date, level,
+                topic=topic if i == 0 else None,
+                force_learning=bool(topic),
+                echo=echo,
+                journal=None if dry_run else PostJournal(date),
+                stream=stream and not (no_image or dry_run)
+            )
+            if not dry_run:
+                reserve_post(job, topic_manager)
+
+            pending.append(image_pool.submit(render_images, job, no_image, dry_run, echo))
+            drain(max_in_flight)
+
+        drain(0)
+
+    return finished
@@ -0,0 +1,204 @@
+"""
+Manifest of the generated posts (public/blogs/index.json).
+One entry per post with its frontmatter, image references, word count and content hash,
+upserted whenever a post is written so consumers don't have to parse every MDX file.
+"""
+
+import hashlib
+import json
+import multiprocessing
+import os
+import re
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from .config import OUTPUT_DIR, DATA_DIR, MANIFEST_FILE
+from .image_index import IMAGE_PATTERN
+from .output_writer import locked_file, write_output
+
+
+MANIFEST_VERSION = 1
+
+_thread_lock = threading.Lock()
+
+# JSX/HTML tags are not counted as words
+_TAG_PATTERN = re.compile(r'<[^>]+>')
+_WORD_PATTERN = re.compile(r"\w+(?:['’-]\w+)*")
+
+
+def _parse_scalar(value: str) -> str:
+    """Unquote a frontmatter value as written by create_frontmatter."""
+    value = value.strip()
+    if len(value) >= 2 and value[0] == value[-1] == "'":
+        return value[1:-1].replace("''", "'")
+    if len(value) >= 2 and value[0] == value[-1] == '"':
+        return value[1:-1]
+    return value
+
+
+def split_frontmatter(text: str) -> Tuple[Dict, str]:
+    """
+    Split an MDX file into its frontmatter and body.
+
+    Only the flat `key: value` and `key:` + `  - item` lists produced by
+    create_frontmatter are supported.
+
+    Returns:
+        (frontmatter dict, body) - an empty dict if the file has no frontmatter
+    """
+    if not text.startswith('---'):
+        return {}, text
+    end = text.find('\n---', 3)
+    if end == -1:
+        return {}, text
+
+    data: Dict = {}
+    current_list: Optional[List[str]] = None
+    for line in text[3:end].splitlines():
+        if not line.strip():
+            continue
+        if line.lstrip().startswith('- ') and current_list is not None:
+            current_list.append(_parse_scalar(line.lstrip()[2:]))
+            continue
+        key, _, value = line.partition(':')
+        if not value.strip():
+            current_list = data[key.strip()] = []
+        else:
+            current_list = None
+            data[key.strip()] = _parse_scalar(value)
+
+    body = text[end + 4:].lstrip('-').lstrip('\n')
+    return data, body
+
+
+def count_words(body: str) -> int:
+    """Words in the post body, not counting image markup and tags."""
+    prose = _TAG_PATTERN.sub(' ', IMAGE_PATTERN.sub(' ', body))
+    return len(_WORD_PATTERN.findall(prose))
+
+
+def build_entry(mdx_path: Path) -> Dict:
+    """
+    Read one post and build its manifest entry.
+
+    Args:
+        mdx_path: Path to the MDX file
+
+    Returns:
+        Dict with slug, file, date, title, description, tags, level, category,
+        image, images, word_count, content_hash and size
+    """
+    raw = Path(mdx_path).read_bytes()
+    frontmatter, body = split_frontmatter(raw.decode('utf-8'))
+
+    images = []
+    for match in IMAGE_PATTERN.finditer(body):
+        name = Path(match.group('md_src') or match.group('img_src')).name
+        if name not in images:
+            images.append(name)
+
+    return {
+        'slug': frontmatter.get('slug') or Path(mdx_path).stem,
+        'file': Path(mdx_path).name,
+        'date': frontmatter.get('date', ''),
+        'title': frontmatter.get('title', ''),
+        'description': frontmatter.get('description', ''),
+        'tags': frontmatter.get('tags', []),
+        'level': frontmatter.get('level', ''),
+        'category': frontmatter.get('category', ''),
+        'image': frontmatter.get('image', ''),
+        'images': images,
+        'word_count': count_words(body),
+        'content_hash': hashlib.sha256(raw).hexdigest(),
+        'size': len(raw)
+    }
+
+
+def _sort_key(entry: Dict):
+    # Newest first, like the blog index page
+    return (entry['date'], entry['file'])
+
+
+class PostManifest:
+    """The manifest file, read and replaced atomically under an exclusive lock."""
+
+    def __init__(self, manifest_file: Path = MANIFEST_FILE, lock_file: Path = DATA_DIR / ".manifest.lock"):
+        self.manifest_file = manifest_file
+        self.lock_file = lock_file
+
+    def _locked(self):
+        return locked_file(self.lock_file, _thread_lock)
+
+    def _read(self) -> List[Dict]:
+        if not self.manifest_file.exists():
+            return []
+        try:
+            with open(self.manifest_file, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, json.JSONDecodeError):
+            return []
+        if data.get('version') != MANIFEST_VERSION:
+            return []
+        return data.get('posts', [])
+
+    def _write(self, posts: List[Dict]):
+        posts = sorted(posts, key=_sort_key, reverse=True)
+        text = json.dumps({'version': MANIFEST_VERSION, 'posts': posts}, ensure_ascii=False, indent=2)
+        write_output(self.manifest_file, text + '\n')
+
+    def load(self) -> List[Dict]:
+        """All entries, newest post first."""
+        with self._locked():
+            return self._read()
+
+    def upsert(self, entry: Dict):
+        """Add or replace the entry for a post (matched by file name)."""
+        self.upsert_many([entry])
+
+    def upsert_many(self, entries: List[Dict]):
+        """Add or replace the entries for several posts in one write."""
+        files = {entry['file'] for entry in entries}
+        with self._locked():
+            posts = [post for post in self._read() if post['file'] not in files]
+            posts.extend(entries)
+            self._write(posts)
+
+    def replace_all(self, entries: List[Dict]):
+        """Write a freshly built manifest."""
+        with self._locked():
+            self._write(entries)
+
+
+def update_manifest(mdx_path: Path) -> Dict:
+    """Upsert the manifest entry of a post that was just written and return it."""
+    entry = build_entry(mdx_path)
+    PostManifest().upsert(entry)
+    return entry
+
+
+def rebuild_manifest(output_dir: Path = OUTPUT_DIR, workers: Optional[int] = None) -> List[Dict]:
+    """
+    Rebuild the manifest from every MDX file, reading the posts on a process pool.
+
+    Args:
+        output_dir: Directory holding the posts
+        workers: Number of processes (defaults to the CPU count)
+
+    Returns:
+        The new entries, newest post first
+    """
+    paths = sorted(output_dir.glob("*.mdx"))
+    workers = workers or os.cpu_count() or 1
+    if len(paths) < 2 or workers == 1:
+        entries = [build_entry(path) for path in paths]
+    else:
+        with ProcessPoolExecutor(
+            max_workers=workers,
+            mp_context=multiprocessing.get_context("spawn")
+        ) as pool:
+            entries = list(pool.map(build_entry, paths, chunksize=8))
+
+    PostManifest(output_dir / MANIFEST_FILE.name).replace_all(entries)
+    return sorted(entries, key=_sort_key, reverse=True)
@@ -0,0 +1,202 @@
+"""
+Process-wide rate limiter for Gemini and Imagen API calls.
+Token buckets per model with AIMD back-off when the API answers 429.
+"""
+
+import threading
+import time
+from typing import Any, Callable, Dict, Optional
+
+from google.genai.errors import ClientError
+
+from .config import RATE_LIMITS, RATE_LIMIT_RETRIES
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token estimate for a prompt (about 4 characters per token)."""
+    return len(text) // 4 + 1
+
+
+def is_rate_limit_error(error: Exception) -> bool:
+    """Check whether an API error is a 429 / quota exhausted response."""
+    return isinstance(error, ClientError) and error.code == 429
+
+
+class TokenBucket:
+    """
+    Thread-safe token bucket refilled continuously at `rate` units per minute.
+
+    Reservations may push the level below zero; the caller then waits until the
+    bucket has refilled, which keeps concurrent callers in FIFO order.
+    """
+
+    def __init__(self, rate: float):
+        self.rate = rate
+        self.capacity = rate
+        self.level = rate
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def _refill(self, now: float):
+        elapsed = now - self.updated
+        self.level = min(self.capacity, self.level + elapsed * self.rate / 60)
+        self.updated = now
+
+    def reserve(self, amount: float) -> float:
+        """Take `amount` units and return the seconds to wait before using them."""
+        with self.lock:
+            now = time.monotonic()
+            self._refill(now)
+            # Never ask for more than a full bucket, or the wait would be unbounded
+            self.level -= min(amount, self.capacity)
+            if self.level >= 0:
+                return 0.0
+            return -self.level * 60 / self.rate
+
+    def refund(self, amount: float):
+        """Return (or, with a negative amount, take) units after the real cost is known."""
+        with self.lock:
+            self._refill(time.monotonic())
+            self.level = min(self.capacity, self.level + amount)
+
+    def set_rate(self, rate: float):
+        """Change the refill rate, keeping the current level."""
+        with self.lock:
+            self._refill(time.monotonic())
+            self.rate = rate
+
+    def drain(self):
+        """Empty the bucket so the next reservation waits for a refill."""
+        with self.lock:
+            self._refill(time.monotonic())
+            self.level = min(self.level, 0.0)
+
+
+class ModelLimiter:
+    """
+    Requests-per-minute and tokens-per-minute budgets for one model.
+
+    The effective rate is the configured quota times `factor`. Every 429 halves
+    the factor (multiplicative decrease) and every success adds `increase_step`
+    back (additive increase), so the limiter settles just below the real quota.
+    """
+
+    def __init__(
+        self,
+        rpm: float,
+        tpm: float = 0,
+        min_factor: float = 0.1,
+        increase_step: float = 0.05
+    ):
+        self.rpm = rpm
+        self.tpm = tpm
+        self.factor = 1.0
+        self.min_factor = min_factor
+        self.increase_step = increase_step
+        self.requests = TokenBucket(rpm)
+        self.tokens = TokenBucket(tpm) if tpm else None
+        self.lock = threading.Lock()
+        self.stats = {"requests": 0, "throttled": 0, "waited_seconds": 0.0}
+
+    def acquire(self, tokens: int = 0) -> float:
+        """Block until one request (and `tokens` tokens) fit in the budget."""
+        wait = self.requests.reserve(1)
+        if self.tokens and tokens:
+            wait = max(wait, self.tokens.reserve(tokens))
+        if wait > 0:
+            time.sleep(wait)
+        with self.lock:
+            self.stats["requests"] += 1
+            self.stats["waited_seconds"] += wait
+        return wait
+
+    def _apply_factor(self):
+        self.requests.set_rate(self.rpm * self.factor)
+        if self.tokens:
+            self.tokens.set_rate(self.tpm * self.factor)
+
+    def record_success(self, tokens_used: Optional[int] = None, tokens_reserved: int = 0):
+        """Additive increase, and settle the token budget with the real usage."""
+        if self.tokens and tokens_used is not None:
+            self.tokens.refund(tokens_reserved - tokens_used)
+        with self.lock:
+            if self.factor < 1.0:
+                self.factor = min(1.0, self.factor + self.increase_step)
+                self._apply_factor()
+
+    def record_throttle(self):
+        """Multiplicative decrease after a 429, and wait for a refill before the next call."""
+        with self.lock:
+            self.stats["throttled"] += 1
+            self.factor = max(self.min_factor, self.factor / 2)
+            self._apply_factor()
+        self.requests.drain()
+        if self.tokens:
+            self.tokens.drain()
+
+
+class RateLimiter:
+    """Registry of per-model limiters shared by every API call in the process."""
+
+    def __init__(self, limits: Dict[str, Dict[str, int]], retries: int = RATE_LIMIT_RETRIES):
+        self.limits = limits
+        self.retries = retries
+        self.models: Dict[str, ModelLimiter] = {}
+        self.lock = threading.Lock()
+
+    def for_model(self, model: str) -> ModelLimiter:
+        """Get (or create) the limiter for a model."""
+        with self.lock:
+            if model not in self.models:
+                limits = self.limits.get(model, {"rpm": 10, "tpm": 0})
+                self.models[model] = ModelLimiter(limits["rpm"], limits.get("tpm", 0))
+            return self.models[model]
+
+    def call(self, model: str, fn: Callable[[], Any], tokens: int = 0) -> Any:
+        """
+        Run `fn` inside the model's budget, retrying on 429 responses.
+
+        Args:
+            model: Model name the call is billed against
+            fn: Zero-argument callable making the API request
+            tokens: Estimated tokens (prompt + expected output) for the call
+
+        Returns:
+            Whatever `fn` returns
+
+        Raises:
+            ClientError: The last 429 once all retries are used up, or any other API error
+        """
+        limiter = self.for_model(model)
+        for attempt in range(self.retries + 1):
+            limiter.acquire(tokens)
+            try:
+                result = fn()
+            except ClientError as e:
+                if not is_rate_limit_error(e):
+                    raise
+                limiter.record_throttle()
+                if attempt == self.retries:
+                    raise
+                print(f"⚠️ Rate limit hit for {model}, backing off (retry {attempt + 1}/{self.retries})...")
+                continue
+
+            usage = getattr(result, "usage_metadata", None)
+            limiter.record_success(getattr(usage, "total_token_count", None), tokens)
+            return result
+
+    def get_stats(self) -> Dict[str, Dict]:
+        """Per-model request, throttle and wait statistics."""
+        with self.lock:
+            return {
+                model: dict(limiter.stats, factor=round(limiter.factor, 2))
+                for model, limiter in self.models.items()
+            }
+
+
+_rate_limiter = RateLimiter(RATE_LIMITS)
+
+
+def get_rate_limiter() -> RateLimiter:
+    """Get the process-wide rate limiter."""
+    return _rate_limiter
@@ -0,0 +1,249 @@
+"""
+Re-render existing posts with the current MDX formatter, without any model calls.
+Each post is parsed back into post_data and written again only if the output bytes
+change, so untouched posts keep their mtimes.
+"""
+
+import json
+import multiprocessing
+import os
+import re
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from .config import OUTPUT_DIR, MANIFEST_FILE
+from .image_index import IMAGE_PATTERN
+from .mdx_formatter import render_mdx
+from .mdx_transforms import CALLOUTS
+from .output_writer import is_unchanged, write_output
+from .post_manifest import PostManifest, build_entry, split_frontmatter
+from .corpus_stats import CorpusStats
+
+
+# Frontmatter create_frontmatter writes; anything else was edited by hand and would be lost
+FRONTMATTER_KEYS = {
+    "title", "date", "description", "slug", "level", "category", "tags",
+    "image", "author", "draft", "schemaMarkup"
+}
+FIXED_FRONTMATTER = {"author": "Kielo Finnish", "draft": "false"}
+
+# <Callout ...>\ntext\n</Callout> back to the "> 💡 Tip: text" line it was rendered from
+_CALLOUT_SOURCES = [
+    (re.compile(rf'^{re.escape(tag)}\n(\S[^\n]*)\n</Callout>$', re.MULTILINE), f"> {emoji} {labels[0]}: ")
+    for emoji, labels, tag in CALLOUTS
+]
+
+
+# Attributes of a responsive <img> (before its alt, which may contain anything)
+SRCSET_ATTR = re.compile(r'\bsrcSet="([^"]*)"')
+WIDTH_ATTR = re.compile(r'\bwidth=\{(\d+)\}')
+HEIGHT_ATTR = re.compile(r'\bheight=\{(\d+)\}')
+
+
+class RerenderError(ValueError):
+    """A post can't be parsed back into the shape the formatter renders."""
+
+
+def _tag_variants(src: str, attributes: str) -> Optional[Dict]:
+    """
+    Width, height and variants of a responsive <img> from its srcSet, width and
+    height (as create_image_markup takes them), so re-rendering doesn't depend on
+    the variants file.
+    """
+    srcset = SRCSET_ATTR.search(attributes)
+    width = WIDTH_ATTR.search(attributes)
+    height = HEIGHT_ATTR.search(attributes)
+    if not (srcset and width and height):
+        return None
+
+    width, height = int(width.group(1)), int(height.group(1))
+    variants = []
+    for source in srcset.group(1).split(","):
+        url, _, descriptor = source.strip().rpartition(" ")
+        if url == src or not descriptor.endswith("w") or not descriptor[:-1].isdigit():
+            continue
+        variant_width = int(descriptor[:-1])
+        variants.append({
+            "file": Path(url).name,
+            "width": variant_width,
+            "height": round(height * variant_width / width)
+        })
+    return {"width": width, "height": height, "variants": variants}
+
+
+def _image_at(body: str, match: re.Match) -> Tuple[str, str, int, Optional[Dict]]:
+    """
+    (src, alt, end, variants) of an IMAGE_PATTERN match, end including the rest of an
+    <img /> tag; variants is None for markdown images.
+    """
+    if match.group('md_src'):
+        return match.group('md_src'), match.group('md_alt'), match.end(), None
+    end = body.find('/>', match.end())
+    if end == -1:
+        raise RerenderError("unterminated <img> tag")
+    src = match.group('img_src')
+    variants = _tag_variants(src, body[match.start():match.start('img_alt')])
+    return src, json.loads(match.group('img_alt')), end + 2, variants
+
+
+def _restore_image_markers(body: str) -> Tuple[str, Dict[str, Path], Dict[str, Dict]]:
+    """Turn generated inline images back into [IMAGE:alt] markers, their paths and their variants."""
+    inline_images: Dict[str, Path] = {}
+    image_variants: Dict[str, Dict] = {}
+    parts, done = [], 0
+    for match in IMAGE_PATTERN.finditer(body):
+        if match.start() < done:
+            continue
+        src, alt, end, variants = _image_at(body, match)
+        marker = f"[IMAGE:{alt}]"
+        # Only images the formatter could have produced from a marker round-trip
+        if (
+            not src.startswith("/blogs/images/") or not alt or alt != alt.strip()
+            or ']' in alt or '\n' in alt or marker in body
+            or inline_images.get(marker, Path(src)).name != Path(src).name
+        ):
+            continue
+        inline_images[marker] = Path(Path(src).name)
+        if variants:
+            image_variants[Path(src).name] = variants
+        parts.append(body[done:match.start()])
+        parts.append(marker)
+        done = end
+    parts.append(body[done:])
+    return "".join(parts), inline_images, image_variants
+
+
+def parse_post(mdx_path: Path) -> Dict:
+    """
+    Parse an MDX file written by create_mdx_file back into its inputs.
+
+    Args:
+        mdx_path: Path to the MDX file
+
+    Returns:
+        Dict with post_data, image_path (or None), inline_images and image_variants
+        (srcSet, width and height of the existing <img> tags), as passed to render_mdx
+
+    Raises:
+        RerenderError: The post has hand-made changes the formatter can't reproduce
+    """
+    frontmatter, body = split_frontmatter(Path(mdx_path).read_bytes().decode('utf-8'))
+    if not frontmatter:
+        raise RerenderError("no frontmatter")
+    extra = sorted(set(frontmatter) - FRONTMATTER_KEYS)
+    if extra:
+        raise RerenderError(f"frontmatter has extra keys: {', '.join(extra)}")
+    for key, value in FIXED_FRONTMATTER.items():
+        if frontmatter.get(key, value) != value:
+            raise RerenderError(f"frontmatter {key} was changed to '{frontmatter[key]}'")
+
+    # The header image is the first thing in the body
+    image_path, image_alt, header_variants = None, None, None
+    if frontmatter.get('image'):
+        match = IMAGE_PATTERN.match(body)
+        if not match:
+            raise RerenderError("header image is not at the top of the body")
+        src, image_alt, end, header_variants = _image_at(body, match)
+        if src != frontmatter['image'] or not body.startswith("\n\n", end):
+            raise RerenderError("header image is not at the top of the body")
+        image_path = Path(Path(src).name)
+        body = body[end + 2:]
+
+    content, inline_images, image_variants = _restore_image_markers(body)
+    if header_variants:
+        image_variants[image_path.name] = header_variants
+    for pattern, source in _CALLOUT_SOURCES:
+        content = pattern.sub(lambda m: source + m.group(1), content)
+
+    post_data = {
+        "title": frontmatter.get('title', ''),
+        "date": frontmatter.get('date', ''),
+        "description": frontmatter.get('description', ''),
+        "tags": frontmatter.get('tags', []),
+        "level": frontmatter.get('level', ''),
+        "category": frontmatter.get('category', ''),
+        "slug": frontmatter.get('slug', ''),
+        "content": content,
+    }
+    if image_alt is not None:
+        post_data["image_alt"] = image_alt
+
+    return {
+        "post_data": post_data,
+        "image_path": image_path,
+        "inline_images": inline_images,
+        "image_variants": image_variants
+    }
+
+
+def rerender_post(mdx_path: Path, dry_run: bool = False) -> Dict:
+    """
+    Re-render one post and write it only if its bytes changed.
+
+    Args:
+        mdx_path: Path to the MDX file
+        dry_run: Only report whether it would change
+
+    Returns:
+        Dict with file, status ('updated', 'unchanged' or 'skipped'), reason (skipped)
+        and entry (the new manifest entry of an updated post)
+    """
+    mdx_path = Path(mdx_path)
+    try:
+        parsed = parse_post(mdx_path)
+    except (RerenderError, UnicodeDecodeError, ValueError) as e:
+        return {"file": mdx_path.name, "status": "skipped", "reason": str(e)}
+
+    _, text = render_mdx(
+        parsed["post_data"], parsed["image_path"], parsed["inline_images"], parsed["image_variants"]
+    )
+    data = text.encode('utf-8')
+    if is_unchanged(mdx_path, data):
+        return {"file": mdx_path.name, "status": "unchanged"}
+
+    if dry_run:
+        return {"file": mdx_path.name, "status": "updated"}
+    write_output(mdx_path, data)
+    return {"file": mdx_path.name, "status": "updated", "entry": build_entry(mdx_path)}
+
+
+def rerender_posts(
+    output_dir: Path = OUTPUT_DIR,
+    workers: Optional[int] = None,
+    dry_run: bool = False,
+    paths: Optional[List[Path]] = None
+) -> List[Dict]:
+    """
+    Re-render every post (or the given ones) on a process pool.
+
+    The manifest entries of updated posts are written in one go and the corpus
+    statistics re-checked afterwards.
+
+    Args:
+        output_dir: Directory holding the posts
+        workers: Number of processes (defaults to the CPU count)
+        dry_run: Only report which posts would change
+        paths: Posts to re-render (defaults to every MDX file in output_dir)
+
+    Returns:
+        One result dict per post (see rerender_post), in file name order
+    """
+    paths = sorted(paths if paths is not None else output_dir.glob("*.mdx"))
+    workers = workers or os.cpu_count() or 1
+    render = partial(rerender_post, dry_run=dry_run)
+    if len(paths) < 2 or workers == 1:
+        results = [render(path) for path in paths]
+    else:
+        with ProcessPoolExecutor(
+            max_workers=workers,
+            mp_context=multiprocessing.get_context("spawn")
+        ) as pool:
+            results = list(pool.map(render, paths, chunksize=8))
+
+    entries = [result.pop("entry") for result in results if "entry" in result]
+    if entries:
+        PostManifest(output_dir / MANIFEST_FILE.name).upsert_many(entries)
+        CorpusStats(output_dir, output_dir / "images").refresh(full=True)
+    return results
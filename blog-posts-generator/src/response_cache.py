@@ -0,0 +1,190 @@
+"""
+Content-addressed on-disk cache for model responses.
+Stores text responses and raw image bytes keyed on a hash of model, prompt and config.
+"""
+
+import hashlib
+import json
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, Optional
+
+from .config import CACHE_DIR, CACHE_MAX_BYTES, CACHE_MAX_AGE_DAYS
+
+
+class ResponseCache:
+    """
+    Disk cache for model calls with size- and age-based LRU eviction.
+
+    Entries live in `directory/<key[:2]>/<key>.<ext>`. A hit touches the file's
+    mtime, so mtime is the "last used" time that eviction works from.
+    """
+
+    def __init__(
+        self,
+        directory: Path = CACHE_DIR,
+        max_bytes: int = CACHE_MAX_BYTES,
+        max_age_days: float = CACHE_MAX_AGE_DAYS,
+        enabled: bool = True,
+        refresh: bool = False
+    ):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.max_age_days = max_age_days
+        self.enabled = enabled
+        self.refresh = refresh
+        self.lock = threading.Lock()
+        self.stats = {"hits": 0, "misses": 0, "writes": 0, "evicted": 0}
+
+    @staticmethod
+    def make_key(model: str, prompt: str, config: Any = None) -> str:
+        """Hash model, prompt and config into a cache key."""
+        payload = json.dumps([model, prompt, config], sort_keys=True, default=str, ensure_ascii=False)
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+    def _path(self, key: str, ext: str) -> Path:
+        return self.directory / key[:2] / f"{key}.{ext}"
+
+    def _count(self, stat: str):
+        with self.lock:
+            self.stats[stat] += 1
+
+    def _read(self, key: str, ext: str) -> Optional[bytes]:
+        if not self.enabled or self.refresh:
+            return None
+
+        path = self._path(key, ext)
+        try:
+            data = path.read_bytes()
+        except FileNotFoundError:
+            self._count("misses")
+            return None
+
+        # Mark as recently used for LRU eviction
+        os.utime(path)
+        self._count("hits")
+        return data
+
+    def _write(self, key: str, ext: str, data: bytes):
+        if not self.enabled:
+            return
+
+        path = self._path(key, ext)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_name(f"{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+        tmp_path.write_bytes(data)
+        os.replace(tmp_path, path)
+        self._count("writes")
+
+    def get_text(self, key: str) -> Optional[str]:
+        """Get a cached text response, or None on a miss."""
+        data = self._read(key, "txt")
+        return data.decode('utf-8') if data is not None else None
+
+    def put_text(self, key: str, text: str):
+        """Store a text response."""
+        self._write(key, "txt", text.encode('utf-8'))
+
+    def get_bytes(self, key: str) -> Optional[bytes]:
+        """Get cached raw bytes (e.g. an image), or None on a miss."""
+        return self._read(key, "bin")
+
+    def put_bytes(self, key: str, data: bytes):
+        """Store raw bytes."""
+        self._write(key, "bin", data)
+
+    def evict(self) -> int:
+        """
+        Remove entries older than max_age_days, then the least recently used
+        entries until the cache fits in max_bytes.
+
+        Returns:
+            Number of removed entries
+        """
+        if not self.directory.exists():
+            return 0
+
+        cutoff = time.time() - self.max_age_days * 86400
+        entries = []
+        removed = 0
+
+        for path in self.directory.glob("*/*.*"):
+            if path.suffix not in (".txt", ".bin"):
+                continue
+            stat = path.stat()
+            if stat.st_mtime < cutoff:
+                path.unlink(missing_ok=True)
+                removed += 1
+            else:
+                entries.append((stat.st_mtime, stat.st_size, path))
+
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            path.unlink(missing_ok=True)
+            total -= size
+            removed += 1
+
+        with self.lock:
+            self.stats["evicted"] += removed
+        return removed
+
+    def get_stats(self) -> Dict[str, int]:
+        """Hit, miss, write and eviction counts for this process."""
+        with self.lock:
+            return dict(self.stats)
+
+
+_response_cache = ResponseCache()
+
+
+def get_response_cache() -> ResponseCache:
+    """Get the process-wide response cache."""
+    return _response_cache
+
+
+def configure_response_cache(enabled: bool = True, refresh: bool = False):
+    """
+    Switch the shared cache on or off.
+
+    Args:
+        enabled: False disables both reads and writes (--no-cache)
+        refresh: True skips reads but still stores new responses (--refresh)
+    """
+    _response_cache.enabled = enabled
+    _response_cache.refresh = refresh
+
+
+def cached_text(model: str, prompt: str, config: Any, generate: Callable[[], str]) -> str:
+    """
+    Return the cached text response for (model, prompt, config), or call
+    `generate` and store its result.
+    """
+    cache = get_response_cache()
+    key = cache.make_key(model, prompt, config)
+
+    text = cache.get_text(key)
+    if text is None:
+        text = generate()
+        if text:
+            cache.put_text(key, text)
+    return text
+
+
+def cached_bytes(model: str, prompt: str, config: Any, generate: Callable[[], bytes]) -> bytes:
+    """
+    Return the cached bytes for (model, prompt, config), or call `generate`
+    and store its result.
+    """
+    cache = get_response_cache()
+    key = cache.make_key(model, prompt, config)
+
+    data = cache.get_bytes(key)
+    if data is None:
+        data = generate()
+        if data:
+            cache.put_bytes(key, data)
+    return data
@@ -0,0 +1,241 @@
+"""
+Parsers for the structured text the model returns.
+Post responses are split into their ---SECTION--- blocks and topic suggestions
+into their FIELD: lines, each in a single pass over the text. Streamed responses
+can be followed chunk by chunk to act on sections before the response ends.
+"""
+
+import re
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List, Optional, Sequence
+
+
+# Sections generate_blog_post asks for, in prompt order
+POST_SECTIONS = ("TITLE", "SLUG", "DESCRIPTION", "TAGS", "IMAGE_PROMPT", "IMAGE_ALT", "CONTENT")
+SUGGESTION_FIELDS = ("TOPIC", "CATEGORY", "BRIEF")
+
+# ---NAME--- markers; markdown rules (---) and front matter fences never match
+SECTION_MARKER = re.compile(r'---([A-Za-z_]+)---')
+END_SECTION = "END"
+
+# NAME: value, up to the end of the line
+FIELD_LINE = re.compile(r'\b([A-Z_]+):[ \t]*([^\n]*)')
+
+# [IMAGE:description] placeholders inside the post content
+IMAGE_MARKER = re.compile(r'\[IMAGE:([^\]]+)\]')
+IMAGE_MARKER_START = "[IMAGE:"
+
+# The end of a chunk that may be the start of a ---NAME--- marker
+_PARTIAL_SECTION_MARKER = re.compile(r'-{1,3}(?:[A-Za-z_]+-{0,2})?\Z')
+
+
+class ResponseFormatError(ValueError):
+    """A model response is missing sections it can't do without."""
+
+
+@dataclass
+class ParsedResponse:
+    """
+    Sections (or fields) of one model response.
+
+    Attributes:
+        sections: Name -> stripped text; the first block wins when a name repeats
+        missing: Expected names that didn't appear (or were empty)
+        duplicated: Names that appeared more than once
+        unexpected: Names that appeared but weren't expected
+    """
+    sections: Dict[str, str] = field(default_factory=dict)
+    missing: List[str] = field(default_factory=list)
+    duplicated: List[str] = field(default_factory=list)
+    unexpected: List[str] = field(default_factory=list)
+
+    def get(self, name: str, default: str = "") -> str:
+        return self.sections.get(name, default)
+
+    def problems(self) -> List[str]:
+        """Human readable list of everything that didn't match the expected format."""
+        result = []
+        if self.missing:
+            result.append(f"missing {', '.join(self.missing)}")
+        if self.duplicated:
+            result.append(f"repeated {', '.join(self.duplicated)} (kept the first)")
+        if self.unexpected:
+            result.append(f"unexpected {', '.join(self.unexpected)}")
+        return result
+
+    def require(self, *names: str):
+        """Raise ResponseFormatError if any of the given sections is missing."""
+        absent = [name for name in names if name in self.missing]
+        if absent:
+            raise ResponseFormatError(f"Model response has no {', '.join(absent)} section")
+
+
+def _finish(result: ParsedResponse, found: Dict[str, str], expected: Optional[Sequence[str]]) -> ParsedResponse:
+    result.sections = {name: text for name, text in found.items() if text}
+    if expected is not None:
+        result.missing = [name for name in expected if name not in result.sections]
+        result.unexpected = [name for name in found if name not in expected]
+    return result
+
+
+def parse_sections(text: str, expected: Optional[Sequence[str]] = POST_SECTIONS) -> ParsedResponse:
+    """
+    Split a response into its ---SECTION--- blocks in one pass.
+
+    Section names are case-insensitive (returned upper case). Each block runs to the
+    next marker; ---END--- stops parsing, anything after it is ignored.
+
+    Args:
+        text: The model response
+        expected: Section names the response should contain (None to accept anything)
+
+    Returns:
+        ParsedResponse with the sections and any missing, repeated or unexpected names
+    """
+    result = ParsedResponse()
+    found: Dict[str, str] = {}
+    current: Optional[str] = None
+    start = 0
+
+    for marker in SECTION_MARKER.finditer(text):
+        if current is not None:
+            if current in found:
+                result.duplicated.append(current)
+            else:
+                found[current] = text[start:marker.start()].strip()
+        current = marker.group(1).upper()
+        start = marker.end()
+        if current == END_SECTION:
+            current = None
+            break
+
+    if current is not None:
+        if current in found:
+            result.duplicated.append(current)
+        else:
+            found[current] = text[start:].strip()
+
+    return _finish(result, found, expected)
+
+
+def parse_fields(text: str, expected: Optional[Sequence[str]] = SUGGESTION_FIELDS) -> ParsedResponse:
+    """
+    Read single-line NAME: value fields (e.g. a topic suggestion) in one pass.
+
+    Args:
+        text: The model response
+        expected: Field names to collect (None to collect every NAME: line)
+
+    Returns:
+        ParsedResponse with the fields and any missing or repeated names
+    """
+    result = ParsedResponse()
+    found: Dict[str, str] = {}
+
+    for match in FIELD_LINE.finditer(text):
+        name = match.group(1)
+        if expected is not None and name not in expected:
+            continue
+        if name in found:
+            result.duplicated.append(name)
+        else:
+            found[name] = match.group(2).strip()
+
+    return _finish(result, found, expected)
+
+
+class StreamingSectionParser:
+    """
+    Follows a streamed post response chunk by chunk.
+
+    Calls on_section(name, text) as soon as a section is complete (its closing
+    marker has arrived) and on_image_marker({'marker', 'description'}) for every
+    [IMAGE:...] marker as soon as it is complete in the CONTENT section. Each
+    chunk is only scanned once. Sections follow the parse_sections rules (first
+    block wins, empty blocks are skipped, ---END--- stops); the final response
+    should still be parsed with parse_sections.
+    """
+
+    def __init__(
+        self,
+        on_section: Optional[Callable[[str, str], None]] = None,
+        on_image_marker: Optional[Callable[[Dict[str, str]], None]] = None
+    ):
+        self.on_section = on_section
+        self.on_image_marker = on_image_marker
+        self.chunks: List[str] = []
+        self.seen: List[str] = []
+        self.current: Optional[str] = None
+        self.ended = False
+        self._pending = ""  # not yet assigned to a section (may hold a partial marker)
+        self._section: List[str] = []
+        self._images = ""  # CONTENT text not yet scanned for a complete image marker
+
+    def feed(self, chunk: str):
+        """Add the next chunk of the response."""
+        self.chunks.append(chunk)
+        if self.ended:
+            return
+
+        text = self._pending + chunk
+        start = 0
+        for marker in SECTION_MARKER.finditer(text):
+            self._add(text[start:marker.start()])
+            self._close_section()
+            start = marker.end()
+            self.current = marker.group(1).upper()
+            if self.current == END_SECTION:
+                self.current = None
+                self.ended = True
+                self._pending = ""
+                return
+
+        partial = _PARTIAL_SECTION_MARKER.search(text, start)
+        cut = partial.start() if partial else len(text)
+        self._add(text[start:cut])
+        self._pending = text[cut:]
+
+    def close(self) -> str:
+        """Finish the last section and return the whole response text."""
+        if not self.ended:
+            self._add(self._pending)
+            self._pending = ""
+            self._close_section()
+            self.ended = True
+        return "".join(self.chunks)
+
+    def _add(self, text: str):
+        if self.current is None or not text:
+            return
+        self._section.append(text)
+        if self.current == "CONTENT" and "CONTENT" not in self.seen:
+            self._scan_images(text)
+
+    def _scan_images(self, text: str):
+        text = self._images + text
+        end = 0
+        for match in IMAGE_MARKER.finditer(text):
+            end = match.end()
+            if self.on_image_marker:
+                self.on_image_marker({'marker': match.group(0), 'description': match.group(1).strip()})
+
+        # Keep the first '[' after the last ']' that may still become a marker
+        rest = text[max(end, text.rfind(']') + 1):]
+        self._images = ""
+        index = rest.find('[')
+        while index != -1:
+            if IMAGE_MARKER_START.startswith(rest[index:index + len(IMAGE_MARKER_START)]):
+                self._images = rest[index:]
+                break
+            index = rest.find('[', index + 1)
+
+    def _close_section(self):
+        if self.current is None:
+            return
+        name, text = self.current, "".join(self._section).strip()
+        self.current, self._section, self._images = None, [], ""
+        if name in self.seen:
+            return
+        self.seen.append(name)
+        if text and self.on_section:
+            self.on_section(name, text)
@@ -3,86 +3,119 @@ Topic Manager for Finnish Blog Post Generator.
 Tracks used topics and dates to ensure variety and no duplicates.
 """
 
-import json
+import re
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
-from pathlib import Path
-from typing import Dict, List, Optional, Set
+from typing import Callable, Dict, List, Optional, Set, Tuple
 
-from .config import DATA_DIR, TOPIC_CATEGORIES, GEMINI_API_KEY, TEXT_MODEL
-
-from google import genai
+from .config import (
+    TOPIC_CATEGORIES, LEARNING_CATEGORIES, CULTURE_CATEGORIES, TEXT_MODEL, CONCEPT_PROMPT_TOKEN_BUDGET
+)
+from .client_registry import get_client
+from .rate_limiter import get_rate_limiter, estimate_tokens
+from .response_cache import cached_text
+from .category_coverage import CategoryCoverage
+from .concept_index import ConceptIndex
+from .date_calendar import DateCalendar
+from .topic_similarity import TopicSimilarityIndex
+from .topic_store import open_topic_store, apply_record, apply_concepts, empty_history, hot_details
 
 
 class TopicManager:
     """Manages topic selection and tracking for blog posts."""
     
-    def __init__(self):
-        self.topics_file = DATA_DIR / "topics_history.json"
-        self.dates_file = DATA_DIR / "dates_used.json"
+    def __init__(self, store=None):
+        self.store = store or open_topic_store()
+        self._lock = threading.Lock()
+        self._concept_worker: Optional[ThreadPoolExecutor] = None
+        self._similarity_index: Optional[TopicSimilarityIndex] = None
+        # Topics reserved in memory (see reserve_topic) that aren't saved yet
+        self._reserved: Set[str] = set()
         self._load_data()
     
     def _load_data(self):
-        """Load existing topic and date history."""
-        # Load topics history
-        if self.topics_file.exists():
-            with open(self.topics_file, 'r', encoding='utf-8') as f:
-                self.topics_history = json.load(f)
-        else:
-            self.topics_history = {
-                "used_topics": [],
-                "topic_details": {}
-            }
-        
-        # Load dates used
-        if self.dates_file.exists():
-            with open(self.dates_file, 'r', encoding='utf-8') as f:
-                self.dates_used = json.load(f)
-        else:
-            self.dates_used = {"dates": []}
-    
-    def _save_data(self):
-        """Save topic and date history."""
-        with open(self.topics_file, 'w', encoding='utf-8') as f:
-            json.dump(self.topics_history, f, ensure_ascii=False, indent=2)
-        
-        with open(self.dates_file, 'w', encoding='utf-8') as f:
-            json.dump(self.dates_used, f, ensure_ascii=False, indent=2)
+        """Load the topic and date history (without metadata, see get_topic_details)."""
+        self.topics_history, dates_used = self.store.load_hot()
+        self.calendar = DateCalendar(dates_used.get("dates", []))
+        self.concept_index = ConceptIndex.from_history(self.topics_history.get("topic_details", {}))
+        self.coverage = CategoryCoverage.from_history(self.topics_history.get("topic_details", {}))
     
     def get_used_topics(self) -> List[str]:
         """Get list of already used topics."""
         return self.topics_history.get("used_topics", [])
     
     def get_available_categories(self) -> List[str]:
-        """Get topic categories that haven't been fully explored."""
-        used = set(self.get_used_topics())
-        return [cat for cat in TOPIC_CATEGORIES if cat not in used]
+        """Get topic categories that don't have any post yet."""
+        with self._lock:
+            return self.coverage.uncovered()
+    
+    def get_category_coverage(self) -> Dict[str, int]:
+        """Get the number of posts per category."""
+        with self._lock:
+            return dict(self.coverage.counts)
+    
+    def get_least_covered_categories(self, content_type: Optional[str] = None) -> List[str]:
+        """
+        Get categories ordered by post count, fewest first.
+        
+        Args:
+            content_type: 'learning' or 'culture' to only return that type's categories
+        """
+        categories = {
+            "learning": LEARNING_CATEGORIES,
+            "culture": CULTURE_CATEGORIES,
+        }.get(content_type, TOPIC_CATEGORIES)
+        with self._lock:
+            return self.coverage.least_covered(categories)
+    
+    def get_next_content_type(self) -> str:
+        """Get the content type ('learning' or 'culture') that keeps the post mix closest to CONTENT_MIX."""
+        with self._lock:
+            return self.coverage.next_content_type()
     
     def is_date_used(self, date: str) -> bool:
         """Check if a date has already been used."""
-        return date in self.dates_used.get("dates", [])
+        return date in self.calendar
     
     def get_next_available_date(self, start_date: Optional[datetime] = None) -> str:
         """Get the next available date that hasn't been used."""
         if start_date is None:
             start_date = datetime.now() + timedelta(days=1)
         
-        current = start_date
-        max_attempts = 365  # Don't loop forever
+        return self.calendar.next_free(start_date)
+    
+    def get_available_dates(
+        self,
+        count: int,
+        start_date: Optional[datetime] = None,
+        weekdays_only: bool = False,
+        include: Optional[Set[str]] = None
+    ) -> List[str]:
+        """
+        Get the next `count` dates that haven't been used, in one call.
         
-        for _ in range(max_attempts):
-            date_str = current.strftime("%Y-%m-%d")
-            if not self.is_date_used(date_str):
-                return date_str
-            current += timedelta(days=1)
+        Args:
+            count: Number of dates to return
+            start_date: First date to consider (defaults to tomorrow)
+            weekdays_only: Only return Monday to Friday
+            include: Used dates to hand out anyway (e.g. unfinished posts being resumed)
         
-        raise ValueError("No available dates found in the next year")
+        Returns:
+            List of YYYY-MM-DD strings in order
+        """
+        if start_date is None:
+            start_date = datetime.now() + timedelta(days=1)
+        
+        return self.calendar.free_dates(start_date, count, weekdays_only=weekdays_only, include=include)
     
     def get_context_for_ai(self) -> str:
         """
         Get context about used topics for AI to make informed decisions.
         """
         used_topics = self.get_used_topics()
-        available_categories = self.get_available_categories()
+        coverage = self.get_category_coverage()
+        least_covered = self.get_least_covered_categories()
         
         context_parts = [
             "## Topic History",
@@ -97,60 +130,172 @@ class TopicManager:
         else:
             context_parts.append("  (No topics used yet)")
         
-        context_parts.append(f"\nAvailable categories to explore:")
-        for cat in available_categories[:10]:
-            context_parts.append(f"  - {cat}")
+        context_parts.append("\nLeast covered categories to explore:")
+        for cat in least_covered[:10]:
+            context_parts.append(f"  - {cat} ({coverage[cat]} posts)")
         
         return "\n".join(context_parts)
     
-    def _get_client(self):
-        """Get the Gemini client."""
-        if not GEMINI_API_KEY:
-            raise ValueError("GEMINI_API_KEY not found.")
-        return genai.Client(api_key=GEMINI_API_KEY)
-    
-    def extract_concepts(self, topic: str, category: Optional[str] = None) -> List[str]:
+    def extract_concepts_batch(self, topics: List[Tuple[str, Optional[str]]]) -> Dict[str, List[str]]:
         """
-        Use AI to extract core concepts/themes from a topic.
-        These concepts will be used to prevent semantically similar topics.
+        Extract concepts for many topics with a single AI call.
         
         Args:
-            topic: The topic title
-            category: Optional category for context
+            topics: List of (topic, category) pairs
         
         Returns:
-            List of 3-5 core concepts (lowercase keywords)
+            Dict mapping each topic to its 3-5 concepts. Topics the response
+            didn't cover are left out, so they can be retried later.
         """
         try:
-            client = self._get_client()
+            client = get_client()
             
-            prompt = f"""Extract 3-5 core concepts/themes from this Finnish blog topic.
+            numbered = "\n".join(
+                f"{i}. {topic}" + (f" (Category: {category})" if category else "")
+                for i, (topic, category) in enumerate(topics, 1)
+            )
+            
+            prompt = f"""Extract 3-5 core concepts/themes from EACH of these Finnish blog topics.
 
-Topic: {topic}
-{f"Category: {category}" if category else ""}
+Topics:
+{numbered}
 
-Return ONLY a comma-separated list of lowercase keywords that capture the core themes.
+For each topic, return ONE line: the topic number, a colon, then a comma-separated list of
+lowercase keywords that capture its core themes.
 These should be specific enough to prevent similar topics from being generated.
 
 Examples:
-- "Juhannus Taikaa: Celebrating Midsummer" → midsummer, juhannus, summer solstice, kokko, bonfire
-- "Bussilla Matkalle! Public Transport Guide" → bus, public transport, julkinen liikenne, travel, commuting
-- "Mökille! Finnish Cottage Trip" → cottage, mökki, summer house, lake, cabin
+1: midsummer, juhannus, summer solstice, kokko, bonfire
+2: bus, public transport, julkinen liikenne, travel, commuting
 
-Your response (just the comma-separated concepts, nothing else):"""
+Your response (one numbered line per topic, nothing else):"""
             
-            response = client.models.generate_content(
-                model=TEXT_MODEL,
-                contents=prompt
+            text = cached_text(
+                TEXT_MODEL, prompt, None,
+                lambda: get_rate_limiter().call(
+                    TEXT_MODEL,
+                    lambda: client.models.generate_content(
+                        model=TEXT_MODEL,
+                        contents=prompt
+                    ),
+                    tokens=estimate_tokens(prompt) + 40 * len(topics)
+                ).text
             )
-            
-            # Parse the response - split by comma and clean up
-            concepts = [c.strip().lower() for c in response.text.split(',') if c.strip()]
-            return concepts[:5]  # Limit to 5 concepts
-            
         except Exception as e:
-            print(f"Warning: Could not extract concepts: {e}")
-            return []
+            print(f"Warning: Could not extract concepts for batch: {e}")
+            return {}
+        
+        # Parse "N: concept, concept, ..." lines
+        results = {}
+        for match in re.finditer(r'^\s*(\d+)\s*[.:)]\s*(.+)$', text, re.MULTILINE):
+            index = int(match.group(1)) - 1
+            if 0 <= index < len(topics):
+                concepts = [c.strip().lower() for c in match.group(2).split(',') if c.strip()]
+                if concepts:
+                    results[topics[index][0]] = concepts[:5]  # Limit to 5 concepts
+        
+        return results
+    
+    def backfill_concepts(
+        self,
+        batch_size: int = 25,
+        workers: int = 3,
+        on_batch: Optional[Callable[[Dict[str, List[str]], int], None]] = None
+    ) -> int:
+        """
+        Extract concepts for every recorded topic that doesn't have any yet.
+        
+        Batches run concurrently (the shared rate limiter keeps them within the
+        API budget) and the history is saved after each batch, so a crash only
+        loses the batches still in flight.
+        
+        Args:
+            batch_size: Topics per AI call
+            workers: Batches in flight at the same time
+            on_batch: Called with (batch results, topics still missing) after each batch
+        
+        Returns:
+            Number of topics that got concepts
+        """
+        details = self.topics_history.get("topic_details", {})
+        missing = [
+            (topic, info.get("category"))
+            for topic, info in details.items()
+            if not info.get("concepts")
+        ]
+        batches = [missing[i:i + batch_size] for i in range(0, len(missing), batch_size)]
+        remaining = len(missing)
+        updated = 0
+        
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="concepts") as pool:
+            for results in pool.map(self.extract_concepts_batch, batches):
+                self._apply_concepts(results)
+                
+                updated += len(results)
+                remaining -= len(results)
+                if on_batch:
+                    on_batch(results, remaining)
+        
+        return updated
+    
+    def _apply_concepts(self, results: Dict[str, List[str]]):
+        """Store extracted concepts, clear them from the pending list and save."""
+        if not results:
+            return
+        
+        with self._lock:
+            apply_concepts(self.topics_history, results)
+            details = self.topics_history["topic_details"]
+            for topic in results:
+                if topic in details:
+                    self.concept_index.set_topic(topic, details[topic]["concepts"], details[topic]["date"])
+                    if self._similarity_index is not None:
+                        self._similarity_index.add(topic, details[topic]["concepts"])
+            self.store.set_concepts(results)
+    
+    def get_pending_concepts(self) -> List[str]:
+        """Topics whose concept extraction hasn't completed yet."""
+        with self._lock:
+            return list(self.topics_history.get("pending_concepts", []))
+    
+    def drain_pending_concepts(self, batch_size: int = 25) -> int:
+        """
+        Extract concepts for all pending topics, in batches.
+        Topics the AI call fails for stay pending for the next run.
+        
+        Returns:
+            Number of topics that got concepts
+        """
+        with self._lock:
+            details = self.topics_history["topic_details"]
+            # Reserved topics are extracted once they are recorded
+            pending = [
+                (topic, details.get(topic, {}).get("category"))
+                for topic in self.topics_history.get("pending_concepts", [])
+                if topic not in self._reserved
+            ]
+        
+        updated = 0
+        for i in range(0, len(pending), batch_size):
+            results = self.extract_concepts_batch(pending[i:i + batch_size])
+            self._apply_concepts(results)
+            updated += len(results)
+        return updated
+    
+    def schedule_concept_extraction(self):
+        """Drain pending concept extractions on the background worker thread."""
+        with self._lock:
+            if self._concept_worker is None:
+                self._concept_worker = ThreadPoolExecutor(max_workers=1, thread_name_prefix="concept-worker")
+            worker = self._concept_worker
+        worker.submit(self.drain_pending_concepts)
+    
+    def wait_for_concepts(self):
+        """Block until the background worker has finished all queued extractions."""
+        with self._lock:
+            worker, self._concept_worker = self._concept_worker, None
+        if worker is not None:
+            worker.shutdown(wait=True)
     
     def get_banned_concepts(self) -> List[str]:
         """
@@ -160,13 +305,62 @@ Your response (just the comma-separated concepts, nothing else):"""
         Returns:
             Deduplicated list of all banned concepts
         """
-        all_concepts = set()
+        with self._lock:
+            return self.concept_index.concepts
+    
+    def get_prompt_concepts(self, token_budget: int = CONCEPT_PROMPT_TOKEN_BUDGET) -> List[str]:
+        """
+        Get the banned concepts that go into topic prompts: the most frequent and
+        recent ones that fit the token budget.
+        """
+        with self._lock:
+            return self.concept_index.top_concepts(token_budget)
+    
+    def find_covered_concepts(
+        self,
+        topic: str,
+        brief: str = "",
+        token_budget: int = CONCEPT_PROMPT_TOKEN_BUDGET
+    ) -> List[str]:
+        """
+        Check a suggestion locally against the long tail of banned concepts
+        (those left out of the prompt).
         
-        for topic, details in self.topics_history.get("topic_details", {}).items():
-            concepts = details.get("concepts", [])
-            all_concepts.update(concepts)
+        Args:
+            topic: Suggested topic title
+            brief: Suggested brief
+            token_budget: Token budget the prompt was built with
         
-        return sorted(list(all_concepts))
+        Returns:
+            Concepts shared with previous topics the suggestion overlaps, empty if it looks new
+        """
+        with self._lock:
+            in_prompt = set(self.concept_index.top_concepts(token_budget))
+            overlapping = self.concept_index.find_overlapping_topics(topic, brief, exclude=in_prompt)
+        
+        covered = []
+        for concepts in overlapping.values():
+            covered += [c for c in concepts if c not in covered]
+        return covered
+    
+    def find_similar_topics(self, title: str) -> List[Tuple[str, float]]:
+        """
+        Find used topics that a suggested title nearly duplicates.
+        The similarity index is built on first use.
+        
+        Args:
+            title: Suggested topic title
+        
+        Returns:
+            (topic, similarity) pairs above TOPIC_SIMILARITY_THRESHOLD, most similar first
+        """
+        with self._lock:
+            if self._similarity_index is None:
+                self._similarity_index = TopicSimilarityIndex.from_history(
+                    self.topics_history.get("topic_details", {}),
+                    self.topics_history.get("used_topics", [])
+                )
+            return self._similarity_index.similar(title)
     
     def record_topic(
         self,
@@ -178,47 +372,81 @@ Your response (just the comma-separated concepts, nothing else):"""
         """
         Record a topic as used.
         
+        The record is saved right away; concept extraction is queued as pending
+        and runs on the background worker (see schedule_concept_extraction).
+        
         Args:
             topic: The specific topic title
             date: The date the topic was used (YYYY-MM-DD)
             category: The broader category (optional)
             metadata: Additional info like keywords, level, etc.
         """
-        # Add to used topics
-        if topic not in self.topics_history["used_topics"]:
-            self.topics_history["used_topics"].append(topic)
-        
-        # Extract concepts for this topic
-        concepts = self.extract_concepts(topic, category)
-        
-        # Store details with concepts
-        self.topics_history["topic_details"][topic] = {
-            "date": date,
-            "category": category,
-            "concepts": concepts,
-            "metadata": metadata or {},
-            "recorded_at": datetime.now().isoformat()
-        }
-        
-        # Record date
-        if date not in self.dates_used["dates"]:
-            self.dates_used["dates"].append(date)
-            self.dates_used["dates"].sort()
-        
-        self._save_data()
+        recorded_at = datetime.now().isoformat()
+        with self._lock:
+            self._apply_record(topic, date, category)
+            # Reserved until it is saved, so the worker can't store its concepts first
+            self._reserved.add(topic)
+        # The store has its own (cross-process) lock; other threads needn't wait for the file I/O
+        self.store.record_topic(topic, date, category, metadata or {}, recorded_at)
+        with self._lock:
+            self._reserved.discard(topic)
+        
+        self.schedule_concept_extraction()
     
-    def suggest_topic_prompt(self) -> str:
+    def reserve_topic(self, topic: str, date: str, category: Optional[str] = None):
+        """
+        Mark a topic and date as used in memory only, so the next suggestion sees
+        them while their post is still being finished. Nothing is saved: call
+        record_topic once the post is written.
+        """
+        with self._lock:
+            self._apply_record(topic, date, category)
+            self._reserved.add(topic)
+    
+    def _apply_record(self, topic: str, date: str, category: Optional[str]):
+        """Add a used topic to the in-memory history and indexes (caller holds self._lock)."""
+        # Details are stored with the concepts filled in once extracted
+        apply_record(self.topics_history, topic, date, category, {}, None)
+        details = self.topics_history["topic_details"]
+        details[topic] = hot_details(details[topic])
+        self.calendar.add(date)
+        self.coverage.set_topic(topic, category)
+        self.concept_index.set_topic(topic, details[topic]["concepts"], date)
+        if self._similarity_index is not None:
+            self._similarity_index.add(topic, details[topic]["concepts"])
+    
+    def suggest_topic_prompt(
+        self,
+        avoid: Optional[List[str]] = None,
+        rejected: Optional[List[str]] = None,
+        content_type: Optional[str] = None
+    ) -> str:
         """
         Generate a prompt section for AI to select a new topic.
-        Includes banned concepts to prevent semantically similar topics.
+        Includes the top banned concepts to prevent semantically similar topics.
+        
+        Args:
+            avoid: Extra concepts a previous suggestion overlapped with
+            rejected: Earlier suggestions that were near-duplicates of used topics
+            content_type: 'learning' or 'culture', to steer towards that type's least covered categories
         """
         context = self.get_context_for_ai()
-        available = self.get_available_categories()
-        banned_concepts = self.get_banned_concepts()
+        available = self.get_least_covered_categories(content_type)
+        banned_concepts = self.get_prompt_concepts()
+        banned_concepts += [c for c in (avoid or []) if c not in banned_concepts]
         
         # Format banned concepts for the prompt
         banned_str = ", ".join(banned_concepts) if banned_concepts else "(none yet)"
         
+        rejected_section = ""
+        if rejected:
+            rejected_lines = "\n".join(f"- {r}" for r in rejected)
+            rejected_section = f"""
+## REJECTED SUGGESTIONS
+These suggestions were too close to posts we already have. Suggest something clearly different:
+{rejected_lines}
+"""
+        
         prompt = f"""
 {context}
 
@@ -229,7 +457,7 @@ Ensure variety across both types.
 ## BANNED CONCEPTS (DO NOT use these themes)
 The following concepts have ALREADY been covered. You MUST NOT suggest any topic that relates to these:
 {banned_str}
-
+{rejected_section}
 Based on this history, suggest a COMPLETELY NEW topic for a Finnish language learning blog post.
 
 Requirements:
@@ -237,7 +465,7 @@ Requirements:
 - MUST be COMPLETELY DIFFERENT from previously covered topics
 - MUST NOT relate to any of the banned concepts above
 - Should be practical and useful for daily life or language learning
-- Consider these unexplored categories: {', '.join(available[:5])}
+- Prefer these least covered categories: {', '.join(available[:5])}
 - Be creative and find a FRESH angle
 
 Provide your topic suggestion in this format:
@@ -247,8 +475,25 @@ BRIEF: [2-3 sentence description of what the post will cover]
 """
         return prompt
     
+    def get_topic_details(self, topic: str) -> Optional[Dict]:
+        """
+        Get everything recorded for a topic.
+        Metadata and recorded_at are read from the store on demand.
+        
+        Returns:
+            Dict with date, category, concepts, metadata and recorded_at, or None for unknown topics
+        """
+        with self._lock:
+            details = self.topics_history["topic_details"].get(topic)
+            if details is None:
+                return None
+            details = dict(details)
+        details.update(self.store.load_details([topic]).get(topic, {"metadata": {}, "recorded_at": None}))
+        return details
+    
     def list_all_topics(self) -> List[Dict]:
-        """Get all recorded topics with their details."""
+        """Get all recorded topics with their details (loads the metadata of every topic)."""
+        cold = self.store.load_details()
         result = []
         for topic in self.topics_history.get("used_topics", []):
             details = self.topics_history.get("topic_details", {}).get(topic, {})
@@ -256,15 +501,20 @@ BRIEF: [2-3 sentence description of what the post will cover]
                 "topic": topic,
                 "date": details.get("date"),
                 "category": details.get("category"),
-                "metadata": details.get("metadata", {})
+                "metadata": cold.get(topic, {}).get("metadata", {})
             })
         return result
     
     def clear_history(self):
         """Clear all topic and date history. Use with caution!"""
-        self.topics_history = {"used_topics": [], "topic_details": {}}
-        self.dates_used = {"dates": []}
-        self._save_data()
+        with self._lock:
+            self.topics_history, _ = empty_history()
+            self.calendar.clear()
+            self.concept_index = ConceptIndex()
+            self.coverage = CategoryCoverage()
+            self._similarity_index = None
+            self._reserved.clear()
+            self.store.clear()
 
 
 if __name__ == "__main__":
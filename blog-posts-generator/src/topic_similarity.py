@@ -0,0 +1,155 @@
+"""
+Local near-duplicate detection for topic suggestions.
+Character n-gram MinHash with LSH banding over the used topics and their concepts,
+so a suggestion that repeats an earlier post is caught before any post is generated.
+"""
+
+import hashlib
+import random
+import re
+from typing import Dict, List, Optional, Set, Tuple
+
+from .config import TOPIC_SIMILARITY_THRESHOLD
+
+
+NGRAM = 3
+NUM_PERM = 64
+# 1 row per band: any shared MinHash value makes a candidate. Titles are short, so
+# near-duplicates can have a low Jaccard similarity and wider bands would miss them
+BANDS = 64
+ROWS = NUM_PERM // BANDS
+MERSENNE_PRIME = (1 << 61) - 1
+
+# Words that appear in most titles and say nothing about the subject
+STOPWORDS = {
+    "a", "about", "an", "and", "art", "at", "be", "beginner", "beginners", "beyond", "by",
+    "decode", "decoding", "essential", "everyday", "finland", "finn", "finnish", "finns",
+    "first", "for", "from", "guide", "how", "in", "is", "it", "its", "just", "learn",
+    "learning", "like", "master", "mastering", "me", "more", "my", "navigating", "of", "on",
+    "or", "s", "than", "the", "tips", "to", "understanding", "up", "way", "what", "when",
+    "where", "why", "with", "you", "your",
+}
+
+# Finnish case endings (after folding ä/ö to a/o), longest first: Torille/Torilla -> tori
+CASE_ENDINGS = sorted(
+    ["lla", "lle", "lta", "ssa", "sta", "ksi", "tta", "ille", "illa", "issa", "ista",
+     "ineen", "seen", "aan", "een", "na", "ni", "si", "mme", "nne", "nsa"],
+    key=len, reverse=True
+)
+
+_rng = random.Random(2024)
+_PERMUTATIONS = [(_rng.randrange(1, MERSENNE_PRIME), _rng.randrange(MERSENNE_PRIME)) for _ in range(NUM_PERM)]
+
+
+def normalize(text: str) -> List[str]:
+    """
+    Lowercase, fold ä/ö/å, drop stopwords and strip Finnish case endings.
+
+    Returns:
+        List of normalized words
+    """
+    text = text.lower().replace("ä", "a").replace("ö", "o").replace("å", "a")
+    words = []
+    for word in re.findall(r"[a-z0-9]+", text):
+        if word in STOPWORDS or len(word) < 2:
+            continue
+        for ending in CASE_ENDINGS:
+            if word.endswith(ending) and len(word) - len(ending) >= 3:
+                word = word[:-len(ending)]
+                break
+        words.append(word)
+    return words
+
+
+def shingles(text: str) -> Set[str]:
+    """Character n-grams of the normalized words (word boundaries included)."""
+    result = set()
+    for word in normalize(text):
+        padded = f" {word} "
+        result.update(padded[i:i + NGRAM] for i in range(len(padded) - NGRAM + 1))
+    return result
+
+
+def minhash(items: Set[str]) -> List[int]:
+    """MinHash signature of a shingle set."""
+    hashes = [int.from_bytes(hashlib.blake2b(item.encode("utf-8"), digest_size=8).digest(), "big") for item in items]
+    return [
+        min(((a * h + b) % MERSENNE_PRIME for h in hashes), default=MERSENNE_PRIME)
+        for a, b in _PERMUTATIONS
+    ]
+
+
+class TopicSimilarityIndex:
+    """
+    LSH index over used topics. Each topic is indexed with its title and concepts;
+    a suggested title is compared by overlap (the share of the smaller shingle set
+    found in the other), so a short title that repeats an old one scores high.
+    """
+
+    def __init__(self, threshold: float = TOPIC_SIMILARITY_THRESHOLD):
+        self.threshold = threshold
+        self._shingles: Dict[str, Set[str]] = {}
+        self._bands: Dict[str, List[Tuple]] = {}
+        self._buckets: Dict[Tuple, Set[str]] = {}
+
+    @classmethod
+    def from_history(cls, topic_details: Dict[str, Dict], used_topics: List[str]) -> 'TopicSimilarityIndex':
+        """Build the index from TopicManager's history."""
+        index = cls()
+        for topic in used_topics:
+            index.add(topic, topic_details.get(topic, {}).get("concepts", []))
+        return index
+
+    def __len__(self) -> int:
+        return len(self._shingles)
+
+    def add(self, topic: str, concepts: Optional[List[str]] = None):
+        """Index a topic (again, if its concepts changed)."""
+        self.remove(topic)
+        items = shingles(" ".join([topic] + list(concepts or [])))
+        if not items:
+            return
+
+        signature = minhash(items)
+        bands = [(i,) + tuple(signature[i * ROWS:(i + 1) * ROWS]) for i in range(BANDS)]
+        self._shingles[topic] = items
+        self._bands[topic] = bands
+        for band in bands:
+            self._buckets.setdefault(band, set()).add(topic)
+
+    def remove(self, topic: str):
+        for band in self._bands.pop(topic, []):
+            bucket = self._buckets.get(band)
+            if bucket:
+                bucket.discard(topic)
+                if not bucket:
+                    del self._buckets[band]
+        self._shingles.pop(topic, None)
+
+    def similar(self, title: str, limit: int = 3) -> List[Tuple[str, float]]:
+        """
+        Used topics similar to a suggested title.
+
+        Args:
+            title: Suggested topic title
+            limit: Maximum number of results
+
+        Returns:
+            (topic, similarity) pairs at or above the threshold, most similar first
+        """
+        items = shingles(title)
+        if not items:
+            return []
+
+        signature = minhash(items)
+        candidates = set()
+        for i in range(BANDS):
+            candidates |= self._buckets.get((i,) + tuple(signature[i * ROWS:(i + 1) * ROWS]), set())
+
+        scored = []
+        for topic in candidates:
+            other = self._shingles[topic]
+            score = len(items & other) / min(len(items), len(other))
+            if score >= self.threshold:
+                scored.append((topic, score))
+        return sorted(scored, key=lambda pair: -pair[1])[:limit]
@@ -0,0 +1,552 @@
+"""
+Storage backends for the topic and date history.
+Every change is one atomic, process-safe commit; TopicManager keeps an
+in-memory copy of the hot fields and uses a store to persist it.
+"""
+
+import bisect
+import json
+import os
+import sqlite3
+import threading
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from .config import DATA_DIR, TOPIC_STORE, TOPIC_DB_FILE, TOPIC_SHARDS_DIR
+from .output_writer import locked_file, write_json
+
+
+# Details TopicManager keeps in memory; metadata and recorded_at are loaded on demand
+HOT_FIELDS = ("date", "category", "concepts")
+
+
+def empty_history() -> Tuple[Dict, Dict]:
+    """A fresh (topics_history, dates_used) pair."""
+    return {"used_topics": [], "topic_details": {}, "pending_concepts": []}, {"dates": []}
+
+
+def hot_details(details: Dict) -> Dict:
+    """The HOT_FIELDS of a topic's details."""
+    return {
+        "date": details.get("date"),
+        "category": details.get("category"),
+        "concepts": details.get("concepts", []),
+    }
+
+
+def cold_details(details: Dict) -> Dict:
+    """The details of a topic that are only loaded on demand."""
+    return {"metadata": details.get("metadata", {}), "recorded_at": details.get("recorded_at")}
+
+
+def hot_history(topics_history: Dict) -> Dict:
+    """A copy of the history with only the HOT_FIELDS of each topic's details."""
+    return {
+        "used_topics": list(topics_history.get("used_topics", [])),
+        "topic_details": {
+            topic: hot_details(details) for topic, details in topics_history.get("topic_details", {}).items()
+        },
+        "pending_concepts": list(topics_history.get("pending_concepts", [])),
+    }
+
+
+def _ordered_topics(topics_history: Dict) -> List[str]:
+    # used_topics keeps the insertion order; topics only present in details go last
+    return list(dict.fromkeys(
+        list(topics_history.get("used_topics", [])) + list(topics_history.get("topic_details", {}))
+    ))
+
+
+def apply_record(
+    topics_history: Dict,
+    topic: str,
+    date: str,
+    category: Optional[str],
+    metadata: Dict,
+    recorded_at: str
+):
+    """
+    Add a used topic to the history dict in place.
+    Concepts already extracted for the topic are kept, otherwise it is queued as pending.
+    """
+    if topic not in topics_history["used_topics"]:
+        topics_history["used_topics"].append(topic)
+
+    previous = topics_history["topic_details"].get(topic, {})
+    topics_history["topic_details"][topic] = {
+        "date": date,
+        "category": category,
+        "concepts": previous.get("concepts", []),
+        "metadata": metadata,
+        "recorded_at": recorded_at
+    }
+
+    pending = topics_history.setdefault("pending_concepts", [])
+    if not previous.get("concepts") and topic not in pending:
+        pending.append(topic)
+
+
+def add_date(dates_used: Dict, date: str):
+    """Insert a used date in place, keeping the list sorted."""
+    dates = dates_used["dates"]
+    index = bisect.bisect_left(dates, date)
+    if index == len(dates) or dates[index] != date:
+        dates.insert(index, date)
+
+
+def apply_concepts(topics_history: Dict, results: Dict[str, List[str]]):
+    """Store extracted concepts in place and clear them from the pending list."""
+    details = topics_history["topic_details"]
+    for topic, concepts in results.items():
+        if topic in details:
+            details[topic]["concepts"] = concepts
+    pending = topics_history.get("pending_concepts", [])
+    topics_history["pending_concepts"] = [t for t in pending if t not in results]
+
+
+def load_legacy_json(data_dir: Path = DATA_DIR) -> Optional[Tuple[Dict, Dict]]:
+    """
+    Read the history from the original topics_history.json + dates_used.json files.
+    They are only a migration source for the sharded and SQLite stores.
+
+    Returns:
+        (topics_history, dates_used), or None if neither file exists
+    """
+    topics_file = data_dir / "topics_history.json"
+    dates_file = data_dir / "dates_used.json"
+    if not topics_file.exists() and not dates_file.exists():
+        return None
+
+    topics_history, dates_used = empty_history()
+    if topics_file.exists():
+        with open(topics_file, 'r', encoding='utf-8') as f:
+            topics_history = json.load(f)
+    if dates_file.exists():
+        with open(dates_file, 'r', encoding='utf-8') as f:
+            dates_used = json.load(f)
+    return topics_history, dates_used
+
+
+class SqliteTopicStore:
+    """
+    SQLite database in WAL mode: one row per topic, so recording a topic is a
+    single-row upsert instead of a full rewrite. Readers never block the writer.
+
+    On first use the database is filled from the sharded store, or the original JSON
+    files if there is none (one-time migration); the source files are left untouched.
+    """
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS topics (
+            seq INTEGER PRIMARY KEY AUTOINCREMENT,
+            topic TEXT NOT NULL UNIQUE,
+            date TEXT,
+            category TEXT,
+            concepts TEXT NOT NULL DEFAULT '[]',
+            metadata TEXT NOT NULL DEFAULT '{}',
+            recorded_at TEXT,
+            pending INTEGER NOT NULL DEFAULT 0
+        );
+        CREATE TABLE IF NOT EXISTS dates (date TEXT PRIMARY KEY);
+        CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT);
+    """
+
+    def __init__(self, db_file: Path = TOPIC_DB_FILE, data_dir: Path = DATA_DIR):
+        self.db_file = db_file
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_file, timeout=30, isolation_level=None, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(self.SCHEMA)
+        shards_dir = data_dir / TOPIC_SHARDS_DIR.name
+        if (shards_dir / "index.json").exists():
+            self._migrate(ShardedTopicStore(shards_dir, data_dir).load())
+        else:
+            legacy = load_legacy_json(data_dir)
+            if legacy is not None:
+                self._migrate(legacy)
+
+    @contextmanager
+    def _transaction(self):
+        """BEGIN IMMEDIATE takes the write lock up front, so concurrent writers queue instead of failing."""
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                yield self._conn
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+            self._conn.execute("COMMIT")
+
+    def _migrate(self, history: Tuple[Dict, Dict]):
+        with self._transaction() as conn:
+            if conn.execute("SELECT 1 FROM meta WHERE key = 'migrated_from_json'").fetchone():
+                return
+
+            topics_history, dates_used = history
+            details = topics_history.get("topic_details", {})
+            pending = set(topics_history.get("pending_concepts", []))
+            ordered = _ordered_topics(topics_history)
+
+            for topic in ordered:
+                info = details.get(topic, {})
+                conn.execute(
+                    "INSERT OR IGNORE INTO topics (topic, date, category, concepts, metadata, recorded_at, pending) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    (
+                        topic, info.get("date"), info.get("category"),
+                        json.dumps(info.get("concepts", []), ensure_ascii=False),
+                        json.dumps(info.get("metadata", {}), ensure_ascii=False),
+                        info.get("recorded_at"), int(topic in pending)
+                    )
+                )
+            conn.executemany(
+                "INSERT OR IGNORE INTO dates (date) VALUES (?)",
+                [(date,) for date in dates_used.get("dates", [])]
+            )
+            conn.execute(
+                "INSERT INTO meta (key, value) VALUES ('migrated_from_json', ?)",
+                (datetime.now().isoformat(),)
+            )
+            if ordered:
+                print(f"Migrated {len(ordered)} topics to {self.db_file.name}")
+
+    def load(self) -> Tuple[Dict, Dict]:
+        """Read the current (topics_history, dates_used)."""
+        topics_history, dates_used = empty_history()
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT topic, date, category, concepts, metadata, recorded_at, pending FROM topics ORDER BY seq"
+            ).fetchall()
+            dates = [row[0] for row in self._conn.execute("SELECT date FROM dates ORDER BY date")]
+
+        for topic, date, category, concepts, metadata, recorded_at, pending in rows:
+            topics_history["used_topics"].append(topic)
+            topics_history["topic_details"][topic] = {
+                "date": date,
+                "category": category,
+                "concepts": json.loads(concepts),
+                "metadata": json.loads(metadata),
+                "recorded_at": recorded_at
+            }
+            if pending:
+                topics_history["pending_concepts"].append(topic)
+        dates_used["dates"] = dates
+        return topics_history, dates_used
+
+    def load_hot(self) -> Tuple[Dict, Dict]:
+        """Read the history without the metadata column."""
+        topics_history, dates_used = empty_history()
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT topic, date, category, concepts, pending FROM topics ORDER BY seq"
+            ).fetchall()
+            dates = [row[0] for row in self._conn.execute("SELECT date FROM dates ORDER BY date")]
+
+        for topic, date, category, concepts, pending in rows:
+            topics_history["used_topics"].append(topic)
+            topics_history["topic_details"][topic] = {
+                "date": date,
+                "category": category,
+                "concepts": json.loads(concepts)
+            }
+            if pending:
+                topics_history["pending_concepts"].append(topic)
+        dates_used["dates"] = dates
+        return topics_history, dates_used
+
+    def load_details(self, topics: Optional[List[str]] = None) -> Dict[str, Dict]:
+        """Read the metadata and recorded_at of the given topics (all topics if None)."""
+        with self._lock:
+            if topics is None:
+                rows = self._conn.execute("SELECT topic, metadata, recorded_at FROM topics").fetchall()
+            else:
+                rows = []
+                for i in range(0, len(topics), 500):
+                    chunk = topics[i:i + 500]
+                    rows += self._conn.execute(
+                        f"SELECT topic, metadata, recorded_at FROM topics WHERE topic IN ({','.join('?' * len(chunk))})",
+                        chunk
+                    ).fetchall()
+        return {
+            topic: {"metadata": json.loads(metadata), "recorded_at": recorded_at}
+            for topic, metadata, recorded_at in rows
+        }
+
+    def load_dates(self) -> List[str]:
+        """Read only the used dates (without the topic history)."""
+        with self._lock:
+            return [row[0] for row in self._conn.execute("SELECT date FROM dates ORDER BY date")]
+
+    def record_topic(self, topic: str, date: str, category: Optional[str], metadata: Dict, recorded_at: str):
+        with self._transaction() as conn:
+            conn.execute(
+                """
+                INSERT INTO topics (topic, date, category, metadata, recorded_at, pending)
+                VALUES (?, ?, ?, ?, ?, 1)
+                ON CONFLICT(topic) DO UPDATE SET
+                    date = excluded.date,
+                    category = excluded.category,
+                    metadata = excluded.metadata,
+                    recorded_at = excluded.recorded_at,
+                    pending = CASE WHEN topics.concepts = '[]' THEN 1 ELSE topics.pending END
+                """,
+                (topic, date, category, json.dumps(metadata, ensure_ascii=False), recorded_at)
+            )
+            conn.execute("INSERT OR IGNORE INTO dates (date) VALUES (?)", (date,))
+
+    def set_concepts(self, results: Dict[str, List[str]]):
+        with self._transaction() as conn:
+            conn.executemany(
+                "UPDATE topics SET concepts = ?, pending = 0 WHERE topic = ?",
+                [(json.dumps(concepts, ensure_ascii=False), topic) for topic, concepts in results.items()]
+            )
+
+    def clear(self):
+        with self._transaction() as conn:
+            conn.execute("DELETE FROM topics")
+            conn.execute("DELETE FROM dates")
+
+
+class ShardedTopicStore:
+    """
+    Topic history split into a hot index and yearly detail shards in data/topics/:
+
+    - index.json: used topics in order with date, category and concepts, the pending
+      extractions and the used dates - everything TopicManager loads at startup
+    - index.log: the records and concept updates since index.json was last written,
+      one JSON line each; replayed over index.json on every read
+    - 2026.json, 2027.json, ...: metadata and recorded_at of the topics dated in that
+      year, only read when details are asked for
+
+    Each change appends one line to the log and rewrites at most two shards under an
+    exclusive lock. Every INDEX_LOG_LIMIT lines the log is folded into index.json.
+    On first use the index and shards are built from the original JSON files if there
+    are any; they are left untouched.
+    """
+
+    INDEX_VERSION = 1
+    INDEX_LOG_LIMIT = 200
+
+    def __init__(self, shards_dir: Path = TOPIC_SHARDS_DIR, data_dir: Path = DATA_DIR):
+        self.shards_dir = shards_dir
+        self.index_file = shards_dir / "index.json"
+        self.log_file = shards_dir / "index.log"
+        self.lock_file = shards_dir / ".lock"
+        self._thread_lock = threading.Lock()
+        shards_dir.mkdir(parents=True, exist_ok=True)
+        if not self.index_file.exists():
+            self._migrate_from_json(load_legacy_json(data_dir) or empty_history())
+
+    def _locked(self):
+        return locked_file(self.lock_file, self._thread_lock)
+
+    def _shard_file(self, date: Optional[str]) -> Path:
+        year = (date or "")[:4]
+        return self.shards_dir / f"{year if year.isdigit() else 'undated'}.json"
+
+    def _read_shard(self, path: Path) -> Dict[str, Dict]:
+        if not path.exists():
+            return {}
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+
+    def _write_shard(self, path: Path, shard: Dict[str, Dict]):
+        if shard:
+            write_json(path, shard)
+        elif path.exists():
+            path.unlink()
+
+    def _read_index(self) -> Tuple[Dict, Dict, int]:
+        """The index with the log replayed over it, and the number of log lines."""
+        topics_history, dates_used = empty_history()
+        if self.index_file.exists():
+            with open(self.index_file, 'r', encoding='utf-8') as f:
+                index = json.load(f)
+            for entry in index.get("topics", []):
+                topic = entry["topic"]
+                topics_history["used_topics"].append(topic)
+                topics_history["topic_details"][topic] = hot_details(entry)
+            topics_history["pending_concepts"] = index.get("pending_concepts", [])
+            dates_used["dates"] = index.get("dates", [])
+
+        entries = self._read_log()
+        for entry in entries:
+            self._apply_log_entry(topics_history, dates_used, entry)
+        return topics_history, dates_used, len(entries)
+
+    def _read_log(self) -> List[Dict]:
+        if not self.log_file.exists():
+            return []
+        entries = []
+        with open(self.log_file, 'r', encoding='utf-8') as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                try:
+                    entries.append(json.loads(line))
+                except json.JSONDecodeError:
+                    # Torn last line of an append that was interrupted; it was never acknowledged
+                    continue
+        return entries
+
+    def _apply_log_entry(self, topics_history: Dict, dates_used: Dict, entry: Dict):
+        if entry["op"] == "record":
+            topic = entry["topic"]
+            apply_record(topics_history, topic, entry["date"], entry["category"], {}, None)
+            topics_history["topic_details"][topic] = hot_details(topics_history["topic_details"][topic])
+            add_date(dates_used, entry["date"])
+        elif entry["op"] == "concepts":
+            apply_concepts(topics_history, entry["results"])
+
+    def _append_log(self, entry: Dict):
+        line = json.dumps(entry, ensure_ascii=False) + "\n"
+        with open(self.log_file, 'a+b') as f:
+            # Never continue a torn line, it would swallow this entry
+            if f.seek(0, os.SEEK_END):
+                f.seek(-1, os.SEEK_END)
+                if f.read(1) != b"\n":
+                    line = "\n" + line
+            f.write(line.encode('utf-8'))
+            f.flush()
+            os.fsync(f.fileno())
+
+    def _log_change(self, entry: Dict, topics_history: Dict, dates_used: Dict, log_length: int):
+        """Append a change (already applied to the given history) and compact the log when it is full."""
+        if log_length + 1 < self.INDEX_LOG_LIMIT:
+            self._append_log(entry)
+        else:
+            self._write_index(topics_history, dates_used)
+
+    def _write_index(self, topics_history: Dict, dates_used: Dict):
+        details = topics_history["topic_details"]
+        write_json(self.index_file, {
+            "version": self.INDEX_VERSION,
+            "topics": [
+                {"topic": topic, **hot_details(details.get(topic, {}))}
+                for topic in _ordered_topics(topics_history)
+            ],
+            "pending_concepts": topics_history.get("pending_concepts", []),
+            "dates": dates_used.get("dates", []),
+        }, indent=1)
+        # Everything in the log is part of the index now
+        self.log_file.unlink(missing_ok=True)
+
+    def _migrate_from_json(self, history: Tuple[Dict, Dict]):
+        topics_history, dates_used = history
+        with self._locked():
+            if self.index_file.exists():
+                return
+
+            shards: Dict[Path, Dict[str, Dict]] = {}
+            for topic, details in topics_history.get("topic_details", {}).items():
+                shards.setdefault(self._shard_file(details.get("date")), {})[topic] = cold_details(details)
+            for path, shard in shards.items():
+                self._write_shard(path, shard)
+            self._write_index(topics_history, dates_used)
+
+            if topics_history.get("topic_details"):
+                print(f"Migrated {len(topics_history['topic_details'])} topics from JSON to {self.shards_dir.name}/")
+
+    def load(self) -> Tuple[Dict, Dict]:
+        """Read the current (topics_history, dates_used) including all details."""
+        topics_history, dates_used = self.load_hot()
+        for topic, cold in self.load_details().items():
+            if topic in topics_history["topic_details"]:
+                topics_history["topic_details"][topic].update(cold)
+        return topics_history, dates_used
+
+    def load_hot(self) -> Tuple[Dict, Dict]:
+        """Read only the index and its log (titles, dates, categories, concepts)."""
+        with self._locked():
+            topics_history, dates_used, _ = self._read_index()
+            return topics_history, dates_used
+
+    def load_details(self, topics: Optional[List[str]] = None) -> Dict[str, Dict]:
+        """
+        Read the metadata and recorded_at of the given topics (all topics if None).
+        Only the shards of the years those topics are dated in are opened.
+        """
+        with self._locked():
+            if topics is None:
+                paths = sorted(self.shards_dir.glob("*.json"))
+                paths.remove(self.index_file)
+                wanted = None
+            else:
+                topics_history, _, _ = self._read_index()
+                details = topics_history["topic_details"]
+                paths = sorted({self._shard_file(details[topic]["date"]) for topic in topics if topic in details})
+                wanted = set(topics)
+
+            result = {}
+            for path in paths:
+                for topic, cold in self._read_shard(path).items():
+                    if wanted is None or topic in wanted:
+                        result[topic] = cold
+            return result
+
+    def load_dates(self) -> List[str]:
+        """Read only the used dates (without the topic history)."""
+        return self.load_hot()[1]["dates"]
+
+    def record_topic(self, topic: str, date: str, category: Optional[str], metadata: Dict, recorded_at: str):
+        with self._locked():
+            topics_history, dates_used, log_length = self._read_index()
+            previous_date = topics_history["topic_details"].get(topic, {}).get("date")
+            apply_record(topics_history, topic, date, category, metadata, recorded_at)
+            add_date(dates_used, date)
+
+            # Details first: the topic only counts as recorded once it is in the log
+            shard_file = self._shard_file(date)
+            shard = self._read_shard(shard_file)
+            shard[topic] = cold_details(topics_history["topic_details"][topic])
+            self._write_shard(shard_file, shard)
+
+            # A re-recorded topic may have moved to another year
+            previous_file = self._shard_file(previous_date)
+            if previous_date and previous_file != shard_file:
+                previous_shard = self._read_shard(previous_file)
+                previous_shard.pop(topic, None)
+                self._write_shard(previous_file, previous_shard)
+
+            self._log_change(
+                {"op": "record", "topic": topic, "date": date, "category": category},
+                topics_history, dates_used, log_length
+            )
+
+    def set_concepts(self, results: Dict[str, List[str]]):
+        with self._locked():
+            topics_history, dates_used, log_length = self._read_index()
+            apply_concepts(topics_history, results)
+            self._log_change({"op": "concepts", "results": results}, topics_history, dates_used, log_length)
+
+    def clear(self):
+        with self._locked():
+            for path in self.shards_dir.glob("*.json"):
+                if path != self.index_file:
+                    path.unlink()
+            topics_history, dates_used = empty_history()
+            self._write_index(topics_history, dates_used)
+
+
+def open_topic_store(kind: str = TOPIC_STORE, data_dir: Path = DATA_DIR):
+    """
+    Open the configured topic store.
+
+    Args:
+        kind: 'sharded' (default) or 'sqlite'
+        data_dir: Directory holding the history files
+    """
+    if kind == "sharded":
+        return ShardedTopicStore(data_dir / TOPIC_SHARDS_DIR.name, data_dir)
+    if kind == "sqlite":
+        return SqliteTopicStore(data_dir / TOPIC_DB_FILE.name, data_dir)
+    if kind == "json":
+        # The single-file history is no longer kept up to date: reading it would hand out used dates
+        raise ValueError(
+            "TOPIC_STORE 'json' was removed; use 'sharded' (data/topics/) or 'sqlite'. "
+            "Existing topics_history.json/dates_used.json files are migrated by either store on first use"
+        )
+    raise ValueError(f"Unknown TOPIC_STORE '{kind}', use 'sharded' or 'sqlite'")
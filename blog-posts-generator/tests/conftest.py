@@ -0,0 +1,30 @@
+"""
+Shared test setup: the whole session writes to a temporary data and output
+directory and talks to the fake Gemini/Imagen backend (src/fake_backend.py).
+The environment has to be set before src.config is imported.
+"""
+
+import os
+import shutil
+import sys
+import tempfile
+from pathlib import Path
+
+_session_dir = Path(tempfile.mkdtemp(prefix="blog-posts-tests-"))
+
+os.environ.update({
+    "BLOG_DATA_DIR": str(_session_dir / "data"),
+    "BLOG_OUTPUT_DIR": str(_session_dir / "blogs"),
+    "FAKE_BACKEND": "1",
+    "FAKE_TEXT_LATENCY": "0",
+    "FAKE_IMAGE_LATENCY": "0",
+    "FAKE_ERROR_RATE": "0",
+    "FAKE_RATE_LIMIT_RATE": "0",
+    "TEXT_MODEL_RPM": "100000",
+    "IMAGE_MODEL_RPM": "100000",
+})
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+
+def pytest_sessionfinish(session, exitstatus):
+    shutil.rmtree(_session_dir, ignore_errors=True)
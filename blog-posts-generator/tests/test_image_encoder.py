@@ -0,0 +1,40 @@
+"""The variants cache of the image encoder."""
+
+import json
+
+from src import image_encoder
+from src.config import IMAGE_VARIANTS_FILE
+
+
+def test_images_without_variants_are_looked_up_once(monkeypatch):
+    lookups = []
+
+    def variants_on_disk(image_name):
+        lookups.append(image_name)
+        return None
+
+    monkeypatch.setattr(image_encoder, "_variants_on_disk", variants_on_disk)
+
+    assert image_encoder.get_image_variants("2030-01-01-no-variants.webp") is None
+    assert image_encoder.get_image_variants("2030-01-01-no-variants.webp") is None
+    assert lookups == ["2030-01-01-no-variants.webp"]
+
+    # Encoding the image later makes its variants visible
+    image_encoder._record_variants({"file": "2030-01-01-no-variants.webp", "width": 800, "height": 600, "variants": []})
+    assert image_encoder.get_image_variants("2030-01-01-no-variants.webp")["width"] == 800
+
+
+def test_record_keeps_variants_written_by_other_processes():
+    image_encoder._record_variants({"file": "2030-01-02-mine.webp", "width": 800, "height": 600, "variants": []})
+    # Another process records an image this one hasn't seen
+    with open(IMAGE_VARIANTS_FILE, 'r', encoding='utf-8') as f:
+        variants = json.load(f)
+    variants["2030-01-02-theirs.webp"] = {"width": 640, "height": 480, "variants": []}
+    with open(IMAGE_VARIANTS_FILE, 'w', encoding='utf-8') as f:
+        json.dump(variants, f)
+
+    image_encoder._record_variants({"file": "2030-01-02-mine-too.webp", "width": 400, "height": 300, "variants": []})
+
+    with open(IMAGE_VARIANTS_FILE, 'r', encoding='utf-8') as f:
+        variants = json.load(f)
+    assert {"2030-01-02-mine.webp", "2030-01-02-theirs.webp", "2030-01-02-mine-too.webp"} <= set(variants)
@@ -0,0 +1,91 @@
+"""PostJournal checkpoints and resuming a post that failed halfway."""
+
+import pytest
+
+from src import pipeline
+from src.journal import (
+    PostJournal, clear_run_plan, incomplete_dates, load_run_plan, save_run_plan
+)
+from src.response_cache import configure_response_cache
+from src.topic_manager import TopicManager
+from src.topic_store import ShardedTopicStore
+
+
+def test_stages_survive_a_restart(tmp_path):
+    journal = PostJournal("2029-01-01", tmp_path)
+    assert journal.first_incomplete_stage() == "suggestion"
+
+    image = tmp_path / "header.webp"
+    image.write_bytes(b"webp")
+    journal.set("suggestion", {"topic": "Sauna Words", "category": None, "content_type": "learning"})
+    journal.set("text", {"title": "Saunassa!"})
+    journal.set("header_image", str(image))
+    journal.set_inline_image("[IMAGE:kept]", image)
+    journal.set_inline_image("[IMAGE:deleted]", tmp_path / "deleted.webp")
+
+    # A new process reads the same file
+    resumed = PostJournal("2029-01-01", tmp_path)
+    assert resumed.get("suggestion")["topic"] == "Sauna Words"
+    assert resumed.get("text") == {"title": "Saunassa!"}
+    assert resumed.get_image("header_image") == image
+    assert resumed.get_image("inline_images", "[IMAGE:kept]") == image
+    # Images whose file is gone are generated again
+    assert resumed.get_image("inline_images", "[IMAGE:deleted]") is None
+    assert resumed.first_incomplete_stage() == "mdx"
+    assert incomplete_dates(tmp_path) == ["2029-01-01"]
+
+    resumed.set("mdx", "post.mdx")
+    assert not resumed.is_complete()
+    resumed.set("recorded", True)
+    assert resumed.is_complete()
+    resumed.finish()
+    assert incomplete_dates(tmp_path) == []
+
+
+def test_run_plan(tmp_path):
+    assert load_run_plan(tmp_path) is None
+    save_run_plan({"days": 3, "pipeline": True}, tmp_path)
+    assert load_run_plan(tmp_path) == {"days": 3, "pipeline": True}
+    # The run plan is not a post
+    assert incomplete_dates(tmp_path) == []
+    clear_run_plan(tmp_path)
+    assert load_run_plan(tmp_path) is None
+
+
+@pytest.fixture
+def no_cache():
+    configure_response_cache(enabled=False)
+    yield
+    configure_response_cache()
+
+
+def test_resume_reuses_journaled_stages(tmp_path, monkeypatch, no_cache):
+    manager = TopicManager(store=ShardedTopicStore(tmp_path / "topics", tmp_path))
+    schedule = [(0, "2029-02-01")]
+    quiet = {"no_image": True, "echo": lambda message: None}
+    render = pipeline.render_images
+
+    def crash(job, *args, **kwargs):
+        raise RuntimeError("interrupted")
+
+    monkeypatch.setattr(pipeline, "render_images", crash)
+    with pytest.raises(RuntimeError):
+        pipeline.run_serial(schedule, manager, "A1", 1, **quiet)
+    journal = PostJournal("2029-02-01")
+    assert journal.first_incomplete_stage() == "header_image"
+    text = journal.get("text")
+
+    # The resumed run must not ask the model again for what is journaled
+    def no_model_call(*args, **kwargs):
+        raise AssertionError("stage was regenerated")
+
+    monkeypatch.setattr(pipeline, "render_images", render)
+    monkeypatch.setattr(pipeline, "generate_topic_suggestion", no_model_call)
+    monkeypatch.setattr(pipeline, "generate_blog_post", no_model_call)
+    jobs = pipeline.run_serial(schedule, manager, "A1", 1, **quiet)
+    manager.wait_for_concepts()
+
+    assert jobs[0]['post_data'] == text
+    assert jobs[0]['output_path'].exists()
+    assert manager.get_used_topics() == [journal.get("suggestion")["topic"]]
+    assert not journal.path.exists()
@@ -0,0 +1,90 @@
+"""Pipelined generation against the serial path, on the fake backend (text only)."""
+
+import pytest
+
+from src import pipeline
+from src.config import OUTPUT_DIR
+from src.journal import PostJournal
+from src.response_cache import configure_response_cache
+from src.topic_manager import TopicManager
+from src.topic_store import ShardedTopicStore
+
+
+@pytest.fixture(autouse=True)
+def no_cache():
+    # Every run has to reach the backend, not replay another test's responses
+    configure_response_cache(enabled=False)
+    yield
+    configure_response_cache()
+
+
+def _generate(runner, tmp_path, monkeypatch, dates, **options):
+    """Run `runner` over `dates` with a fresh history; returns (jobs, used topics seen by each suggestion)."""
+    manager = TopicManager(store=ShardedTopicStore(tmp_path / "topics", tmp_path))
+    seen = []
+    suggest = pipeline.generate_topic_suggestion
+
+    def recording_suggestion(topic_manager):
+        seen.append(list(topic_manager.get_used_topics()))
+        return suggest(topic_manager)
+
+    monkeypatch.setattr(pipeline, "generate_topic_suggestion", recording_suggestion)
+    try:
+        jobs = runner(
+            list(enumerate(dates)), manager, "A1", len(dates),
+            no_image=True, echo=lambda message: None, **options
+        )
+    finally:
+        manager.wait_for_concepts()
+    return jobs, seen
+
+
+def _saved_history(tmp_path):
+    topics_history, dates_used = ShardedTopicStore(tmp_path / "topics", tmp_path).load_hot()
+    return topics_history["used_topics"], dates_used["dates"]
+
+
+@pytest.mark.parametrize("month, runner, options", [
+    ("2030-01", pipeline.run_serial, {}),
+    ("2030-02", pipeline.run_pipelined, {"image_workers": 2}),
+    ("2030-03", pipeline.run_pipelined, {"image_workers": 3, "max_in_flight": 3}),
+])
+def test_every_suggestion_sees_the_previous_days(month, runner, options, tmp_path, monkeypatch):
+    dates = [f"{month}-0{day}" for day in range(1, 6)]
+    jobs, seen = _generate(runner, tmp_path, monkeypatch, dates, **options)
+
+    topics = [job['topic'] for job in jobs]
+    assert [job['date'] for job in jobs] == dates
+    assert len(set(topics)) == len(topics)
+    # The history each suggestion was made from: exactly the days before it
+    assert seen == [topics[:day] for day in range(len(dates))]
+
+    assert _saved_history(tmp_path) == (topics, dates)
+    for job in jobs:
+        assert job['output_path'].exists()
+        assert not PostJournal(job['date']).path.exists()
+
+
+def test_failed_post_is_not_recorded(tmp_path, monkeypatch):
+    dates = ["2031-01-01", "2031-01-02", "2031-01-03"]
+    render = pipeline.render_images
+
+    def failing_render(job, *args):
+        if job['date'] == dates[1]:
+            raise RuntimeError("image stage failed")
+        return render(job, *args)
+
+    monkeypatch.setattr(pipeline, "render_images", failing_render)
+    with pytest.raises(RuntimeError, match="image stage failed"):
+        _generate(pipeline.run_pipelined, tmp_path, monkeypatch, dates, image_workers=1)
+
+    used_topics, used_dates = _saved_history(tmp_path)
+    assert used_dates == dates[:1]
+    assert len(used_topics) == 1
+    assert list(OUTPUT_DIR.glob(f"{dates[0]}-*.mdx"))
+    assert not list(OUTPUT_DIR.glob(f"{dates[1]}-*.mdx"))
+
+    # The failed post can be resumed: its text is journaled, but it was never recorded
+    journal = PostJournal(dates[1])
+    assert journal.get("text") is not None
+    assert journal.get("recorded") is None
@@ -0,0 +1,159 @@
+"""parse_sections, parse_fields and StreamingSectionParser."""
+
+import pytest
+
+from src.response_parser import (
+    POST_SECTIONS, ResponseFormatError, StreamingSectionParser, parse_fields, parse_sections
+)
+
+
+RESPONSE = """Here is your post.
+
+---TITLE---
+Saunassa! Finnish Sauna Words
+
+---SLUG---
+saunassa-finnish-sauna-words
+
+---DESCRIPTION---
+Learn the Finnish words you need in the sauna.
+
+---TAGS---
+Learn Finnish, Sauna, A1
+
+---IMAGE_PROMPT---
+A wooden lakeside sauna at dusk, no text
+
+---IMAGE_ALT---
+Lakeside sauna
+
+---CONTENT---
+# Saunassa!
+
+Intro paragraph with a [link](https://example.com) and a [note].
+
+---
+
+[IMAGE:A wooden sauna bench with a ladle]
+
+## Words
+
+| Finnish | English |
+|---------|---------|
+| löyly | steam |
+
+[IMAGE: Friends cooling off by a lake ]
+
+---END---
+Anything after the end marker is ignored. ---TITLE--- too.
+"""
+
+IMAGE_MARKERS = [
+    {'marker': "[IMAGE:A wooden sauna bench with a ladle]", 'description': "A wooden sauna bench with a ladle"},
+    {'marker': "[IMAGE: Friends cooling off by a lake ]", 'description': "Friends cooling off by a lake"},
+]
+
+
+def test_parse_sections_splits_every_section():
+    parsed = parse_sections(RESPONSE)
+
+    assert list(parsed.sections) == list(POST_SECTIONS)
+    assert parsed.get("TITLE") == "Saunassa! Finnish Sauna Words"
+    assert parsed.get("IMAGE_PROMPT") == "A wooden lakeside sauna at dusk, no text"
+    # Markdown rules are not section markers, and the block ends before ---END---
+    assert "\n---\n" in parsed.get("CONTENT")
+    assert parsed.get("CONTENT").endswith("[IMAGE: Friends cooling off by a lake ]")
+    assert parsed.problems() == []
+
+
+def test_parse_sections_reports_missing_repeated_and_unexpected_sections():
+    text = "---title---\nFirst\n---TITLE---\nSecond\n---EXTRA---\nx\n---SLUG---\n\n---CONTENT---\nBody"
+    parsed = parse_sections(text)
+
+    assert parsed.get("TITLE") == "First"
+    assert parsed.duplicated == ["TITLE"]
+    assert parsed.unexpected == ["EXTRA"]
+    # Empty sections count as missing
+    assert parsed.missing == ["SLUG", "DESCRIPTION", "TAGS", "IMAGE_PROMPT", "IMAGE_ALT"]
+    assert parsed.problems() == [
+        "missing SLUG, DESCRIPTION, TAGS, IMAGE_PROMPT, IMAGE_ALT",
+        "repeated TITLE (kept the first)",
+        "unexpected EXTRA",
+    ]
+
+    parsed.require("TITLE", "CONTENT")
+    with pytest.raises(ResponseFormatError, match="SLUG"):
+        parsed.require("TITLE", "SLUG")
+
+
+def test_parse_sections_without_expected_names_accepts_anything():
+    parsed = parse_sections("---A---\n1\n---B---\n2", expected=None)
+
+    assert parsed.sections == {"A": "1", "B": "2"}
+    assert parsed.missing == [] and parsed.unexpected == []
+
+
+def test_parse_fields():
+    parsed = parse_fields(
+        "Sure!\nTOPIC: Mökki Weekend\nCATEGORY: Nature and Outdoors\nNOTE: ignored\nTOPIC: Another\n"
+    )
+
+    assert parsed.sections == {"TOPIC": "Mökki Weekend", "CATEGORY": "Nature and Outdoors"}
+    assert parsed.duplicated == ["TOPIC"]
+    assert parsed.missing == ["BRIEF"]
+
+
+def _stream(text, size):
+    sections, markers = [], []
+    parser = StreamingSectionParser(
+        on_section=lambda name, section: sections.append((name, section)),
+        on_image_marker=markers.append
+    )
+    for i in range(0, len(text), size):
+        parser.feed(text[i:i + size])
+    return parser.close(), sections, markers
+
+
+@pytest.mark.parametrize("size", [1, 2, 3, 5, 8, 13, 64, len(RESPONSE)])
+def test_streaming_parser_matches_parse_sections_for_any_chunking(size):
+    full_text, sections, markers = _stream(RESPONSE, size)
+
+    assert full_text == RESPONSE
+    assert sections == list(parse_sections(RESPONSE).sections.items())
+    assert markers == IMAGE_MARKERS
+
+
+def test_streaming_parser_emits_sections_before_the_response_ends():
+    sections = []
+    parser = StreamingSectionParser(on_section=lambda name, text: sections.append(name))
+
+    parser.feed(RESPONSE[:RESPONSE.index("---IMAGE_ALT---") + 2])
+    # The closing marker of IMAGE_PROMPT hasn't fully arrived yet
+    assert sections == ["TITLE", "SLUG", "DESCRIPTION", "TAGS"]
+
+    parser.feed(RESPONSE[RESPONSE.index("---IMAGE_ALT---") + 2:RESPONSE.index("---CONTENT---")])
+    assert sections[-1] == "IMAGE_PROMPT"
+
+
+def test_streaming_parser_emits_image_markers_split_across_chunks():
+    markers = []
+    parser = StreamingSectionParser(on_image_marker=markers.append)
+
+    parser.feed("---CONTENT---\nText [IM")
+    parser.feed("AGE:A red ")
+    assert markers == []
+    parser.feed("cottage] more [not an image] and [IMAGE:Second]")
+    assert [m['description'] for m in markers] == ["A red cottage", "Second"]
+
+
+def test_streaming_parser_keeps_the_first_of_repeated_sections():
+    sections, markers = [], []
+    parser = StreamingSectionParser(
+        on_section=lambda name, text: sections.append((name, text)),
+        on_image_marker=markers.append
+    )
+    parser.feed("---CONTENT---\n[IMAGE:First]\n---CONTENT---\n[IMAGE:Second]\n---END---\n[IMAGE:Third]")
+    parser.close()
+
+    assert sections == [("CONTENT", "[IMAGE:First]")]
+    assert [m['description'] for m in markers] == ["First"]
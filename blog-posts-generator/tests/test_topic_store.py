@@ -0,0 +1,152 @@
+"""Topic store migration, the sharded index log and concurrent record_topic."""
+
+import json
+import multiprocessing
+import threading
+
+import pytest
+
+from src.topic_store import SqliteTopicStore, open_topic_store
+
+
+LEGACY_TOPICS = {
+    "used_topics": ["Sauna Words", "Mökki Weekend"],
+    "topic_details": {
+        "Sauna Words": {
+            "date": "2025-12-30", "category": "Sauna Culture", "concepts": ["sauna", "löyly"],
+            "metadata": {"title": "Saunassa!", "level": "A1"}, "recorded_at": "2025-12-01T10:00:00"
+        },
+        "Mökki Weekend": {
+            "date": "2026-01-02", "category": "Nature and Outdoors", "concepts": [],
+            "metadata": {"title": "Mökille!", "level": "A2"}, "recorded_at": "2025-12-02T10:00:00"
+        },
+    },
+    "pending_concepts": ["Mökki Weekend"],
+}
+LEGACY_DATES = {"dates": ["2025-12-30", "2026-01-02"]}
+
+
+def _write_legacy(data_dir):
+    (data_dir / "topics_history.json").write_text(json.dumps(LEGACY_TOPICS), encoding='utf-8')
+    (data_dir / "dates_used.json").write_text(json.dumps(LEGACY_DATES), encoding='utf-8')
+
+
+def _open(kind, data_dir):
+    return open_topic_store(kind, data_dir)
+
+
+@pytest.mark.parametrize("kind", ["sharded", "sqlite"])
+def test_legacy_json_is_migrated(kind, tmp_path):
+    _write_legacy(tmp_path)
+    store = _open(kind, tmp_path)
+
+    topics_history, dates_used = store.load()
+    assert topics_history["used_topics"] == LEGACY_TOPICS["used_topics"]
+    assert topics_history["topic_details"] == LEGACY_TOPICS["topic_details"]
+    assert topics_history["pending_concepts"] == ["Mökki Weekend"]
+    assert dates_used == LEGACY_DATES
+    # The source files are left in place
+    assert json.loads((tmp_path / "topics_history.json").read_text(encoding='utf-8')) == LEGACY_TOPICS
+
+
+def test_sharded_store_splits_details_by_year(tmp_path):
+    _write_legacy(tmp_path)
+    store = _open("sharded", tmp_path)
+
+    assert sorted(p.name for p in (tmp_path / "topics").glob("*.json")) == ["2025.json", "2026.json", "index.json"]
+    assert store.load_details(["Mökki Weekend"]) == {
+        "Mökki Weekend": {"metadata": {"title": "Mökille!", "level": "A2"}, "recorded_at": "2025-12-02T10:00:00"}
+    }
+
+    # A topic recorded again for another year moves to that year's shard
+    store.record_topic("Sauna Words", "2026-02-01", "Sauna Culture", {"title": "Again"}, "2026-01-01T00:00:00")
+    # (2025 had no other topic, so its shard is gone)
+    assert not (tmp_path / "topics" / "2025.json").exists()
+    assert store.load_details(["Sauna Words"])["Sauna Words"]["metadata"] == {"title": "Again"}
+    # Concepts that were already extracted are kept
+    assert store.load_hot()[0]["topic_details"]["Sauna Words"]["concepts"] == ["sauna", "löyly"]
+
+
+def test_sqlite_store_migrates_the_sharded_index_and_its_log(tmp_path):
+    sharded = _open("sharded", tmp_path)
+    sharded.record_topic("Kahvi Break", "2026-03-01", "Finnish Food and Dining", {"title": "Kahvi"}, "now")
+    sharded.set_concepts({"Kahvi Break": ["kahvi", "pulla"]})
+    assert (tmp_path / "topics" / "index.log").exists()
+
+    sqlite = SqliteTopicStore(tmp_path / "topics.db", tmp_path)
+    topics_history, dates_used = sqlite.load()
+    assert topics_history["topic_details"]["Kahvi Break"]["concepts"] == ["kahvi", "pulla"]
+    assert topics_history["topic_details"]["Kahvi Break"]["metadata"] == {"title": "Kahvi"}
+    assert topics_history["pending_concepts"] == []
+    assert dates_used["dates"] == ["2026-03-01"]
+
+
+def test_json_store_refuses_to_open(tmp_path):
+    with pytest.raises(ValueError, match="'json' was removed"):
+        _open("json", tmp_path)
+
+
+def test_index_log_is_compacted(tmp_path):
+    store = _open("sharded", tmp_path)
+    store.INDEX_LOG_LIMIT = 4
+    log_file = tmp_path / "topics" / "index.log"
+
+    for day in range(1, 4):
+        store.record_topic(f"Topic {day}", f"2026-04-0{day}", None, {}, "now")
+    assert len(log_file.read_text(encoding='utf-8').splitlines()) == 3
+
+    store.record_topic("Topic 4", "2026-04-04", None, {}, "now")
+    assert not log_file.exists()
+    index = json.loads((tmp_path / "topics" / "index.json").read_text(encoding='utf-8'))
+    assert [entry["topic"] for entry in index["topics"]] == [f"Topic {day}" for day in range(1, 5)]
+    assert store.load_dates() == [f"2026-04-0{day}" for day in range(1, 5)]
+
+
+def test_torn_log_line_is_ignored(tmp_path):
+    store = _open("sharded", tmp_path)
+    store.record_topic("Kept", "2026-05-01", None, {}, "now")
+    log_file = tmp_path / "topics" / "index.log"
+    # An append that was interrupted halfway
+    with open(log_file, 'a', encoding='utf-8') as f:
+        f.write('{"op": "record", "topic": "Lost", "da')
+
+    assert store.load_hot()[0]["used_topics"] == ["Kept"]
+    store.record_topic("After", "2026-05-02", None, {}, "now")
+    assert store.load_hot()[0]["used_topics"] == ["Kept", "After"]
+
+
+def _record_many(kind, data_dir, worker, count, log_limit):
+    # Runs in a separate process: its own store instance, like a second `generate`
+    store = open_topic_store(kind, data_dir)
+    store.INDEX_LOG_LIMIT = log_limit
+    for i in range(count):
+        store.record_topic(f"Process {worker} topic {i}", f"2027-{worker + 1:02d}-{i + 1:02d}", None, {"i": i}, "now")
+
+
+@pytest.mark.parametrize("kind", ["sharded", "sqlite"])
+def test_concurrent_record_topic_loses_nothing(kind, tmp_path):
+    store = _open(kind, tmp_path)
+    store.INDEX_LOG_LIMIT = 7  # Compactions happen while other writers append
+    threads = [
+        threading.Thread(target=lambda t=t: [
+            store.record_topic(f"Thread {t} topic {i}", f"2028-{t + 1:02d}-{i + 1:02d}", None, {}, "now")
+            for i in range(10)
+        ])
+        for t in range(4)
+    ]
+    context = multiprocessing.get_context("spawn")
+    processes = [context.Process(target=_record_many, args=(kind, tmp_path, p, 10, 7)) for p in range(3)]
+    for worker in threads + processes:
+        worker.start()
+    for worker in threads + processes:
+        worker.join()
+    assert all(process.exitcode == 0 for process in processes)
+
+    topics_history, dates_used = _open(kind, tmp_path).load()
+    expected = {f"Thread {t} topic {i}" for t in range(4) for i in range(10)}
+    expected |= {f"Process {p} topic {i}" for p in range(3) for i in range(10)}
+    assert set(topics_history["used_topics"]) == expected
+    assert len(topics_history["used_topics"]) == len(expected)
+    assert len(dates_used["dates"]) == len(expected)
+    assert set(topics_history["pending_concepts"]) == expected
+    assert all(details["metadata"] is not None for details in topics_history["topic_details"].values())
@@ -0,0 +1,89 @@
+"""The re-ask loop of generate_topic_suggestion and its caching, with scripted model responses."""
+
+from types import SimpleNamespace
+
+import pytest
+
+from src import blog_generator
+from src.config import SUGGESTION_ATTEMPTS, TEXT_MODEL
+from src.response_cache import configure_response_cache, get_response_cache
+from src.topic_manager import TopicManager
+from src.topic_store import ShardedTopicStore
+
+
+@pytest.fixture
+def manager(tmp_path):
+    manager = TopicManager(store=ShardedTopicStore(tmp_path / "topics", tmp_path))
+    manager.record_topic("Sauna Evenings by the Lake", "2030-01-01", "Culture")
+    manager.record_topic("Reading Finnish Train Timetables", "2030-01-02", "Travel")
+    manager.wait_for_concepts()
+    return manager
+
+
+def _script(monkeypatch, titles):
+    """Answer the suggestion prompts with `titles` in order; returns the prompts sent."""
+    prompts = []
+
+    def generate_grounded_content(client, prompt, output_tokens):
+        prompts.append(prompt)
+        text = f"TOPIC: {titles[len(prompts) - 1]}\nCATEGORY: Culture\nBRIEF: Something new."
+        return SimpleNamespace(text=text), "google_search"
+
+    monkeypatch.setattr(blog_generator, "generate_grounded_content", generate_grounded_content)
+    return prompts
+
+
+def test_duplicate_is_asked_again(manager, monkeypatch):
+    prompts = _script(monkeypatch, ["Sauna Evenings by the Lake!", "Baking Karjalanpiirakka at Home"])
+
+    suggestion = blog_generator.generate_topic_suggestion(manager, "culture")
+
+    assert suggestion['topic'] == "Baking Karjalanpiirakka at Home"
+    assert 'rejected' not in suggestion
+    assert len(prompts) == 2
+    assert "Sauna Evenings by the Lake!" in prompts[1]
+
+
+def test_all_rejected_returns_least_similar_flagged(manager, monkeypatch):
+    titles = [
+        "Sauna Evenings by the Lake",
+        "Sauna Evenings at the Lake Shore",
+        "Reading Finnish Train Timetables Again",
+    ][:SUGGESTION_ATTEMPTS]
+    _script(monkeypatch, titles)
+
+    suggestion = blog_generator.generate_topic_suggestion(manager, "culture")
+
+    scores = [manager.find_similar_topics(title)[0][1] for title in titles]
+    assert suggestion['topic'] == titles[scores.index(min(scores))]
+    assert suggestion['rejected'].startswith("near-duplicate of ")
+
+
+def test_suggestions_are_not_cached(manager, monkeypatch):
+    prompts = _script(monkeypatch, ["Baking Karjalanpiirakka at Home", "Ice Swimming in Oulu"])
+
+    first = blog_generator.generate_topic_suggestion(manager, "culture")
+    second = blog_generator.generate_topic_suggestion(manager, "culture")
+
+    assert len(prompts) == 2 and prompts[0] == prompts[1]
+    assert first['topic'] != second['topic']
+
+
+def test_ungrounded_fallback_is_cached_under_its_own_config(monkeypatch):
+    calls = []
+
+    def generate_grounded_content(client, prompt, output_tokens, parser_factory=None):
+        calls.append(prompt)
+        return SimpleNamespace(text="without search"), None
+
+    monkeypatch.setattr(blog_generator, "generate_grounded_content", generate_grounded_content)
+    configure_response_cache()
+    cache = get_response_cache()
+    prompt = "a prompt that only this test sends"
+
+    assert blog_generator.cached_grounded_text(None, prompt, 10) == "without search"
+    assert blog_generator.cached_grounded_text(None, prompt, 10) == "without search"
+    # Asked again with grounding, never replayed as a grounded response
+    assert len(calls) == 2
+    assert cache.get_text(cache.make_key(TEXT_MODEL, prompt, "google_search")) is None
+    assert cache.get_text(cache.make_key(TEXT_MODEL, prompt, None)) == "without search"